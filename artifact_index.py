@@ -0,0 +1,238 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from cache_layout import is_shard_dir
+from config import ARTIFACT_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+# Artifact kinds
+AUDIO = 'audio'
+TRANSCRIPT = 'transcript'
+SUBTITLES = 'subtitles'
+SUMMARY = 'summary'
+CHUNK_SUMMARIES = 'chunk_summaries'
+CHUNK_STATUS = 'chunk_status'
+CHUNK = 'chunk'
+
+# File names of each kind per directory, for indexing files that predate the index
+BACKFILL_PATTERNS = {
+    'downloads': [(AUDIO, re.compile(r'^audio_(?P<video_id>[^.]+)\.(mp3|16k\.wav|native\.\w+)$'))],
+    'transcriptions': [
+        (TRANSCRIPT, re.compile(r'^audio_(?P<video_id>[^.]+)\.txt$')),
+        (SUBTITLES, re.compile(r'^audio_(?P<video_id>[^.]+)\.srt$')),
+    ],
+    'cache': [
+        (SUMMARY, re.compile(r'^(?P<video_id>.+)\.summary\.txt$')),
+        (CHUNK_SUMMARIES, re.compile(r'^(?P<video_id>.+)\.chunk_summaries\.json$')),
+        (CHUNK_STATUS, re.compile(r'^(?P<video_id>.+)\.chunk_status\.json$')),
+    ],
+    'chunks': [(CHUNK, re.compile(r'^[0-9a-f]{64}\.json$'))],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    video_id TEXT,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS artifacts_kind_accessed ON artifacts (kind, accessed);
+CREATE INDEX IF NOT EXISTS artifacts_video_id ON artifacts (video_id);
+"""
+
+
+class ArtifactIndex:
+    """
+    SQLite (WAL mode) index of cached artifacts: path, video id, kind, size,
+    created/last-access time and the model or parameters that produced it.
+    Writers record artifacts as they create them, so status, cleanup and
+    eviction are indexed queries instead of directory scans. Last-access
+    updates are buffered and written in batches. The database is created on
+    first use, not when the index is constructed.
+    """
+
+    def __init__(self, path=ARTIFACT_INDEX_PATH, touch_batch=100, touch_interval=5.0):
+        self.path = os.path.abspath(path)
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending_touches = {}
+        self._last_flush = time.monotonic()
+
+    def open(self, path):
+        """Use the database at path from now on (tests point the shared index at a temporary directory)"""
+        if os.path.exists(self.path):
+            self.flush()
+        with self._lock:
+            self._pending_touches = {}
+            self.path = os.path.abspath(path)
+
+    def _db(self):
+        """This thread's connection (sqlite3 connections can't be shared between threads)"""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.path != self.path:
+            if db is not None:
+                db.close()
+            path = self.path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            db = sqlite3.connect(path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._local.db, self._local.path = db, path
+        return db
+
+    def _executemany(self, sql, rows):
+        """Run a batch of writes in one transaction"""
+        db = self._db()
+        db.execute("BEGIN")
+        try:
+            db.executemany(sql, rows)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def record(self, path, kind, video_id=None, source=None):
+        """Index a file that was just written (replacing any previous entry for the path)"""
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        now = time.time()
+        try:
+            self._db().execute(
+                "INSERT OR REPLACE INTO artifacts (path, video_id, kind, size, created, accessed, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, video_id, kind, size, now, now, source)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to index {path}: {e}")
+
+    def touch(self, path):
+        """Note a cache hit; written with the next batch"""
+        now = time.time()
+        with self._lock:
+            self._pending_touches[os.path.abspath(path)] = now
+            due = (len(self._pending_touches) >= self.touch_batch
+                   or time.monotonic() - self._last_flush >= self.touch_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered last-access times"""
+        with self._lock:
+            touches = self._pending_touches
+            self._pending_touches = {}
+            self._last_flush = time.monotonic()
+        if not touches:
+            return
+        try:
+            self._executemany(
+                "UPDATE artifacts SET accessed = ? WHERE path = ?",
+                [(accessed, path) for path, accessed in touches.items()]
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to update access times: {e}")
+
+    def remove(self, paths):
+        """Drop index entries (the caller deletes the files)"""
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            for path in paths:
+                self._pending_touches.pop(path, None)
+        self._executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in paths])
+
+    def move(self, moves):
+        """Point entries at new paths after their files were renamed ((old, new) pairs)"""
+        moves = [(os.path.abspath(old), os.path.abspath(new)) for old, new in moves]
+        with self._lock:
+            for old, new in moves:
+                if old in self._pending_touches:
+                    self._pending_touches[new] = self._pending_touches.pop(old)
+        self._executemany("UPDATE artifacts SET path = ? WHERE path = ?", [(new, old) for old, new in moves])
+
+    def get(self, path):
+        """Index entry of a file as a dict, or None if it isn't indexed"""
+        row = self._db().execute("SELECT * FROM artifacts WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, kinds=None, video_id=None, limit=None):
+        """Indexed artifacts as dicts, least recently used first"""
+        self.flush()
+        query = "SELECT * FROM artifacts"
+        conditions, params = [], []
+        if kinds:
+            conditions.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params += list(kinds)
+        if video_id is not None:
+            conditions.append("video_id = ?")
+            params.append(video_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY accessed"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._db().execute(query, params)]
+
+    def get_stats(self):
+        """{kind: {'files', 'bytes'}} over all indexed artifacts"""
+        rows = self._db().execute("SELECT kind, COUNT(*) AS files, SUM(size) AS bytes FROM artifacts GROUP BY kind")
+        return {row['kind']: {'files': row['files'], 'bytes': row['bytes'] or 0} for row in rows}
+
+    def is_empty(self):
+        return self._db().execute("SELECT 1 FROM artifacts LIMIT 1").fetchone() is None
+
+    def backfill(self, directories):
+        """
+        Index existing files by name, one scan per directory and its shards.
+        `directories` maps BACKFILL_PATTERNS keys ('downloads', 'transcriptions',
+        'cache', 'chunks') to paths. Returns the number of files indexed.
+        """
+        rows = []
+        for name, directory in directories.items():
+            if not os.path.isdir(directory):
+                continue
+            for entry in _scan_files(directory):
+                for kind, pattern in BACKFILL_PATTERNS[name]:
+                    match = pattern.match(entry.name)
+                    if match:
+                        stat = entry.stat()
+                        rows.append((
+                            os.path.abspath(entry.path), match.groupdict().get('video_id'), kind,
+                            stat.st_size, stat.st_mtime, max(stat.st_mtime, stat.st_atime), None
+                        ))
+                        break
+        self._executemany(
+            "INSERT OR IGNORE INTO artifacts (path, video_id, kind, size, created, accessed, source) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return len(rows)
+
+
+def _scan_files(directory):
+    """Files in a cache directory and its shard directories (legacy flat files included)"""
+    pending = [directory]
+    while pending:
+        for entry in os.scandir(pending.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                if is_shard_dir(entry.name):
+                    pending.append(entry.path)
+            elif entry.is_file():
+                yield entry
+
+
+# Shared by every service; nothing is written to disk until it is first used
+artifact_index = ArtifactIndex()
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from config import ARTIFACT_COMPRESSION
+
+# Stored artifacts start with a header line:
+#   %ARTIFACT <format version> <compression> <uncompressed size> <sha256 of the uncompressed data>
+# followed by the (compressed) payload. Files without it are legacy plain text.
+MAGIC = b"%ARTIFACT "
+FORMAT_VERSION = 1
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+# Block size for streaming reads
+READ_BLOCK = 64 * 1024
+
+# Errors raised by the decompressors on damaged payloads
+DECODE_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class CorruptArtifact(Exception):
+    """A stored artifact failed its size/checksum check or can't be decoded"""
+
+
+def atomic_write(path, data):
+    """Write bytes to a temp file next to path, fsync it and rename it over path"""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def resolve_compression(compression):
+    """Compression actually used for writes: zstd falls back to gzip without the zstandard package"""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown artifact compression: {compression}")
+    if compression == 'zstd' and zstandard is None:
+        return 'gzip'
+    return compression
+
+
+def write_text(path, text, compression=ARTIFACT_COMPRESSION):
+    """Store text atomically with a checksum, compressed unless compression is 'none'"""
+    data = text.encode('utf-8')
+    compression = resolve_compression(compression)
+    if compression == 'gzip':
+        payload = gzip.compress(data, compresslevel=6, mtime=0)
+    elif compression == 'zstd':
+        payload = zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        payload = data
+    header = f"{MAGIC.decode()}{FORMAT_VERSION} {compression} {len(data)} {hashlib.sha256(data).hexdigest()}\n"
+    atomic_write(path, header.encode() + payload)
+
+
+def write_json(path, value, compression=ARTIFACT_COMPRESSION):
+    write_text(path, json.dumps(value, ensure_ascii=False, separators=(',', ':')), compression)
+
+
+def _reader(f, compression):
+    """File object yielding the decompressed payload of f from its current position"""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise CorruptArtifact("zstd artifact but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    if compression == 'none':
+        return f
+    raise CorruptArtifact(f"unknown compression {compression}")
+
+
+def read_text(path):
+    """
+    Read a stored artifact, decompressing as a stream and verifying its size
+    and checksum. Legacy files without a header are returned as they are.
+    Raises FileNotFoundError or CorruptArtifact.
+    """
+    with open(path, 'rb') as f:
+        start = f.read(len(MAGIC))
+        if start != MAGIC:
+            return (start + f.read()).decode('utf-8')
+
+        try:
+            version, compression, size, digest = f.readline().decode('ascii').split()
+            version, size = int(version), int(size)
+        except ValueError:
+            raise CorruptArtifact(f"bad header in {path}")
+        if version > FORMAT_VERSION:
+            raise CorruptArtifact(f"{path} has format version {version}, newer than {FORMAT_VERSION}")
+
+        checksum = hashlib.sha256()
+        blocks = []
+        try:
+            reader = _reader(f, compression)
+            while True:
+                block = reader.read(READ_BLOCK)
+                if not block:
+                    break
+                checksum.update(block)
+                blocks.append(block)
+        except DECODE_ERRORS as e:
+            raise CorruptArtifact(f"can't decompress {path}: {e}")
+
+    data = b''.join(blocks)
+    if len(data) != size or checksum.hexdigest() != digest:
+        raise CorruptArtifact(f"checksum mismatch in {path} (truncated or damaged)")
+    return data.decode('utf-8')
+
+
+def read_json(path):
+    try:
+        return json.loads(read_text(path))
+    except json.JSONDecodeError as e:
+        raise CorruptArtifact(f"invalid JSON in {path}: {e}")
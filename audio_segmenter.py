@@ -0,0 +1,142 @@
+import re
+import subprocess
+from config import FFMPEG_PATH, FFPROBE_PATH
+
+
+def get_audio_duration(audio_file_path):
+    """Get audio duration in seconds using ffprobe"""
+    cmd = [
+        FFPROBE_PATH,
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        audio_file_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
+def detect_silences(audio_file_path, noise_db=-30, min_silence=0.5):
+    """Find (start, end) silence intervals using ffmpeg silencedetect"""
+    cmd = [
+        FFMPEG_PATH,
+        '-hide_banner', '-nostats',
+        '-i', audio_file_path,
+        '-af', f'silencedetect=noise={noise_db}dB:d={min_silence}',
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return parse_silencedetect_output(result.stderr)
+
+
+def parse_silencedetect_output(output):
+    """Parse silencedetect log lines into (start, end) intervals"""
+    silences = []
+    start = None
+    for line in output.splitlines():
+        match = re.search(r'silence_start: (-?[\d.]+)', line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = re.search(r'silence_end: ([\d.]+)', line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_segments(duration, silences, min_length=300, max_length=600):
+    """
+    Plan (start, end) segments of min_length..max_length seconds.
+    Each cut is placed in the middle of the silence closest to the target
+    length; if no silence falls inside the window, cut hard at max_length.
+    """
+    target = (min_length + max_length) / 2
+    cut_points = [(s + e) / 2 for s, e in silences]
+
+    segments = []
+    start = 0.0
+    while duration - start > max_length:
+        window = [c for c in cut_points if start + min_length <= c <= start + max_length]
+        if window:
+            end = min(window, key=lambda c: abs(c - (start + target)))
+        else:
+            end = start + max_length
+        segments.append((start, end))
+        start = end
+
+    segments.append((start, duration))
+    return segments
+
+
+def extract_segment(audio_file_path, start, end, output_path):
+    """Cut a segment and decode it to 16 kHz mono WAV for whisper"""
+    cmd = [
+        FFMPEG_PATH,
+        '-hide_banner', '-loglevel', 'error', '-y',
+        '-ss', f'{start:.3f}',
+        '-t', f'{end - start:.3f}',
+        '-i', audio_file_path,
+        '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le',
+        output_path
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return output_path
+
+
+def decode_to_wav(audio_file_path, output_path):
+    """Decode a whole audio file to 16 kHz mono WAV for whisper"""
+    cmd = [
+        FFMPEG_PATH,
+        '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', audio_file_path,
+        '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le',
+        output_path
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return output_path
+
+
+def _parse_srt_time(value):
+    hours, minutes, rest = value.replace(',', '.').split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(rest)
+
+
+def _format_srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def parse_srt(srt_text):
+    """Parse SRT text into (start, end, text) cues"""
+    cues = []
+    for block in re.split(r'\n\s*\n', srt_text.strip()):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            if '-->' in line:
+                start, end = [part.strip() for part in line.split('-->')]
+                text = ' '.join(l.strip() for l in lines[i + 1:]).strip()
+                if text:
+                    cues.append((_parse_srt_time(start), _parse_srt_time(end), text))
+                break
+    return cues
+
+
+def format_srt(cues):
+    """Format (start, end, text) cues as SRT text"""
+    blocks = []
+    for index, (start, end, text) in enumerate(cues, 1):
+        blocks.append(f"{index}\n{_format_srt_time(start)} --> {_format_srt_time(end)}\n{text}\n")
+    return '\n'.join(blocks)
+
+
+def stitch_segments(segment_cues):
+    """Merge per-segment cues into one timeline given [(offset, cues), ...]"""
+    merged = []
+    for offset, cues in sorted(segment_cues, key=lambda item: item[0]):
+        for start, end, text in cues:
+            merged.append((start + offset, end + offset, text))
+    return merged
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark transcript chunking on a synthetic multi-hour Russian transcript:
+the old token-slice splitter (encoder loaded per call, cuts anywhere) vs
+text_chunker (encoder cached, cuts on sentence boundaries).
+
+Usage: python benchmark_chunking.py [hours] [runs]
+"""
+
+import re
+import statistics
+import sys
+import time
+
+import tiktoken
+
+from text_chunker import chunk_text, get_encoder
+
+SENTENCES = [
+    "Сегодня мы подробно разберём, как устроены современные языковые модели.",
+    "Во-первых, они обучаются на огромных корпусах текста из интернета.",
+    "Почему это вообще работает и где проходят границы возможностей?",
+    "Давайте посмотрим на конкретный пример с переводом документации!",
+    "Ответ, как обычно, зависит от качества данных…",
+]
+WORDS_PER_MINUTE = 130
+
+
+def make_transcript(hours):
+    """About WORDS_PER_MINUTE words of speech per minute, one whisper segment per line"""
+    words_per_sentence = statistics.mean(len(sentence.split()) for sentence in SENTENCES)
+    count = int(hours * 60 * WORDS_PER_MINUTE / words_per_sentence)
+    return '\n'.join(' '.join(SENTENCES[(i + j) % 5] for j in range(2)) for i in range(0, count, 2))
+
+
+def old_split(text, max_tokens=15000, overlap=1000, model="gpt-4o"):
+    """The previous splitter: load the encoder, encode everything, decode fixed token slices"""
+    try:
+        enc = tiktoken.encoding_for_model(model)
+        tokens = enc.encode(text)
+        return [enc.decode(tokens[start:start + max_tokens])
+                for start in range(0, len(tokens), max_tokens - overlap)]
+    except Exception:
+        max_chars, overlap_chars = max_tokens * 4, overlap * 4
+        return [text[start:start + max_chars] for start in range(0, len(text), max_chars - overlap_chars)]
+
+
+def bad_cuts(chunks):
+    """Chunks whose edges fall inside a word or mid-sentence, or contain broken UTF-8"""
+    mid_word = sum(1 for chunk in chunks[:-1] if re.search(r'\w$', chunk))
+    mid_sentence = sum(1 for chunk in chunks[:-1] if not re.search(r'[.!?…]\s*$', chunk))
+    broken = sum(chunk.count('�') for chunk in chunks)
+    return mid_word, mid_sentence, broken
+
+
+def time_runs(split, text, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        chunks = split(text)
+        timings.append(time.perf_counter() - start)
+    return timings, chunks
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    text = make_transcript(hours)
+    tokenizer = "tiktoken" if get_encoder() else "char estimate (tokenizer unavailable)"
+    print(f"🧪 {hours:g}h transcript: {len(text):,} chars, {runs} runs, token counts: {tokenizer}\n")
+
+    for name, split in (("old splitter", old_split),
+                        ("text_chunker", lambda t: chunk_text(t)['chunks'])):
+        timings, chunks = time_runs(split, text, runs)
+        mid_word, mid_sentence, broken = bad_cuts(chunks)
+        print(f"{name}: mean {statistics.mean(timings) * 1000:.0f}ms, min {min(timings) * 1000:.0f}ms, "
+              f"{len(chunks)} chunks, {mid_word} mid-word cuts, {mid_sentence} mid-sentence cuts, "
+              f"{broken} broken characters")
+
+    result = chunk_text(text)
+    print(f"\n📊 {result['total_tokens']:,} tokens, chunk sizes {min(result['token_counts']):,}"
+          f"-{max(result['token_counts']):,}")
+
+
+if __name__ == '__main__':
+    main()
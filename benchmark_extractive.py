@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extractive pre-summarization stage:
+1. TextRank ranking time vs transcript length (synthetic 0.5h-8h transcripts)
+2. Quality/size trade-off on fixture transcripts: how many topics and key
+   terms survive at each budget, compared with truncating the transcript
+   (what the LLM would see if we just cut it) and keeping every n-th sentence.
+
+Extra transcript files given on the command line (or found in ./transcriptions)
+are reported too, with key-term recall measured against their own top terms.
+
+Usage: python benchmark_extractive.py [transcript.txt ...]
+"""
+
+import glob
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+
+from extractive_summarizer import STEM_LENGTH, TERM_RE, condense_text, rank_sentences
+from text_chunker import count_tokens_batch, split_sentences
+
+WORDS_PER_MINUTE = 130
+BUDGETS = (0.05, 0.1, 0.2, 0.4)
+
+# Fixture topics: key terms per topic, combined into varied sentences
+TOPICS = {
+    'экономика': ["инфляция", "ключевая ставка", "центробанк", "кредиты", "ипотека", "рубль", "бюджет", "налоги"],
+    'нейросети': ["нейросеть", "обучение модели", "видеокарты", "датасет", "трансформер", "параметры", "дообучение"],
+    'космос': ["ракета", "спутник", "орбита", "космодром", "запуск", "телескоп", "экипаж станции"],
+    'медицина': ["вакцина", "клинические испытания", "антитела", "пациенты", "эффективность препарата", "побочные эффекты"],
+    'футбол': ["сборная", "нападающий", "тренер", "отборочный матч", "вратарь", "пенальти", "чемпионат"],
+}
+TOPIC_TEMPLATES = [
+    "Главное, что {a} сейчас напрямую влияет на {b}.",
+    "Если говорить про {a}, то {b} здесь важнее, чем {c}.",
+    "Эксперты связывают {a} с тем, как меняются {b} и {c}.",
+    "Давайте разберём, почему {a} и {b} так часто обсуждают вместе.",
+    "По последним данным {a} выросла, а {b} пока не изменились.",
+]
+FILLER = [
+    "ну вот", "как я уже говорил", "давайте дальше", "это интересный момент", "подписывайтесь на канал",
+    "напишите в комментариях", "сейчас покажу на экране", "так о чём это я", "вопрос хороший",
+    "вернёмся к этому позже", "в общем", "короче говоря", "понимаете",
+]
+
+
+def make_fixture(hours, filler_share, seed):
+    """Topics discussed one after another, with filler between on-topic sentences"""
+    rng = random.Random(seed)
+    sentence_count = int(hours * 60 * WORDS_PER_MINUTE / 9)
+    per_topic = sentence_count // len(TOPICS)
+    lines = []
+    for keywords in TOPICS.values():
+        for _ in range(per_topic):
+            if rng.random() < filler_share:
+                lines.append(' '.join(rng.sample(FILLER, 3)).capitalize() + '.')
+            else:
+                a, b, c = rng.sample(keywords, 3)
+                lines.append(rng.choice(TOPIC_TEMPLATES).format(a=a, b=b, c=c).capitalize())
+    return '\n'.join(lines)
+
+
+def terms(text):
+    return {word[:STEM_LENGTH] for word in TERM_RE.findall(text.lower())}
+
+
+def truncate(sentences, tokens, budget):
+    kept, used = [], 0
+    for sentence, count in zip(sentences, tokens):
+        if used + count > budget:
+            break
+        kept.append(sentence)
+        used += count
+    return ''.join(kept)
+
+
+def every_nth(sentences, tokens, budget):
+    step = max(1, round(sum(tokens) / budget))
+    return ''.join(sentences[::step])
+
+
+def quality(condensed, key_terms):
+    """(topics covered, key-term recall, on-topic share of kept sentences)"""
+    kept = [terms(sentence) for sentence in split_sentences(condensed) if sentence.strip()]
+    topic_terms = {topic: terms(' '.join(keywords)) for topic, keywords in TOPICS.items()}
+    covered = {topic for sentence in kept for topic, words in topic_terms.items() if sentence & words}
+    on_topic = sum(1 for sentence in kept if sentence & key_terms) / len(kept) if kept else 0
+    recall = len(terms(condensed) & key_terms) / len(key_terms)
+    return len(covered), recall, on_topic
+
+
+def benchmark_ranking_time():
+    print("⏱️  Ranking time vs transcript length (condensed to 10%)\n")
+    condense_text(make_fixture(0.1, filler_share=0.4, seed=0), token_budget=100)  # Warm up the tokenizer
+    print(f"{'hours':>6} {'sentences':>10} {'rank':>9} {'condense':>10}")
+    for hours in (0.5, 1, 2, 4, 8):
+        text = make_fixture(hours, filler_share=0.4, seed=1)
+        sentences = [sentence for sentence in split_sentences(text) if sentence.strip()]
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            rank_sentences(sentences)
+            timings.append(time.perf_counter() - start)
+        budget = sum(count_tokens_batch(sentences)) // 10
+        start = time.perf_counter()
+        condense_text(text, token_budget=budget)
+        condense_time = time.perf_counter() - start
+        print(f"{hours:>6g} {len(sentences):>10,} {statistics.median(timings) * 1000:>7.0f}ms "
+              f"{condense_time * 1000:>8.0f}ms")
+
+
+def benchmark_quality():
+    print("\n📊 Quality/size trade-off on fixtures (2h, 40% and 70% filler)\n")
+    key_terms = set().union(*(terms(' '.join(keywords)) for keywords in TOPICS.values()))
+    print(f"{'fixture':>12} {'budget':>7} {'method':>10} {'topics':>7} {'key terms':>10} {'on topic':>9}")
+    for filler_share in (0.4, 0.7):
+        text = make_fixture(2, filler_share, seed=2)
+        sentences = split_sentences(text)
+        tokens = count_tokens_batch(sentences)
+        for share in BUDGETS:
+            budget = int(sum(tokens) * share)
+            for method, condensed in (
+                ('textrank', condense_text(text, budget)['text']),
+                ('truncate', truncate(sentences, tokens, budget)),
+                ('every-nth', every_nth(sentences, tokens, budget)),
+            ):
+                covered, recall, on_topic = quality(condensed, key_terms)
+                print(f"{f'filler {filler_share:.0%}':>12} {share:>7.0%} {method:>10} "
+                      f"{covered:>4}/{len(TOPICS)} {recall:>10.0%} {on_topic:>9.0%}")
+
+
+def benchmark_files(paths):
+    print("\n📄 Transcripts (recall of each transcript's 100 most frequent terms)\n")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        frequent = Counter(word[:STEM_LENGTH] for word in TERM_RE.findall(text.lower()))
+        key_terms = {term for term, _ in frequent.most_common(100)}
+        if not key_terms:
+            continue
+        sentences = split_sentences(text)
+        tokens = count_tokens_batch(sentences)
+        for share in BUDGETS:
+            budget = int(sum(tokens) * share)
+            textrank = len(terms(condense_text(text, budget)['text']) & key_terms) / len(key_terms)
+            truncated = len(terms(truncate(sentences, tokens, budget)) & key_terms) / len(key_terms)
+            print(f"{path}: {share:.0%} of {sum(tokens):,} tokens -> key terms "
+                  f"{textrank:.0%} textrank, {truncated:.0%} truncated")
+
+
+def main():
+    benchmark_ranking_time()
+    benchmark_quality()
+    paths = sys.argv[1:] or sorted(glob.glob('./transcriptions/*.txt'))
+    paths = [path for path in paths if not re.search(r'\.partial$', path)]
+    if paths:
+        benchmark_files(paths)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-job transcription latency: whisper-cli (model loaded per job)
+vs the resident whisper server (model loaded once).
+
+Usage: python benchmark_transcription.py [audio_file] [runs]
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from transcription_service import TranscriptionService
+from whisper_server import WhisperServer
+
+
+def time_runs(service, audio_file_path, runs):
+    """Transcribe the clip repeatedly, bypassing the transcription cache"""
+    timings = []
+    for _ in range(runs):
+        service.transcriptions_dir = tempfile.mkdtemp(prefix="bench_")
+        try:
+            start = time.perf_counter()
+            service.transcribe_audio(audio_file_path)
+            timings.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(service.transcriptions_dir, ignore_errors=True)
+    return timings
+
+
+def main():
+    audio_file_path = sys.argv[1] if len(sys.argv) > 1 else './whisper.cpp/samples/jfk.wav'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    if not os.path.exists(audio_file_path):
+        print(f"❌ Audio file not found: {audio_file_path}")
+        return False
+
+    print(f"🧪 Benchmarking {runs} runs on {audio_file_path}\n")
+
+    cli_timings = time_runs(TranscriptionService(), audio_file_path, runs)
+    print(f"whisper-cli:    mean {statistics.mean(cli_timings):.2f}s, "
+          f"min {min(cli_timings):.2f}s")
+
+    server = WhisperServer()
+    if not server.start():
+        print("❌ whisper server could not be started")
+        return False
+
+    try:
+        server_timings = time_runs(TranscriptionService(whisper_server=server), audio_file_path, runs)
+    finally:
+        server.stop()
+
+    print(f"whisper-server: mean {statistics.mean(server_timings):.2f}s, "
+          f"min {min(server_timings):.2f}s")
+
+    saved = statistics.mean(cli_timings) - statistics.mean(server_timings)
+    print(f"\n📊 Saved per job: {saved:.2f}s "
+          f"({saved / statistics.mean(cli_timings) * 100:.0f}%)")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,24 @@
-import os
 import telebot
 from telebot import types
 import logging
 from youtube_downloader import YouTubeDownloader
-from transcription_service import TranscriptionService
+from transcription_service import TranscriptionService, transcript_base_name
 from summarization_service import SummarizationService
 from openrouter_summarization_service import OpenRouterSummarizationService
 from telegraph_service import TelegraphService
-from config import BOT_TOKEN, DOWNLOADS_DIR, TRANSCRIPTIONS_DIR
+from job_scheduler import JobScheduler, current_job
+from whisper_server import WhisperServer
+from http_client import shared_client
+from transcript_compactor import compact_transcript, compaction_stats
+from artifact_index import artifact_index, AUDIO, TRANSCRIPT, SUBTITLES, SUMMARY, CHUNK_SUMMARIES, CHUNK
+from eviction_manager import EvictionManager
+from media_identity import cache_hit_stats, canonical_url, extract_video_id
+from telegram_outbox import TelegramOutbox
+from config import (
+    BOT_TOKEN, DOWNLOADS_DIR, TRANSCRIPTIONS_DIR, TRANSCRIPTION_BACKEND, STREAMING_PIPELINE,
+    DOWNLOAD_WORKERS, TRANSCRIPTION_WORKERS, SUMMARIZATION_WORKERS, SUMMARY_STREAM_EDIT_INTERVAL,
+    TRANSCRIPT_COMPACTION, KEEP_AUDIO_AFTER_TRANSCRIPT
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -16,36 +27,41 @@ logger = logging.getLogger(__name__)
 # Initialize bot
 bot = telebot.TeleBot(BOT_TOKEN)
 
+# All outgoing messages and edits are paced and sent in the background
+outbox = TelegramOutbox(bot)
+
 # Initialize services
 youtube_downloader = YouTubeDownloader()
-transcription_service = TranscriptionService()
+whisper_server = WhisperServer()
+transcription_service = TranscriptionService(whisper_server=whisper_server)
 summarization_service = SummarizationService()
 openrouter_service = OpenRouterSummarizationService()
 telegraph_service = TelegraphService()
 
+# Bounded per-stage worker pools so long jobs don't block the polling thread
+job_scheduler = JobScheduler({
+    'download': DOWNLOAD_WORKERS,
+    'transcription': TRANSCRIPTION_WORKERS,
+    'summarization': SUMMARIZATION_WORKERS,
+})
 
-def send_message_with_fallback(bot, chat_id, text, parse_mode='Markdown'):
-    """Send message with Markdown, fallback to plain text if parsing fails"""
-    try:
-        bot.send_message(chat_id, text, parse_mode=parse_mode)
-    except Exception as e:
-        logger.warning(f"Markdown parsing failed: {e}")
-        try:
-            # Remove common markdown formatting and try again
-            clean_text = text.replace('**', '').replace('*', '').replace('_', '').replace('`', '')
-            bot.send_message(chat_id, clean_text, parse_mode=None)
-        except Exception as e2:
-            logger.error(f"Failed to send message even without formatting: {e2}")
-            # Last resort - send a generic error message
-            bot.send_message(chat_id, "⚠️ Summary generated but couldn't be displayed due to formatting issues. Please try again.")
+
+def forget_evicted(artifact):
+    """Evicted files must not be served from the in-memory caches"""
+    openrouter_service.forget_artifact(artifact)
+    transcription_service.forget_artifact(artifact)
 
 
-def send_summary_chunks(bot, chat_id, summary_text, service_name):
+# Keeps the cache directories within their disk budgets in the background
+eviction_manager = EvictionManager(in_use=job_scheduler.is_in_flight, on_evict=forget_evicted)
+
+
+def send_summary_chunks(chat_id, summary_text, service_name):
     """Send summary in chunks with proper handling for very long summaries"""
     try:
-        # If summary is short enough, send directly with fallback
+        # If summary is short enough, send directly (plain text if the Markdown is rejected)
         if len(summary_text) <= 4096:
-            send_message_with_fallback(bot, chat_id, summary_text)
+            outbox.send(chat_id, summary_text, parse_mode='Markdown')
             return
         
         # For very long summaries, try Telegraph first
@@ -58,7 +74,7 @@ def send_summary_chunks(bot, chat_id, summary_text, service_name):
             )
             
             if telegraph_url:
-                bot.send_message(
+                outbox.send(
                     chat_id,
                     f"🎥 **Video Summary** (via {service_name})\n\n"
                     f"The summary is too long for Telegram ({len(summary_text)} characters).\n"
@@ -69,60 +85,20 @@ def send_summary_chunks(bot, chat_id, summary_text, service_name):
         except Exception as telegraph_error:
             logger.warning(f"Telegraph failed for summary: {telegraph_error}")
         
-        # Fallback to chunked messages if Telegraph fails
+        # Fallback to chunked messages if Telegraph fails, queued back to back
         logger.info(f"Sending summary in chunks ({len(summary_text)} chars)")
         chunk_size = 3500  # Leave room for part numbering
         chunks = [summary_text[i:i+chunk_size] for i in range(0, len(summary_text), chunk_size)]
-        
-        for i, chunk in enumerate(chunks):
-            try:
-                if len(chunks) > 1:
-                    prefix = f"**Part {i+1}/{len(chunks)}:**\n\n" if i > 0 else ""
-                    chunk_text = f"{prefix}{chunk}"
-                else:
-                    chunk_text = chunk
-                
-                send_message_with_fallback(bot, chat_id, chunk_text)
-                
-            except Exception as chunk_error:
-                logger.error(f"Error sending chunk {i+1}: {chunk_error}")
-                # Try sending without any formatting as last resort
-                try:
-                    clean_chunk = chunk.replace('**', '').replace('*', '').replace('_', '').replace('`', '')
-                    bot.send_message(chat_id, clean_chunk, parse_mode=None)
-                except:
-                    # If even that fails, send a simple error message
-                    bot.send_message(chat_id, f"⚠️ Part {i+1} of summary couldn't be displayed due to formatting issues.")
+        parts = [
+            f"**Part {i+1}/{len(chunks)}:**\n\n{chunk}" if i > 0 else chunk
+            for i, chunk in enumerate(chunks)
+        ]
+        outbox.send_parts(chat_id, parts, parse_mode='Markdown')
         
     except Exception as e:
         logger.error(f"Error sending summary chunks: {e}")
         # Final fallback - send a simple message
-        bot.send_message(chat_id, "⚠️ Summary generated but couldn't be displayed. Please try again or check logs.")
-
-
-def extract_video_id(url):
-    """Extract video ID from YouTube URL"""
-    import re
-    
-    # Pattern for various YouTube URL formats
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/watch\?.*v=([a-zA-Z0-9_-]{11})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    
-    # If no pattern matches, try to extract any 11-character string that looks like a YouTube ID
-    match = re.search(r'([a-zA-Z0-9_-]{11})', url)
-    if match:
-        return match.group(1)
-    
-    # Fallback: use a hash of the URL if video ID can't be extracted
-    import hashlib
-    return hashlib.md5(url.encode()).hexdigest()[:11]
+        outbox.send(chat_id, "⚠️ Summary generated but couldn't be displayed. Please try again or check logs.")
 
 
 @bot.message_handler(commands=['start', 'help'])
@@ -139,7 +115,7 @@ Send me a YouTube video link and I'll:
 Commands:
 /start - Show this message
 /help - Show this message
-/cleanup - Clean up cached files
+/cleanup [audio] - Clean up cached files (audio only with 'audio')
 /status - Show cache status
 /services - Show available AI services
 /chunks <url|video_id> - Get cached chunk summaries
@@ -149,103 +125,194 @@ Just paste any YouTube URL to get started!
 Note: Files are cached for faster processing on repeat requests.
 Large videos are processed in chunks to save tokens and improve quality.
     """
-    bot.reply_to(message, welcome_text)
-
-
-@bot.message_handler(func=lambda message: True)
-def handle_message(message):
-    """Handle all messages"""
-    try:
-        text = message.text.strip()
-        
-        # Check if message contains YouTube URL
-        if 'youtube.com' in text or 'youtu.be' in text:
-            process_youtube_video(message, text)
-        else:
-            bot.reply_to(message, "Please send a valid YouTube video URL.")
-            
-    except Exception as e:
-        logger.error(f"Error handling message: {e}")
-        bot.reply_to(message, f"An error occurred: {str(e)}")
+    outbox.reply_to(message, welcome_text)
 
 
 def process_youtube_video(message, youtube_url):
-    """Process YouTube video: download, transcribe, and summarize"""
+    """Queue YouTube video processing: download, transcribe, and summarize"""
     try:
-        # Extract video ID from URL for caching
+        # One canonical video ID keys every cache; its URL drops playlist and tracking parameters
         video_id = extract_video_id(youtube_url)
+        youtube_url = canonical_url(video_id)
         
         # Send initial status
-        status_message = bot.reply_to(message, "🔄 Processing your video...")
-        
-        # Step 1: Download audio
-        bot.edit_message_text(
-            "🔄 Checking/downloading audio from YouTube...",
-            message.chat.id,
-            status_message.message_id
-        )
-        
-        audio_file_path = youtube_downloader.download_audio(youtube_url)
-        logger.info(f"Audio ready: {audio_file_path}")
-        
-        # Step 2: Transcribe audio
-        bot.edit_message_text(
-            "🔄 Checking/transcribing audio using Whisper...",
-            message.chat.id,
-            status_message.message_id
-        )
-        
-        transcription = transcription_service.transcribe_audio(audio_file_path)
-        logger.info(f"Transcription completed, length: {len(transcription)} chars")
-        
-        # Step 3: Summarize text
-        bot.edit_message_text(
-            "🔄 Creating summary with AI...",
-            message.chat.id,
-            status_message.message_id
-        )
-        
-        summary, service_used = smart_summarize(transcription, video_id=video_id)
-        logger.info(f"Summary completed using {service_used}, length: {len(summary)} chars")
-        
-        # Send results
-        bot.edit_message_text(
-            "✅ Processing completed!",
-            message.chat.id,
-            status_message.message_id
-        )
-        
-        # Send summary with robust chunking and Telegraph fallback
-        summary_text = f"🎥 **Video Summary** (via {service_used}):\n\n{summary}"
-        send_summary_chunks(bot, message.chat.id, summary_text, service_used)
-        
-        # Offer to send full transcription
-        markup = types.InlineKeyboardMarkup()
-        transcription_btn = types.InlineKeyboardButton(
-            "📝 Get Full Transcription",
-            callback_data=f"transcription_{os.path.basename(audio_file_path)}"
-        )
-        markup.add(transcription_btn)
-        
-        bot.send_message(
-            message.chat.id,
-            "Would you like to see the full transcription?",
-            reply_markup=markup
-        )
-        
-        # Cleanup - keep files by default for reuse
-        cleanup_files(audio_file_path, force_cleanup=False)
-        
+        status_message = outbox.reply_to(message, "🔄 Processing your video...")
     except Exception as e:
-        logger.error(f"Error processing video: {e}")
+        logger.error(f"Error queueing video: {e}")
+        outbox.reply_to(message, f"❌ Error: {str(e)}")
+        return
+    
+    def update_status(text):
+        # Queued edits of the status message collapse into the latest text
+        outbox.edit(message.chat.id, status_message, text)
+    
+    def report_error(error):
+        update_status(f"❌ Error: {str(error)}")
+    
+    # Existing transcripts and YouTube captions skip audio entirely
+    steps = [
+        ('download', "🔄 Checking YouTube captions...",
+         lambda _: captions_stage(youtube_url, video_id)),
+    ]
+    if STREAMING_PIPELINE:
+        # Whisper starts on the first segments while the rest is still downloading
+        steps.append(
+            ('transcription', unless_transcribed("🔄 Streaming audio into Whisper..."),
+             skip_if_transcribed(lambda _: streaming_stage(youtube_url, video_id)))
+        )
+    else:
+        steps += [
+            ('download', unless_transcribed("🔄 Checking/downloading audio from YouTube..."),
+             skip_if_transcribed(lambda _: download_stage(youtube_url, video_id))),
+            ('transcription', unless_transcribed("🔄 Checking/transcribing audio using Whisper..."),
+             skip_if_transcribed(transcription_stage)),
+        ]
+    steps.append(('summarization', "🔄 Creating summary with AI...", summarization_stage))
+    
+    # Requests for a video that is already being processed attach to that job
+    job_scheduler.submit(
+        steps,
+        on_progress=update_status,
+        on_result=lambda result: deliver_results(message.chat.id, update_status, result),
+        on_error=report_error,
+        job_id=video_id,
+        key=video_id
+    )
+
+
+def unless_transcribed(status_text):
+    """Status for a step that is skipped once a transcription exists"""
+    return lambda state: None if state and state.get('transcription') else status_text
+
+
+def skip_if_transcribed(fn):
+    """Wrap an audio step so it passes the state through once a transcription exists"""
+    return lambda state: state if state and state.get('transcription') else fn(state)
+
+
+def captions_stage(youtube_url, video_id):
+    """Job step 0: reuse a stored transcript or the video's YouTube captions"""
+    state = {'video_id': video_id, 'audio_file_path': None, 'transcript_name': f"audio_{video_id}"}
+    
+    transcription = transcription_service.get_cached_transcription(state['transcript_name'])
+    if not transcription:
         try:
-            bot.edit_message_text(
-                f"❌ Error: {str(e)}",
-                message.chat.id,
-                status_message.message_id
-            )
-        except:
-            bot.reply_to(message, f"❌ Error: {str(e)}")
+            transcription = youtube_downloader.fetch_captions(youtube_url)
+        except Exception as e:
+            logger.warning(f"Captions unavailable, falling back to Whisper: {e}")
+        if transcription:
+            transcription_service.save_transcription(state['transcript_name'], transcription, source="youtube captions")
+            logger.info(f"Using YouTube captions, length: {len(transcription)} chars")
+    
+    if transcription:
+        state['transcription'] = transcription
+        release_audio(video_id)
+    return state
+
+
+def release_audio(video_id):
+    """Audio is only needed until the transcript is stored; delete it in the background"""
+    if not KEEP_AUDIO_AFTER_TRANSCRIPT:
+        eviction_manager.transcript_committed(video_id)
+
+
+def download_stage(youtube_url, video_id):
+    """Job step 1: download audio"""
+    audio_file_path = youtube_downloader.download_audio(youtube_url)
+    logger.info(f"Audio ready: {audio_file_path}")
+    eviction_manager.request_eviction()
+    return {
+        'video_id': video_id,
+        'audio_file_path': audio_file_path,
+        'transcript_name': transcript_base_name(audio_file_path)
+    }
+
+
+def streaming_stage(youtube_url, video_id):
+    """Job steps 1+2 (streaming): transcribe audio while it downloads"""
+    state = {'video_id': video_id, 'audio_file_path': None, 'transcript_name': f"audio_{video_id}"}
+    try:
+        state['transcription'] = transcription_service.transcribe_stream(youtube_url, state['transcript_name'])
+    except Exception as e:
+        logger.warning(f"Streaming failed, falling back to download-then-transcribe: {e}")
+        return transcription_stage(download_stage(youtube_url, video_id))
+    
+    logger.info(f"Streaming transcription completed, length: {len(state['transcription'])} chars")
+    return state
+
+
+def transcription_stage(state):
+    """Job step 2: transcribe audio"""
+    state['transcription'] = transcription_service.transcribe_audio(state['audio_file_path'])
+    logger.info(f"Transcription completed, length: {len(state['transcription'])} chars")
+    release_audio(state['video_id'])
+    return state
+
+
+def summarization_stage(state):
+    """Job step 3: summarize text, showing the summary in the status message as it streams in"""
+    job = current_job()
+    
+    def show_partial_summary(text):
+        # Telegram messages are limited to 4096 chars; show the latest part
+        preview = text if len(text) <= 3500 else f"...{text[-3500:]}"
+        job.set_status(f"✍️ Writing summary...\n\n{preview}", min_interval=SUMMARY_STREAM_EDIT_INTERVAL)
+    
+    summary, service_used = smart_summarize(
+        compact_for_summary(state), video_id=state['video_id'], on_text=show_partial_summary if job else None
+    )
+    logger.info(f"Summary completed using {service_used}, length: {len(summary)} chars")
+    state['summary'] = summary
+    state['service_used'] = service_used
+    return state
+
+
+def compact_for_summary(state):
+    """Transcript text to summarize: repetition loops and filler stripped when enabled"""
+    text = state['transcription']
+    if not TRANSCRIPT_COMPACTION:
+        return text
+    # A cached summary is returned without a completion, so there are no tokens to save
+    if openrouter_service.is_initialized and openrouter_service.get_cached_summary(state['video_id']):
+        return text
+    try:
+        result = compact_transcript(text)
+    except Exception as e:
+        logger.warning(f"Transcript compaction failed, summarizing the full text: {e}")
+        return text
+    
+    # Don't let compaction turn a short transcript into nothing
+    if len(result['text'].strip()) < 50:
+        return text
+    compaction_stats.record(state['video_id'], result)
+    state['tokens_saved'] = result['tokens_saved']
+    return result['text']
+
+
+def deliver_results(chat_id, update_status, state):
+    """Send summary and transcription button for a finished job"""
+    service_used = state['service_used']
+    
+    # Send results
+    update_status("✅ Processing completed!")
+    
+    # Send summary with robust chunking and Telegraph fallback
+    summary_text = f"🎥 **Video Summary** (via {service_used}):\n\n{state['summary']}"
+    send_summary_chunks(chat_id, summary_text, service_used)
+    
+    # Offer to send full transcription
+    markup = types.InlineKeyboardMarkup()
+    transcription_btn = types.InlineKeyboardButton(
+        "📝 Get Full Transcription",
+        callback_data=f"transcription_{state['transcript_name']}"
+    )
+    markup.add(transcription_btn)
+    
+    outbox.send(
+        chat_id,
+        "Would you like to see the full transcription?",
+        reply_markup=markup
+    )
 
 
 @bot.callback_query_handler(func=lambda call: call.data.startswith('transcription_'))
@@ -253,13 +320,10 @@ def handle_transcription_request(call):
     """Handle transcription button callback"""
     try:
         audio_filename = call.data.replace('transcription_', '')
-        base_name = os.path.splitext(audio_filename)[0]
-        txt_file = os.path.join(transcription_service.transcriptions_dir, f"{base_name}.txt")
+        base_name = transcript_base_name(audio_filename)
+        transcription = transcription_service.get_cached_transcription(base_name)
         
-        if os.path.exists(txt_file):
-            with open(txt_file, 'r', encoding='utf-8') as f:
-                transcription = f.read().strip()
-            
+        if transcription:
             # Check if transcription is too long for Telegram (4096 char limit)
             if len(transcription) > 3500:  # Leave some room for formatting
                 # Create Telegraph page for long transcription
@@ -267,7 +331,7 @@ def handle_transcription_request(call):
                 page_title = f"Transcription - Video {video_id}"
                 
                 # Try to get original YouTube URL for reference
-                youtube_url = f"https://youtube.com/watch?v={video_id}"
+                youtube_url = canonical_url(video_id)
                 
                 telegraph_url = telegraph_service.create_page(
                     title=page_title,
@@ -276,7 +340,7 @@ def handle_transcription_request(call):
                 )
                 
                 if telegraph_url:
-                    bot.send_message(
+                    outbox.send(
                         call.message.chat.id,
                         f"📝 **Full Transcription**\n\n"
                         f"The transcription is too long for Telegram ({len(transcription)} characters).\n"
@@ -285,20 +349,20 @@ def handle_transcription_request(call):
                     )
                 else:
                     # Fallback to chunked messages if Telegraph fails
-                    bot.send_message(
+                    outbox.send(
                         call.message.chat.id,
                         "📝 **Full Transcription** (Telegraph failed, sending in chunks):"
                     )
                     send_transcription_chunks(call.message.chat.id, transcription)
             else:
                 # Send directly if short enough
-                bot.send_message(
+                outbox.send(
                     call.message.chat.id,
                     f"📝 **Full Transcription:**\n\n{transcription}",
                     parse_mode='Markdown'
                 )
         else:
-            bot.send_message(call.message.chat.id, "Transcription file not found.")
+            outbox.send(call.message.chat.id, "Transcription file not found.")
             
         bot.answer_callback_query(call.id)
         
@@ -308,64 +372,30 @@ def handle_transcription_request(call):
 
 
 def send_transcription_chunks(chat_id, transcription):
-    """Send transcription in chunks if Telegraph fails"""
-    try:
-        chunk_size = 3500
-        chunks = [transcription[i:i+chunk_size] for i in range(0, len(transcription), chunk_size)]
-        
-        for i, chunk in enumerate(chunks):
-            prefix = f"**Part {i+1}/{len(chunks)}:**\n\n" if len(chunks) > 1 else ""
-            bot.send_message(chat_id, f"{prefix}{chunk}", parse_mode='Markdown')
-    except Exception as e:
-        logger.error(f"Error sending chunks: {e}")
-        # Final fallback - plain text
-        bot.send_message(chat_id, transcription)
-
-
-def cleanup_files(audio_file_path, force_cleanup=False):
-    """Clean up downloaded files - by default keeps files for reuse"""
-    try:
-        if not force_cleanup:
-            logger.info(f"Keeping files for reuse: {audio_file_path}")
-            return
-            
-        # Remove audio file only if force_cleanup is True
-        if os.path.exists(audio_file_path):
-            os.remove(audio_file_path)
-            logger.info(f"Cleaned up audio file: {audio_file_path}")
-        
-        # Clean up transcription files only if force_cleanup is True
-        transcription_service.cleanup_transcription_files(audio_file_path)
-        logger.info("Cleaned up transcription files")
-        
-    except Exception as e:
-        logger.error(f"Cleanup error: {e}")
+    """Send transcription in chunks if Telegraph fails (parts are queued back to back)"""
+    chunk_size = 3500
+    chunks = [transcription[i:i+chunk_size] for i in range(0, len(transcription), chunk_size)]
+    outbox.send_parts(chat_id, [
+        f"**Part {i+1}/{len(chunks)}:**\n\n{chunk}" if len(chunks) > 1 else chunk
+        for i, chunk in enumerate(chunks)
+    ], parse_mode='Markdown')
 
 
 @bot.message_handler(commands=['cleanup'])
 def cleanup_command(message):
     """Handle cleanup command"""
     try:
-        # Count files before cleanup
-        audio_files = len([f for f in os.listdir(DOWNLOADS_DIR) if f.endswith('.mp3')])
-        txt_files = len([f for f in os.listdir(TRANSCRIPTIONS_DIR) if f.endswith('.txt')])
+        # Files come from the artifact index; videos being processed are left alone
+        audio_only = (message.text or '').split()[1:2] == ['audio']
+        artifacts = eviction_manager.evict_all((AUDIO,) if audio_only else (AUDIO, TRANSCRIPT, SUBTITLES))
         
-        # Clean up all files
-        for filename in os.listdir(DOWNLOADS_DIR):
-            if filename.endswith('.mp3'):
-                file_path = os.path.join(DOWNLOADS_DIR, filename)
-                os.remove(file_path)
-        
-        for filename in os.listdir(TRANSCRIPTIONS_DIR):
-            if filename.endswith('.txt'):
-                file_path = os.path.join(TRANSCRIPTIONS_DIR, filename)
-                os.remove(file_path)
-        
-        bot.reply_to(message, f"🧹 Cleanup complete!\nRemoved {audio_files} audio files and {txt_files} transcription files.")
+        audio_files = sum(1 for artifact in artifacts if artifact['kind'] == AUDIO)
+        txt_files = sum(1 for artifact in artifacts if artifact['kind'] == TRANSCRIPT)
+        outbox.reply_to(message, f"🧹 Cleanup complete!\nRemoved {audio_files} audio files and {txt_files} transcription files.")
         
     except Exception as e:
         logger.error(f"Cleanup command error: {e}")
-        bot.reply_to(message, f"❌ Cleanup failed: {str(e)}")
+        outbox.reply_to(message, f"❌ Cleanup failed: {str(e)}")
 
 
 @bot.message_handler(commands=['chunks'])
@@ -376,16 +406,13 @@ def chunks_command(message):
         args = message.text.split()[1:] if len(message.text.split()) > 1 else []
         
         if not args:
-            bot.reply_to(message, "❌ Please provide a YouTube URL or video ID.\nExample: `/chunks https://youtube.com/watch?v=VIDEO_ID`")
+            outbox.reply_to(message, "❌ Please provide a YouTube URL or video ID.\nExample: `/chunks https://youtube.com/watch?v=VIDEO_ID`")
             return
         
         url_or_id = args[0]
         
-        # Extract video ID if it's a URL
-        if 'youtube.com' in url_or_id or 'youtu.be' in url_or_id:
-            video_id = extract_video_id(url_or_id)
-        else:
-            video_id = url_or_id
+        # Extract the canonical video ID from a URL
+        video_id = extract_video_id(url_or_id) or url_or_id
         
         # Try to get cached chunk summaries
         chunk_summaries = openrouter_service.get_cached_chunk_summaries(video_id)
@@ -393,49 +420,146 @@ def chunks_command(message):
         if chunk_summaries:
             response = f"📝 **Cached Chunk Summaries for {video_id}:**\n\n"
             
+            # Show gaps left by failed chunks (retried on the next request)
+            chunk_status = openrouter_service.get_chunk_status(video_id)
+            if chunk_status and chunk_status['ok'] < chunk_status['total']:
+                response += f"⚠️ Coverage: {chunk_status['ok']}/{chunk_status['total']} chunks summarized\n\n"
+            
             for i, chunk_summary in enumerate(chunk_summaries, 1):
                 response += f"**Chunk {i}:**\n{chunk_summary}\n\n"
             
             # Use robust chunking for long responses
-            send_summary_chunks(bot, message.chat.id, response, "Cache")
+            send_summary_chunks(message.chat.id, response, "Cache")
         else:
-            bot.reply_to(message, f"❌ No cached chunk summaries found for video ID: {video_id}")
+            outbox.reply_to(message, f"❌ No cached chunk summaries found for video ID: {video_id}")
         
     except Exception as e:
         logger.error(f"Chunks command error: {e}")
-        bot.reply_to(message, f"❌ Chunks retrieval failed: {str(e)}")
+        outbox.reply_to(message, f"❌ Chunks retrieval failed: {str(e)}")
 
 
 @bot.message_handler(commands=['status'])
 def status_command(message):
     """Handle status command"""
     try:
-        # Count cached files
-        audio_files = [f for f in os.listdir(DOWNLOADS_DIR) if f.endswith('.mp3')]
-        txt_files = [f for f in os.listdir(TRANSCRIPTIONS_DIR) if f.endswith('.txt')]
+        # Cached files per kind from the artifact index
+        artifacts = artifact_index.get_stats()
         
-        # Calculate total size
-        total_size = 0
-        for filename in audio_files:
-            file_path = os.path.join(DOWNLOADS_DIR, filename)
-            total_size += os.path.getsize(file_path)
+        def files(kind):
+            return artifacts.get(kind, {}).get('files', 0)
         
-        size_mb = total_size / (1024 * 1024)
+        def size_mb(*kinds):
+            return sum(stats['bytes'] for kind, stats in artifacts.items() if not kinds or kind in kinds) / (1024 * 1024)
+        
+        # Job queue state per stage
+        job_lines = "\n".join(
+            f"   {stage}: {stats['running']}/{stats['limit']} running, {stats['queued']} queued"
+            for stage, stats in job_scheduler.get_stats().items()
+        )
+        in_flight = job_scheduler.get_in_flight()
+        job_lines += f"\n   in flight: {in_flight['jobs']} videos, {in_flight['coalesced']} requests coalesced"
+        
+        # Outgoing API calls per host
+        http_lines = "\n".join(
+            f"   {host}: {stats['requests']} requests, {stats['retries']} retries, {stats['errors']} errors, "
+            f"avg {stats['avg_ms']} ms, max {stats['max_ms']} ms"
+            for host, stats in shared_client.get_stats().items()
+        ) or "   no requests yet"
+        
+        compaction = compaction_stats.get_stats()
+        
+        # Disk budgets per cache tier and background eviction
+        usage = eviction_manager.get_usage()
+        eviction = eviction_manager.get_stats()
+        disk_lines = "\n".join(
+            f"   {tier}: {used / (1024 * 1024):.1f}"
+            + (f"/{eviction_manager.budgets[tier] / (1024 * 1024):.0f}" if eviction_manager.budgets.get(tier) else "")
+            + " MB"
+            for tier, used in usage.items()
+        )
+        disk_lines += (f"\n   evicted {eviction['evicted_files']} files ({eviction['evicted_bytes'] / (1024 * 1024):.1f} MB), "
+                       f"audio released after transcription: {eviction['audio_released']}")
+        
+        # In-memory cache in front of the summary and transcript files
+        memory_lines = "\n".join(
+            f"   {name}: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f}/{stats['max_bytes'] / (1024 * 1024):.0f} MB, "
+            f"{stats['evictions']} evicted"
+            for name, stats in (
+                ('summaries', openrouter_service.memory_cache.get_stats()),
+                ('transcripts', transcription_service.memory_cache.get_stats()),
+            )
+        )
+        
+        # How often a request found each artifact already cached (keyed by canonical video ID)
+        hit_lines = "\n".join(
+            f"   {kind}: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})"
+            for kind, stats in cache_hit_stats.get_stats().items()
+        ) or "   no lookups yet"
+        
+        telegram = outbox.get_stats()
+        
+        # Answer latency per OpenRouter model and how often requests were hedged
+        latency = openrouter_service.get_latency_stats()
+        model_lines = "\n".join(
+            f"   {model}: p50 {stats['p50']:.1f}s, p90 {stats['p90']:.1f}s, p99 {stats['p99']:.1f}s "
+            f"({stats['samples']} answers)"
+            for model, stats in latency['models'].items()
+            if stats['samples']
+        ) or "   no answers yet"
+        model_lines += (f"\n   hedged {latency['hedged']} of {latency['requests']} requests, "
+                        f"backup won {latency['hedge_wins']}")
+        
+        # Summarization backends and their circuit breakers
+        backend_lines = "\n".join(
+            f"   {name}: {stats['state']}, {stats['calls']} calls, {stats['failures']} failures, "
+            f"{stats['slow_calls']} slow, {stats['rejected']} skipped, opened {stats['opened']}x"
+            for name, stats in (
+                ('OpenRouter', openrouter_service.breaker.get_stats()),
+                ('HuggingFace', summarization_service.breaker.get_stats()),
+            )
+        )
         
         status_text = f"""
 📊 Cache Status:
-🎵 Audio files: {len(audio_files)}
-📝 Transcription files: {len(txt_files)}
-💾 Total size: {size_mb:.1f} MB
+🎵 Audio files: {files(AUDIO)} ({size_mb(AUDIO):.1f} MB)
+📝 Transcription files: {files(TRANSCRIPT)} ({size_mb(TRANSCRIPT, SUBTITLES):.1f} MB)
+🧾 Summaries: {files(SUMMARY)}, chunk summaries: {files(CHUNK)} ({size_mb(SUMMARY, CHUNK_SUMMARIES, CHUNK):.1f} MB)
+💾 Total size: {size_mb():.1f} MB
+
+⚙️ Jobs:
+{job_lines}
+
+🌐 API calls:
+{http_lines}
+
+🔌 Summarization backends:
+{backend_lines}
+
+⏱️ Model latency:
+{model_lines}
+
+🗄️ Disk budgets:
+{disk_lines}
+
+🧠 Memory cache:
+{memory_lines}
+
+🎯 Cache hits:
+{hit_lines}
+
+📤 Telegram output: {telegram['sent']} messages, {telegram['edited']} edits, {telegram['queued']} queued, {telegram['coalesced']} edits coalesced, {telegram['merged']} parts merged, {telegram['rate_limited']} rate limited
+
+✂️ Transcript compaction: {compaction['tokens_saved']} tokens saved on {compaction['videos']} videos ({compaction['saved_share']:.0%})
 
 Use /cleanup to clear cache if needed.
         """
         
-        bot.reply_to(message, status_text)
+        outbox.reply_to(message, status_text)
         
     except Exception as e:
         logger.error(f"Status command error: {e}")
-        bot.reply_to(message, f"❌ Status check failed: {str(e)}")
+        outbox.reply_to(message, f"❌ Status check failed: {str(e)}")
 
 
 @bot.message_handler(commands=['services'])
@@ -451,44 +575,73 @@ def services_command(message):
 **Primary Service:**
 🔹 **OpenRouter** ({openrouter_info['model']})
    Status: {'✅ Ready' if openrouter_info['initialized'] else '❌ Not configured'}
+   Circuit: {openrouter_info['circuit'].replace('_', '-')}
    
 **Fallback Service:**
 🔹 **HuggingFace** (RuT5 Base Gazeta)
    Status: ✅ Ready
+   Circuit: {summarization_service.breaker.state.replace('_', '-')}
+
+**Transcription:**
+🔹 **Whisper.cpp** ({'resident server' if whisper_server.is_running() else 'whisper-cli'})
+   Server restarts: {whisper_server.restarts}
 
 **Service Selection:**
-The bot automatically tries OpenRouter first for better quality summaries, then falls back to HuggingFace if needed.
+The bot automatically tries OpenRouter first for better quality summaries, then falls back to HuggingFace if needed. A backend that keeps failing is skipped for a while (circuit open) and probed again later.
 
 To configure OpenRouter: Add your API key to OPENROUTER_API_KEY in .env file.
 Get free API key at: https://openrouter.ai/
         """
         
-        bot.reply_to(message, services_text, parse_mode='Markdown')
+        outbox.reply_to(message, services_text, parse_mode='Markdown')
         
     except Exception as e:
         logger.error(f"Services command error: {e}")
-        bot.reply_to(message, f"❌ Services check failed: {str(e)}")
+        outbox.reply_to(message, f"❌ Services check failed: {str(e)}")
 
 
-def smart_summarize(text, video_id=None):
-    """Smart summarization with OpenRouter primary and HuggingFace fallback"""
+# Registered after the command handlers: telebot runs only the first handler
+# that matches, so a catch-all registered earlier would swallow /status etc.
+@bot.message_handler(func=lambda message: True)
+def handle_message(message):
+    """Handle all messages"""
+    try:
+        text = message.text.strip()
+        
+        # Check if message contains a YouTube URL (any form: watch, youtu.be, shorts, live...)
+        if extract_video_id(text, allow_bare_id=False):
+            process_youtube_video(message, text)
+        else:
+            outbox.reply_to(message, "Please send a valid YouTube video URL.")
+            
+    except Exception as e:
+        logger.error(f"Error handling message: {e}")
+        outbox.reply_to(message, f"An error occurred: {str(e)}")
+
+
+def smart_summarize(text, video_id=None, on_text=None):
+    """Smart summarization with OpenRouter primary and HuggingFace fallback.
+    A backend whose circuit is open is skipped without waiting on it."""
     try:
         # Try OpenRouter first
         if openrouter_service.is_initialized:
-            logger.info("Attempting summarization with OpenRouter...")
-            summary = openrouter_service.summarize_text(text, video_id=video_id)
-            
-            # Check if OpenRouter succeeded
-            if summary and not any(error in summary.lower() for error in [
-                'failed', 'error', 'timeout', 'not configured'
-            ]):
-                logger.info("✅ OpenRouter summarization successful")
-                return summary, "OpenRouter (DeepSeek R1)"
+            if openrouter_service.breaker.is_available():
+                logger.info("Attempting summarization with OpenRouter...")
+                result = openrouter_service.summarize(text, video_id=video_id, on_text=on_text)
+                if result.ok:
+                    logger.info("✅ OpenRouter summarization successful")
+                    return result.text, "OpenRouter (DeepSeek R1)"
+                logger.warning(f"OpenRouter summarization failed: {result.error}")
+            else:
+                logger.info("OpenRouter circuit open, skipping it")
         
         # Fallback to HuggingFace
         logger.info("Falling back to HuggingFace summarization...")
-        hf_summary = summarization_service.summarize_text(text)
-        return hf_summary, "HuggingFace (RuT5)"
+        result = summarization_service.summarize(text)
+        if result.ok:
+            return result.text, "HuggingFace (RuT5)"
+        logger.error(f"HuggingFace summarization failed: {result.error}")
+        return result.error, "Error"
         
     except Exception as e:
         logger.error(f"Smart summarization error: {e}")
@@ -503,10 +656,31 @@ def main():
     
     logger.info("Starting YouTube Summarizer Bot...")
     
+    # Index files cached before the artifact index existed (one directory scan)
+    if artifact_index.is_empty():
+        indexed = artifact_index.backfill({
+            'downloads': DOWNLOADS_DIR,
+            'transcriptions': TRANSCRIPTIONS_DIR,
+            'cache': openrouter_service.cache_dir,
+            'chunks': openrouter_service.chunk_cache_dir,
+        })
+        logger.info(f"Indexed {indexed} existing cache files")
+    eviction_manager.start()
+    outbox.start()
+    
+    # Load the whisper model once and keep it resident
+    if TRANSCRIPTION_BACKEND == 'server':
+        whisper_server.start()
+    
     try:
         bot.infinity_polling(timeout=10, long_polling_timeout=5)
     except Exception as e:
         logger.error(f"Bot polling error: {e}")
+    finally:
+        job_scheduler.shutdown(wait=False)
+        eviction_manager.stop()
+        outbox.stop()
+        whisper_server.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,46 @@
+import hashlib
+import os
+
+from config import CACHE_LEGACY_LOOKUP
+
+# Cached files live in shard directories named after the leading hex digits of
+# the SHA-1 of their key (the video id, or the content hash for chunk summaries):
+#   downloads/3f/a2/audio_<id>.16k.wav
+# Two levels of 256 keep every directory small well past a million videos.
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def shard_dir(base_dir, key):
+    """Shard directory of a key under base_dir"""
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(base_dir, *(digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)))
+
+
+def shard_path(base_dir, key, filename, create=False):
+    """Path of a cached file in its key's shard, creating the shard directory if asked"""
+    directory = shard_dir(base_dir, key)
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def lookup_paths(base_dir, key, filename):
+    """Where a cached file may be: its shard, then the legacy flat directory until migrated"""
+    paths = [shard_path(base_dir, key, filename)]
+    if CACHE_LEGACY_LOOKUP:
+        paths.append(os.path.join(base_dir, filename))
+    return paths
+
+
+def find_existing(base_dir, key, filename):
+    """Path of the cached file if it exists (sharded or legacy), else None"""
+    for path in lookup_paths(base_dir, key, filename):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def is_shard_dir(name):
+    """Whether a directory name is a shard level (used when scanning cache directories)"""
+    return len(name) == SHARD_WIDTH and all(c in '0123456789abcdef' for c in name)
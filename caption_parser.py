@@ -0,0 +1,59 @@
+import html
+import re
+import xml.etree.ElementTree as ET
+
+
+def _clean_caption_line(line):
+    """Strip inline timestamps, styling tags and entities from a caption line"""
+    line = re.sub(r'<\d{2}:\d{2}:\d{2}\.\d{3}>', '', line)
+    line = re.sub(r'</?[^>]+>', '', line)
+    line = html.unescape(line)
+    return re.sub(r'\s+', ' ', line).strip()
+
+
+def _join_lines(lines):
+    """Join caption lines, dropping the rolling repeats of auto-generated captions"""
+    result = []
+    for line in lines:
+        if not line or (result and result[-1] == line):
+            continue
+        result.append(line)
+    return '\n'.join(result)
+
+
+def parse_vtt(vtt_text):
+    """Parse WebVTT subtitles (manual or YouTube auto-generated) into plain text"""
+    lines = []
+    in_cue = False
+    for line in vtt_text.splitlines():
+        if '-->' in line:
+            in_cue = True
+            continue
+        # Only a truly empty line ends a cue; auto captions use ' ' lines inside cues
+        if not line:
+            in_cue = False
+            continue
+        if in_cue:
+            lines.append(_clean_caption_line(line))
+    return _join_lines(lines)
+
+
+def parse_srv(srv_text):
+    """Parse YouTube srv1/srv2/srv3 timed-text XML into plain text"""
+    root = ET.fromstring(srv_text)
+    lines = []
+    # srv1 uses <text>, srv3 uses <p> (optionally with word-level <s> children)
+    for element in root.iter():
+        if element.tag in ('text', 'p'):
+            content = ''.join(element.itertext())
+            lines.append(_clean_caption_line(content))
+    return _join_lines(lines)
+
+
+def parse_captions(text, ext):
+    """Parse a caption file by its extension (vtt, srv1, srv2, srv3)"""
+    if ext == 'vtt':
+        return parse_vtt(text)
+    if ext.startswith('srv'):
+        return parse_srv(text)
+    raise ValueError(f"Unsupported caption format: {ext}")
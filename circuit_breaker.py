@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class BackendResult:
+    """Typed outcome of a backend call: a summary, or an error that says whose fault it was"""
+
+    def __init__(self, ok, text=None, error=None, fault=True):
+        self.ok = ok
+        self.text = text
+        self.error = error
+        self.fault = fault  # False for input problems and skipped calls; the backend itself is fine
+
+    @classmethod
+    def success(cls, text):
+        return cls(True, text=text)
+
+    @classmethod
+    def failure(cls, error, fault=True):
+        return cls(False, error=error, fault=fault)
+
+    def __repr__(self):
+        return f"BackendResult(ok={self.ok}, {'text' if self.ok else 'error'}={(self.text if self.ok else self.error)!r})"
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    Closed: calls go through. failure_threshold consecutive failures (calls
+    slower than slow_call_seconds count as failures) open the circuit.
+    Open: calls are rejected immediately for recovery_seconds.
+    Half-open: one probe call is let through; its success closes the
+    circuit, its failure opens it again for another recovery_seconds.
+    Calls allowed to wait are held until the probe's outcome instead of
+    being rejected, so the chunks of one video don't fail next to a probe
+    that succeeds.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_seconds=60, slow_call_seconds=None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._probe_done = threading.Condition(self._lock)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Circuit {self.name}: half-open, probing for recovery")
+        return self._state
+
+    def is_available(self):
+        """Whether a call could go through now, or once the half-open probe succeeds (doesn't take the probe)"""
+        with self._lock:
+            return self._current_state() != OPEN
+
+    def allow_request(self, wait=None):
+        """
+        Take permission for one call; every allowed call must be followed by
+        record/record_success/record_failure/release. With wait (seconds), a
+        call arriving while the half-open probe is in flight waits for its
+        outcome: it goes through if the probe closed the circuit (or ended
+        without a verdict) and is rejected if the probe opened it again.
+        """
+        with self._lock:
+            state = self._current_state()
+            if wait and state == HALF_OPEN and self._probe_in_flight:
+                self._probe_done.wait_for(
+                    lambda: not (self._current_state() == HALF_OPEN and self._probe_in_flight),
+                    timeout=wait
+                )
+                state = self._current_state()
+            if state == CLOSED:
+                allowed = True
+            elif state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                allowed = True
+            else:
+                allowed = False
+            self._stats['calls' if allowed else 'rejected'] += 1
+            return allowed
+
+    def record(self, result, latency=0.0):
+        """Record an allowed call by its BackendResult: only faults of the backend count as failures"""
+        if result.ok:
+            self.record_success(latency)
+        elif result.fault:
+            self.record_failure()
+        else:
+            self.release()
+
+    def release(self):
+        """End an allowed call that says nothing about the backend's health (a bad request, say)"""
+        with self._lock:
+            self._probe_in_flight = False
+            self._probe_done.notify_all()
+
+    def record_success(self, latency=0.0):
+        """The backend answered; slow answers still count against it"""
+        if self.slow_call_seconds and latency > self.slow_call_seconds:
+            with self._lock:
+                self._stats['slow_calls'] += 1
+            logger.warning(f"Circuit {self.name}: slow call ({latency:.1f}s)")
+            self.record_failure(count=False)
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit {self.name}: closed, backend recovered")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._probe_done.notify_all()
+
+    def record_failure(self, count=True):
+        with self._lock:
+            if count:
+                self._stats['failures'] += 1
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self._stats['opened'] += 1
+                logger.warning(f"Circuit {self.name}: open after {self._failures} consecutive failures, "
+                               f"retrying in {self.recovery_seconds}s")
+            self._probe_done.notify_all()
+
+    def get_stats(self):
+        with self._lock:
+            return {'state': self._current_state(), 'consecutive_failures': self._failures, **self._stats}
@@ -14,11 +14,127 @@ TELEGRAPH_TOKEN = os.getenv('TELEGRAPH_TOKEN')
 WHISPER_CLI_PATH = os.getenv('WHISPER_CLI_PATH', './whisper.cpp/build/bin/whisper-cli')
 WHISPER_MODEL_PATH = os.getenv('WHISPER_MODEL_PATH', './whisper.cpp/models/ggml-small.bin')
 YT_DLP_PATH = os.getenv('YT_DLP_PATH', './yt-dlp')
+WHISPER_SERVER_PATH = os.getenv('WHISPER_SERVER_PATH', './whisper.cpp/build/bin/whisper-server')
+FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
+FFPROBE_PATH = os.getenv('FFPROBE_PATH', 'ffprobe')
+
+# Transcription backend: 'server' keeps the whisper model resident, 'cli' spawns whisper-cli per job
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'server')
+WHISPER_SERVER_HOST = os.getenv('WHISPER_SERVER_HOST', '127.0.0.1')
+WHISPER_SERVER_PORT = int(os.getenv('WHISPER_SERVER_PORT', '8178'))
+WHISPER_SERVER_STARTUP_TIMEOUT = int(os.getenv('WHISPER_SERVER_STARTUP_TIMEOUT', '60'))
+
+# Transcription mode: 'segmented' splits long audio at silences and transcribes segments in parallel
+TRANSCRIPTION_MODE = os.getenv('TRANSCRIPTION_MODE', 'segmented')
+SEGMENT_MIN_SECONDS = int(os.getenv('SEGMENT_MIN_SECONDS', '300'))
+SEGMENT_MAX_SECONDS = int(os.getenv('SEGMENT_MAX_SECONDS', '600'))
+SEGMENT_THREADS = int(os.getenv('SEGMENT_THREADS', '4'))  # whisper threads per segment
+SEGMENT_WORKERS = int(os.getenv('SEGMENT_WORKERS', '0'))  # 0 = cpu_count / SEGMENT_THREADS
+
+# Streaming pipeline: pipe yt-dlp through ffmpeg and transcribe segments while downloading
+STREAMING_PIPELINE = os.getenv('STREAMING_PIPELINE', 'true').lower() == 'true'
+
+# Downloaded audio format: 'wav16k' decodes once to whisper's 16 kHz mono input,
+# 'native' keeps the original stream, 'mp3' is the legacy re-encode
+AUDIO_FORMAT = os.getenv('AUDIO_FORMAT', 'wav16k')
+
+# YouTube captions fast path: 'any' (manual or auto-generated), 'manual' only, or 'off'
+CAPTIONS_MODE = os.getenv('CAPTIONS_MODE', 'any')
+CAPTION_LANGUAGES = [lang.strip() for lang in os.getenv('CAPTION_LANGUAGES', 'ru,en').split(',') if lang.strip()]
+CAPTION_MIN_WORDS_PER_MINUTE = int(os.getenv('CAPTION_MIN_WORDS_PER_MINUTE', '30'))
 
 # Directories
 DOWNLOADS_DIR = os.getenv('DOWNLOADS_DIR', './downloads')
 TRANSCRIPTIONS_DIR = os.getenv('TRANSCRIPTIONS_DIR', './transcriptions')
 
+# Job scheduler: concurrent jobs per pipeline stage
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '2'))
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', '1'))
+SUMMARIZATION_WORKERS = int(os.getenv('SUMMARIZATION_WORKERS', '4'))
+
+# Shared HTTP client: retries on 429/5xx with jittered exponential backoff
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))  # seconds, doubled per retry
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '30'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # keep-alive connections per host
+HTTP_DEADLINE_SECONDS = float(os.getenv('HTTP_DEADLINE_SECONDS', '180'))  # per call, retries included
+
+# Stream summaries token by token and show them in the status message
+OPENROUTER_STREAMING = os.getenv('OPENROUTER_STREAMING', 'true').lower() == 'true'
+SUMMARY_STREAM_EDIT_INTERVAL = float(os.getenv('SUMMARY_STREAM_EDIT_INTERVAL', '1.5'))  # seconds between edits
+
+# Share of transcript chunks that must be summarized before the final summary is built
+# (1.0 = never accept gaps). Summaries with gaps are shown but not cached, so the
+# failed chunks are retried on the next request.
+SUMMARY_MIN_COVERAGE = float(os.getenv('SUMMARY_MIN_COVERAGE', '0.8'))
+
+# Hierarchical reduce: chunk summaries are merged in groups of at most
+# REDUCE_MAX_FAN_IN and REDUCE_TOKEN_BUDGET input tokens, level by level
+REDUCE_TOKEN_BUDGET = int(os.getenv('REDUCE_TOKEN_BUDGET', '12000'))
+REDUCE_MAX_FAN_IN = int(os.getenv('REDUCE_MAX_FAN_IN', '8'))
+
+# OpenRouter models, comma-separated. The first is the primary; when it hasn't started
+# answering within its HEDGE_PERCENTILE latency, the same request is also sent to the
+# next model and the first answer wins (the slower request is cancelled).
+# Until HEDGE_MIN_SAMPLES latencies are known, HEDGE_INITIAL_DELAY seconds is used.
+OPENROUTER_MODELS = [model.strip() for model in os.getenv('OPENROUTER_MODELS', 'deepseek/deepseek-r1-0528:free').split(',') if model.strip()]
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '90'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_INITIAL_DELAY = float(os.getenv('HEDGE_INITIAL_DELAY', '30'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '2'))
+
+# Chunk summaries in flight per API provider, shared by all jobs
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv('OPENROUTER_MAX_CONCURRENCY', '4'))
+
+# Strip whisper repetition loops, non-speech tags and filler from transcripts before
+# summarizing (the stored transcript is left untouched)
+TRANSCRIPT_COMPACTION = os.getenv('TRANSCRIPT_COMPACTION', 'true').lower() == 'true'
+
+# Optional local extractive stage for very long transcripts: above
+# EXTRACTIVE_THRESHOLD_TOKENS only the top-ranked sentences (TextRank), up to
+# EXTRACTIVE_TOKEN_BUDGET tokens, are sent to the LLM
+EXTRACTIVE_PRESUMMARY = os.getenv('EXTRACTIVE_PRESUMMARY', 'false').lower() == 'true'
+EXTRACTIVE_THRESHOLD_TOKENS = int(os.getenv('EXTRACTIVE_THRESHOLD_TOKENS', '60000'))
+EXTRACTIVE_TOKEN_BUDGET = int(os.getenv('EXTRACTIVE_TOKEN_BUDGET', '30000'))
+
+# Circuit breaker per summarization backend: after BREAKER_FAILURE_THRESHOLD consecutive
+# failures (calls slower than BREAKER_SLOW_CALL_SECONDS count too) the backend is skipped
+# for BREAKER_RECOVERY_SECONDS, then a single probe call decides whether it is back
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_RECOVERY_SECONDS = float(os.getenv('BREAKER_RECOVERY_SECONDS', '60'))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv('BREAKER_SLOW_CALL_SECONDS', '150'))
+
+# In-memory LRU in front of the file caches (summaries, chunk summaries, transcripts),
+# size budget per service
+MEMORY_CACHE_MB = int(os.getenv('MEMORY_CACHE_MB', '64'))
+
+# SQLite index of cached artifacts (audio, transcripts, summaries) used by /status and /cleanup
+ARTIFACT_INDEX_PATH = os.getenv('ARTIFACT_INDEX_PATH', './cache/artifacts.db')
+
+# Disk budgets per cache tier (MB, 0 = unlimited) and overall. Least recently used files are
+# evicted in the background, audio first; audio is deleted once its transcript is stored
+AUDIO_CACHE_MB = int(os.getenv('AUDIO_CACHE_MB', '2048'))
+TRANSCRIPT_CACHE_MB = int(os.getenv('TRANSCRIPT_CACHE_MB', '512'))
+SUMMARY_CACHE_MB = int(os.getenv('SUMMARY_CACHE_MB', '512'))
+CACHE_QUOTA_MB = int(os.getenv('CACHE_QUOTA_MB', '3072'))
+EVICTION_INTERVAL_SECONDS = float(os.getenv('EVICTION_INTERVAL_SECONDS', '60'))
+KEEP_AUDIO_AFTER_TRANSCRIPT = os.getenv('KEEP_AUDIO_AFTER_TRANSCRIPT', 'false').lower() == 'true'
+
+# Compression of stored transcripts and summaries: none, gzip or zstd (needs the zstandard
+# package, gzip is used without it). Files are written atomically with a checksum either way
+ARTIFACT_COMPRESSION = os.getenv('ARTIFACT_COMPRESSION', 'gzip').lower()
+
+# Cached files are sharded by a hash of the video id. Until migrate_cache_layout.py has moved
+# an old flat cache, lookups fall back to the flat directories; set to false afterwards
+CACHE_LEGACY_LOOKUP = os.getenv('CACHE_LEGACY_LOOKUP', 'true').lower() == 'true'
+
+# Outgoing Telegram messages and edits are paced by token buckets: overall and per chat
+# (messages per second, with a short per-chat burst), sent by a few background threads
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+TELEGRAM_SENDERS = int(os.getenv('TELEGRAM_SENDERS', '4'))
+
 # Ensure directories exist
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 os.makedirs(TRANSCRIPTIONS_DIR, exist_ok=True)
@@ -0,0 +1,183 @@
+import logging
+import os
+import queue
+import threading
+
+from artifact_index import (
+    artifact_index, AUDIO, TRANSCRIPT, SUBTITLES, SUMMARY, CHUNK_SUMMARIES, CHUNK_STATUS, CHUNK
+)
+from config import (
+    AUDIO_CACHE_MB, TRANSCRIPT_CACHE_MB, SUMMARY_CACHE_MB, CACHE_QUOTA_MB, EVICTION_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Eviction tiers in order: audio goes first, transcripts and summaries last
+TIERS = [
+    ('audio', (AUDIO,)),
+    ('transcripts', (TRANSCRIPT, SUBTITLES)),
+    ('summaries', (SUMMARY, CHUNK_SUMMARIES, CHUNK_STATUS, CHUNK)),
+]
+
+# Artifacts fetched from the index per eviction query
+BATCH_SIZE = 200
+
+
+class EvictionManager:
+    """
+    Background eviction of cached files. Each tier is kept within its byte
+    budget by deleting its least recently used files; when the total is still
+    over the quota, tiers are emptied in order (audio first). Files of videos
+    that are being processed are never evicted. All deletions happen on the
+    manager's own thread, so request handling never waits for them.
+    """
+
+    def __init__(self, index=artifact_index, budgets=None, quota_bytes=CACHE_QUOTA_MB * MB,
+                 interval=EVICTION_INTERVAL_SECONDS, in_use=None, on_evict=None):
+        self.index = index
+        self.budgets = budgets or {
+            'audio': AUDIO_CACHE_MB * MB,
+            'transcripts': TRANSCRIPT_CACHE_MB * MB,
+            'summaries': SUMMARY_CACHE_MB * MB,
+        }
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.in_use = in_use or (lambda video_id: False)  # video_id -> bool
+        self.on_evict = on_evict  # Called with each evicted artifact, e.g. to drop in-memory copies
+        self._requests = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'evicted_files': 0, 'evicted_bytes': 0, 'audio_released': 0, 'errors': 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="eviction", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def request_eviction(self):
+        """Ask for an eviction pass soon (e.g. after a large download)"""
+        self._requests.put(('evict',))
+
+    def transcript_committed(self, video_id):
+        """The video's transcript is stored: its audio is no longer needed"""
+        self._requests.put(('release_audio', video_id))
+
+    def _run(self):
+        while True:
+            try:
+                request = self._requests.get(timeout=self.interval)
+            except queue.Empty:
+                request = ('evict',)
+            if request is None:
+                return
+            try:
+                if request[0] == 'release_audio':
+                    self.release_audio(request[1])
+                else:
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Eviction failed: {e}")
+
+    def release_audio(self, video_id):
+        """Delete a video's audio files now; returns the number deleted"""
+        released = len(self._delete(self.index.find(kinds=(AUDIO,), video_id=video_id)))
+        with self._lock:
+            self._stats['audio_released'] += released
+        if released:
+            logger.info(f"Released audio of {video_id}, transcript is stored")
+        return released
+
+    def evict_all(self, kinds):
+        """Delete every file of the given kinds that isn't in use; returns the artifacts removed"""
+        artifacts = [
+            artifact for artifact in self.index.find(kinds=kinds)
+            if not (artifact['video_id'] and self.in_use(artifact['video_id']))
+        ]
+        return self._delete(artifacts)
+
+    def run_once(self):
+        """One eviction pass; returns {tier: bytes in use} afterwards"""
+        usage = self.get_usage()
+
+        for name, kinds in TIERS:
+            budget = self.budgets.get(name)
+            if budget and usage[name] > budget:
+                usage[name] -= self._evict(kinds, usage[name] - budget)
+
+        if self.quota_bytes:
+            for name, kinds in TIERS:
+                excess = sum(usage.values()) - self.quota_bytes
+                if excess <= 0:
+                    break
+                usage[name] -= self._evict(kinds, excess)
+
+        with self._lock:
+            self._stats['runs'] += 1
+        return usage
+
+    def get_usage(self):
+        """Bytes in use per tier, from the artifact index"""
+        stats = self.index.get_stats()
+        return {
+            name: sum(stats.get(kind, {}).get('bytes', 0) for kind in kinds)
+            for name, kinds in TIERS
+        }
+
+    def _evict(self, kinds, needed):
+        """Delete least recently used files of the given kinds until `needed` bytes are freed"""
+        freed = 0
+        skipped = set()  # In use, or failed to delete
+        while freed < needed:
+            candidates = [
+                artifact for artifact in self.index.find(kinds=kinds, limit=BATCH_SIZE + len(skipped))
+                if artifact['path'] not in skipped
+            ]
+            batch, planned = [], freed
+            for artifact in candidates:
+                if planned >= needed:
+                    break
+                if artifact['video_id'] and self.in_use(artifact['video_id']):
+                    skipped.add(artifact['path'])
+                    continue
+                batch.append(artifact)
+                planned += artifact['size']
+            if not batch:
+                break  # Nothing left that may be evicted
+            deleted = self._delete(batch)
+            skipped.update(artifact['path'] for artifact in batch if artifact not in deleted)
+            freed += sum(artifact['size'] for artifact in deleted)
+        return freed
+
+    def _delete(self, artifacts):
+        """Delete files and their index entries; returns the artifacts removed"""
+        deleted = []
+        for artifact in artifacts:
+            try:
+                os.remove(artifact['path'])
+            except FileNotFoundError:
+                pass  # Already gone, just drop the index entry
+            except OSError as e:
+                logger.error(f"Failed to evict {artifact['path']}: {e}")
+                with self._lock:
+                    self._stats['errors'] += 1
+                continue
+            deleted.append(artifact)
+            if self.on_evict:
+                self.on_evict(artifact)
+        self.index.remove([artifact['path'] for artifact in deleted])
+        with self._lock:
+            self._stats['evicted_files'] += len(deleted)
+            self._stats['evicted_bytes'] += sum(artifact['size'] for artifact in deleted)
+        return deleted
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
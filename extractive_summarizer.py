@@ -0,0 +1,126 @@
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from text_chunker import count_tokens_batch, split_sentences
+
+# Words of 3+ letters; shorter ones are mostly prepositions and particles
+TERM_RE = re.compile(r'\w{3,}')
+
+# Terms are cut to a prefix so Russian inflections match ("ставка", "ставку", "ставки")
+STEM_LENGTH = 5
+
+
+def sentence_term_matrix(sentences, window=20):
+    """
+    TF-IDF matrix (sentences x terms) as a sparse CSR matrix. IDF is computed over windows of consecutive sentences, so terms spread
+    evenly over the whole talk (filler, "подписывайтесь", the words every
+    sentence uses) weigh nothing, while terms of the topic being discussed
+    in a part of the video stand out.
+
+    Rows are scaled by 1/sqrt(term count) rather than to unit length, so two
+    sentences sharing only near-zero-weight terms are barely similar.
+    """
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for i, sentence in enumerate(sentences):
+        for term, count in Counter(word[:STEM_LENGTH] for word in TERM_RE.findall(sentence.lower())).items():
+            rows.append(i)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+
+    n = len(sentences)
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    tf = np.log1p(np.asarray(counts, dtype=np.float64))
+
+    # Short texts fall back to per-sentence IDF
+    window = max(1, min(window, n // 10))
+    windows = -(-n // window)
+    term_windows = np.unique(np.stack([cols, rows // window]), axis=1)[0]
+    idf = np.log((1 + windows) / (1 + np.bincount(term_windows, minlength=len(vocabulary))))
+    matrix = sparse.csr_matrix((tf * idf[cols], (rows, cols)), shape=(n, len(vocabulary)))
+    matrix.eliminate_zeros()
+
+    lengths = np.bincount(rows, minlength=n).astype(np.float64)
+    lengths[lengths == 0] = 1
+    return sparse.diags(1 / np.sqrt(lengths)) @ matrix
+
+
+def rank_sentences(sentences, damping=0.85, max_iterations=50, tolerance=1e-6):
+    """
+    TextRank scores over the similarity graph of the sentences (dot products
+    of their TF-IDF rows). The n x n similarity matrix is never built: S @ v
+    is computed as X @ (X.T @ v) minus the self-similarity, so memory stays
+    O(non-zeros).
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+    matrix = sentence_term_matrix(sentences)
+    self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+    def similarity_times(vector):
+        return matrix @ (matrix.T @ vector) - vector * self_similarity
+
+    degree = similarity_times(np.ones(n))
+    degree[degree < 1e-9] = 1  # Isolated sentences (zero up to rounding) only get the teleport share
+
+    # Teleport in proportion to how much informative vocabulary a sentence has;
+    # with a uniform jump a cluster of filler gets the same mass as a topic
+    teleport = self_similarity / self_similarity.sum() if self_similarity.sum() > 0 else np.full(n, 1 / n)
+
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iterations):
+        updated = (1 - damping) * teleport + damping * similarity_times(scores / degree)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def condense_text(text, token_budget, sections=8, model="gpt-4o"):
+    """
+    Keep the top-ranked sentences of text, in their original order, within
+    token_budget. The budget is spread over `sections` consecutive parts of
+    the transcript in proportion to their length, so every part of a long
+    video stays represented.
+
+    Returns {'text', 'tokens_before', 'tokens_after', 'sentences_before', 'sentences_after'}.
+    """
+    sentences = [sentence for sentence in split_sentences(text) if sentence.strip()]
+    tokens = np.asarray(count_tokens_batch(sentences, model), dtype=np.int64)
+    total = int(tokens.sum())
+    if total <= token_budget:
+        return {'text': text, 'tokens_before': total, 'tokens_after': total,
+                'sentences_before': len(sentences), 'sentences_after': len(sentences)}
+
+    scores = rank_sentences(sentences)
+
+    # Section boundaries by cumulative tokens
+    section_of = np.minimum((np.cumsum(tokens) - tokens) * sections // total, sections - 1)
+    keep = np.zeros(len(sentences), dtype=bool)
+    seen = set()
+    for section in range(sections):
+        indices = np.flatnonzero(section_of == section)
+        budget = token_budget * tokens[indices].sum() / total
+        used = 0
+        for i in indices[np.argsort(-scores[indices], kind='stable')]:
+            # A sentence said again (or a caption repeat) adds nothing the first copy didn't
+            key = ' '.join(TERM_RE.findall(sentences[i].lower()))
+            if key in seen or used + tokens[i] > budget:
+                continue
+            seen.add(key)
+            keep[i] = True
+            used += tokens[i]
+
+    kept = np.flatnonzero(keep)
+    condensed = ''.join(sentences[i] for i in kept).strip()
+    return {
+        'text': condensed,
+        'tokens_before': total,
+        'tokens_after': int(tokens[kept].sum()),
+        'sentences_before': len(sentences),
+        'sentences_after': len(kept),
+    }
@@ -0,0 +1,75 @@
+import bisect
+import threading
+
+# Histogram bucket upper bounds in seconds: 50 ms growing by 25% per bucket up to ~20 min
+BUCKET_BOUNDS = [0.05 * 1.25 ** i for i in range(46)]
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency histogram with log-spaced buckets. Counts are halved
+    once max_samples are reached, so old samples fade and percentiles follow
+    the provider's current behaviour.
+    """
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counts = [0.0] * (len(BUCKET_BOUNDS) + 1)
+        self._total = 0.0
+        self.samples = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+            self._total += 1
+            self.samples += 1
+            if self._total >= self.max_samples:
+                self._counts = [count / 2 for count in self._counts]
+                self._total /= 2
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100), or None without samples"""
+        with self._lock:
+            if not self._total:
+                return None
+            target = self._total * p / 100
+            seen = 0.0
+            for bound, count in zip(BUCKET_BOUNDS, self._counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return BUCKET_BOUNDS[-1]
+
+    def get_stats(self):
+        return {
+            'samples': self.samples,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class HedgeRace:
+    """
+    Shared state of one hedged request. The first attempt to produce answer
+    text claims the race; every other attempt is told to stop (a streaming
+    attempt closes its connection) and its result is discarded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.winner = None
+        self.decided = threading.Event()  # Set once an attempt has claimed the race
+
+    def claim(self, attempt):
+        """True if `attempt` owns the race (claiming it if nobody has yet)"""
+        with self._lock:
+            if self.winner is None:
+                self.winner = attempt
+                self.decided.set()
+            return self.winner == attempt
+
+    def lost(self, attempt):
+        with self._lock:
+            return self.winner is not None and self.winner != attempt
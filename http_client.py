@@ -0,0 +1,161 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from config import HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt; everything else is returned to the caller
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Methods that are safe to resend after the server may already have acted on them
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class RequestCancelled(Exception):
+    """The caller's cancel event was set while a request was waiting to be retried"""
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def never_sent(error):
+    """Whether a request error happened before the request reached the server
+    (connect timeout, refused or unresolvable host), so resending can't duplicate it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', None), ConnectTimeoutError)
+    return False
+
+
+class HttpClient:
+    """
+    Shared HTTP client: keep-alive connection pools per host, retries on
+    429/5xx and connection errors with jittered exponential backoff, Retry-After
+    support and an overall deadline per call. Non-idempotent requests (POST) are
+    only resent after errors that happened before they were sent; a read
+    timeout may mean the server is already working on them. Keeps per-host
+    latency/retry stats.
+    """
+
+    def __init__(self, max_retries=HTTP_MAX_RETRIES, backoff_base=HTTP_BACKOFF_BASE,
+                 backoff_max=HTTP_BACKOFF_MAX, pool_size=HTTP_POOL_SIZE):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def request(self, method, url, timeout=60, deadline=None, cancel=None, **kwargs):
+        """
+        Send a request, retrying transient failures until max_retries or the
+        deadline (seconds for the whole call, including waits) runs out.
+        Returns the last response; raises the last connection error if no
+        response was received. Setting the `cancel` event stops the retries
+        (and cuts a backoff wait short) with RequestCancelled.
+        """
+        host = urlparse(url).netloc
+        give_up_at = time.monotonic() + deadline if deadline else None
+        attempt = 0
+
+        while True:
+            attempt_timeout = timeout
+            if give_up_at is not None:
+                attempt_timeout = min(timeout, max(0.1, give_up_at - time.monotonic()))
+
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            self._record(host, time.monotonic() - started, failed=response is None or response.status_code >= 500)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if error is not None and method.upper() not in IDEMPOTENT_METHODS and not never_sent(error):
+                raise error
+
+            delay = self._retry_delay(attempt, response)
+            out_of_time = give_up_at is not None and time.monotonic() + delay >= give_up_at
+            if attempt >= self.max_retries or out_of_time:
+                if response is not None:
+                    return response
+                raise error
+
+            reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+            logger.warning(f"{method} {host} failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            with self._lock:
+                self._stats[host]['retries'] += 1
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.is_set() or cancel.wait(delay):
+                if response is not None:
+                    response.close()
+                raise RequestCancelled(f"{method} {host} cancelled while retrying")
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _retry_delay(self, attempt, response):
+        """Server-requested wait if any, else full-jitter exponential backoff"""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, host, seconds, failed):
+        with self._lock:
+            stats = self._stats.setdefault(host, {
+                'requests': 0, 'errors': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0
+            })
+            stats['requests'] += 1
+            stats['errors'] += int(failed)
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def get_stats(self):
+        """Per-host request, error and retry counts with average/max latency in ms"""
+        with self._lock:
+            return {
+                host: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'avg_ms': round(stats['total_seconds'] / stats['requests'] * 1000),
+                    'max_ms': round(stats['max_seconds'] * 1000),
+                }
+                for host, stats in self._stats.items()
+            }
+
+
+# One pooled client shared by every service
+shared_client = HttpClient()
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# The job whose step is running on the current worker thread
+_current = threading.local()
+
+
+def current_job():
+    """Job of the step running on this thread, so steps can report progress; None elsewhere"""
+    return getattr(_current, 'job', None)
+
+
+class Job:
+    """A queued video job made of ordered (stage, status_text, fn) steps.
+
+    status_text may be a callable taking the step input; returning None keeps
+    the current status (e.g. for a step that will be skipped).
+    """
+
+    def __init__(self, job_id, steps, key=None):
+        self.job_id = job_id
+        self.key = key
+        self.steps = steps
+        self.subscribers = []
+        self.current_stage = None
+        self.status_text = None
+        self.status_time = 0
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def attach(self, on_progress=None, on_result=None, on_error=None):
+        """Subscribe to progress and the final result, returning the current status"""
+        with self._lock:
+            self.subscribers.append((on_progress, on_result, on_error))
+            return self.status_text
+
+    def set_status(self, status_text, min_interval=0):
+        """Broadcast a progress update to every subscriber.
+
+        With min_interval, updates arriving sooner than that after the last
+        one are dropped (for streamed text that changes many times a second).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if min_interval and now - self.status_time < min_interval:
+                return False
+            self.status_text = status_text
+            self.status_time = now
+            subscribers = list(self.subscribers)
+        for on_progress, _, _ in subscribers:
+            self._notify(on_progress, status_text)
+        return True
+
+    def _notify(self, callback, *args):
+        """Run a job callback without letting its errors break the pipeline"""
+        if not callback:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.warning(f"Job {self.job_id} callback failed: {e}")
+
+
+class JobScheduler:
+    """Runs job steps on bounded per-stage worker pools.
+
+    Each step is executed on the pool of its stage and hands its result to the
+    next step, so a job occupies only one stage slot at a time while other jobs
+    use the remaining stages concurrently. Jobs submitted with the same key
+    while one is in flight are coalesced into a single run.
+    """
+
+    def __init__(self, stage_limits):
+        self.stage_limits = dict(stage_limits)
+        self.pools = {
+            stage: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"{stage}-worker")
+            for stage, limit in self.stage_limits.items()
+        }
+        self._lock = threading.Lock()
+        self._queued = {stage: 0 for stage in self.stage_limits}
+        self._running = {stage: 0 for stage in self.stage_limits}
+        self._in_flight = {}
+        self._coalesced = 0
+
+    def submit(self, steps, on_progress=None, on_result=None, on_error=None, job_id=None, key=None):
+        """Enqueue a job and return immediately.
+
+        If a job with the same key is already in flight, the callbacks are
+        attached to it instead and no new work is scheduled.
+        """
+        for stage, _, _ in steps:
+            if stage not in self.pools:
+                raise ValueError(f"Unknown job stage: {stage}")
+
+        with self._lock:
+            existing = self._in_flight.get(key) if key is not None else None
+            if existing:
+                self._coalesced += 1
+                # Attach under the scheduler lock so the job can't finish in between
+                status_text = existing.attach(on_progress, on_result, on_error)
+            else:
+                job = Job(job_id or uuid.uuid4().hex[:8], steps, key=key)
+                job.attach(on_progress, on_result, on_error)
+                if key is not None:
+                    self._in_flight[key] = job
+
+        if existing:
+            logger.info(f"Attached request to in-flight job {existing.job_id}")
+            # Late subscribers immediately see the current stage
+            if status_text:
+                existing._notify(on_progress, status_text)
+            return existing
+
+        logger.info(f"Queued job {job.job_id} ({len(steps)} steps)")
+        self._schedule(job, 0, None)
+        return job
+
+    def _schedule(self, job, index, value):
+        """Queue a job step on its stage pool"""
+        stage = job.steps[index][0]
+        with self._lock:
+            self._queued[stage] += 1
+        self.pools[stage].submit(self._run_step, job, index, value)
+
+    def _run_step(self, job, index, value):
+        """Execute one step and hand its result to the next stage"""
+        stage, status_text, fn = job.steps[index]
+        with self._lock:
+            self._queued[stage] -= 1
+            self._running[stage] += 1
+
+        try:
+            job.current_stage = stage
+            if callable(status_text):
+                status_text = status_text(value)
+            if status_text:
+                job.set_status(status_text)
+            _current.job = job
+            result = fn(value)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed in {stage} stage: {e}")
+            job.error = e
+            self._finish(job)
+            return
+        finally:
+            _current.job = None
+            with self._lock:
+                self._running[stage] -= 1
+
+        if index + 1 < len(job.steps):
+            self._schedule(job, index + 1, result)
+        else:
+            job.result = result
+            self._finish(job)
+
+    def _finish(self, job):
+        """Release the job key and deliver the outcome to all subscribers"""
+        with self._lock:
+            if job.key is not None and self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        # No new subscribers can attach once the key is released
+        for _, on_result, on_error in list(job.subscribers):
+            if job.error is not None:
+                job._notify(on_error, job.error)
+            else:
+                job._notify(on_result, job.result)
+        job.done.set()
+
+    def is_in_flight(self, key):
+        """Whether a job with this key is queued or running"""
+        with self._lock:
+            return key in self._in_flight
+
+    def get_in_flight(self):
+        """Get the number of in-flight keyed jobs and coalesced requests"""
+        with self._lock:
+            return {'jobs': len(self._in_flight), 'coalesced': self._coalesced}
+
+    def get_stats(self):
+        """Get queued/running counts and limits per stage"""
+        with self._lock:
+            return {
+                stage: {
+                    'queued': self._queued[stage],
+                    'running': self._running[stage],
+                    'limit': self.stage_limits[stage]
+                }
+                for stage in self.stage_limits
+            }
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and shut down stage pools"""
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
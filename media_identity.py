@@ -0,0 +1,94 @@
+import re
+import threading
+from urllib.parse import parse_qs, urlparse
+
+# YouTube video ids are 11 characters of [A-Za-z0-9_-]
+VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+# Hosts serving videos (subdomains included: www., m., music., gaming.)
+YOUTUBE_DOMAINS = ('youtube.com', 'youtube-nocookie.com')
+SHORT_LINK_DOMAIN = 'youtu.be'
+
+# Path forms carrying the id as their second segment: /shorts/<id>, /live/<id>, /embed/<id>, /v/<id>, /e/<id>
+ID_PATH_PREFIXES = ('shorts', 'live', 'embed', 'v', 'e')
+
+
+def _is_youtube_host(host):
+    return any(host == domain or host.endswith(f".{domain}") for domain in YOUTUBE_DOMAINS)
+
+
+def _video_id_from_url(url):
+    """Video id of one YouTube URL, or None"""
+    url = url.strip('<>()[]"\'')
+    if '://' not in url:
+        url = f"https://{url}"
+    try:
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+    except ValueError:
+        return None
+    path = [part for part in parsed.path.split('/') if part]
+    query = parse_qs(parsed.query)
+
+    candidate = None
+    if host == SHORT_LINK_DOMAIN or host == f"www.{SHORT_LINK_DOMAIN}":
+        candidate = path[0] if path else None
+    elif _is_youtube_host(host):
+        if len(path) >= 2 and path[0] in ID_PATH_PREFIXES:
+            candidate = path[1]
+        elif path[:1] == ['attribution_link'] and 'u' in query:
+            return _video_id_from_url(f"https://{host}{query['u'][0]}")
+        else:
+            candidate = query.get('v', [None])[0]
+    if candidate and VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+    return None
+
+
+def extract_video_id(text, allow_bare_id=True):
+    """
+    Canonical video id from a YouTube URL in any form (watch, youtu.be,
+    shorts, live, embed, /v/, m./music. hosts, extra query parameters) or a
+    bare id. Text around a URL is ignored. Returns None if there is none.
+    """
+    text = (text or '').strip()
+    if allow_bare_id and VIDEO_ID_PATTERN.match(text):
+        return text
+    for token in text.split():
+        video_id = _video_id_from_url(token)
+        if video_id:
+            return video_id
+    return None
+
+
+def canonical_url(video_id):
+    """The one URL used for a video (drops playlist, timestamp and tracking parameters)"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def media_key(value):
+    """Cache key of a video given its id or any URL form; other values are used as they are"""
+    return extract_video_id(value) or value
+
+
+class CacheHitStats:
+    """Hits and misses of cached artifacts per kind (audio, transcript, summary), for /status"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, kind, hit):
+        with self._lock:
+            counts = self._counts.setdefault(kind, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                kind: {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+                for kind, (hits, misses) in self._counts.items()
+            }
+
+
+cache_hit_stats = CacheHitStats()
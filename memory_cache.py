@@ -0,0 +1,80 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from config import MEMORY_CACHE_MB
+
+
+def estimate_size(value):
+    """Approximate memory taken by a cached value (strings and JSON-like containers)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process LRU in front of a file cache, bounded by the
+    approximate size of its values. Owners put values after writing them to
+    disk and invalidate them when the files are removed, so a hit never needs
+    disk I/O. Cached values are shared: callers must not modify them.
+    """
+
+    def __init__(self, max_bytes=MEMORY_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size), least recently used first
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Cached value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Cache a value, evicting least recently used entries to stay within max_bytes"""
+        size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if value is None or size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                **self._stats
+            }
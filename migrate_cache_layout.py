@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of flat cache directories (downloads/, transcriptions/,
+cache/, cache/chunks/) to the sharded layout. Safe to run while the bot is
+up: services keep finding files in either place until it is done, and it
+can be re-run. Afterwards set CACHE_LEGACY_LOOKUP=false.
+
+Usage: python migrate_cache_layout.py [--dry-run]
+"""
+
+import os
+import sys
+
+from artifact_index import artifact_index, BACKFILL_PATTERNS, CHUNK
+from cache_layout import shard_path
+from config import DOWNLOADS_DIR, TRANSCRIPTIONS_DIR
+
+# Directories written by OpenRouterSummarizationService
+CACHE_DIR = "./cache"
+CHUNK_CACHE_DIR = os.path.join(CACHE_DIR, "chunks")
+
+
+def shard_key(name, filename):
+    """Shard key of a cached file (its video id, or content hash for chunks), or None if it isn't a cache file"""
+    for kind, pattern in BACKFILL_PATTERNS[name]:
+        match = pattern.match(filename)
+        if match:
+            return filename[:-len('.json')] if kind == CHUNK else match.group('video_id')
+    return None
+
+
+def migrate(directories, index=artifact_index, dry_run=False):
+    """
+    Move the flat files of each directory (BACKFILL_PATTERNS key -> path) into
+    their shards and update the artifact index. A legacy file whose sharded
+    copy already exists is stale (services only write shards) and is removed.
+    Returns {'moved', 'replaced', 'skipped'} counts.
+    """
+    counts = {'moved': 0, 'replaced': 0, 'skipped': 0}
+    for name, directory in directories.items():
+        if not os.path.isdir(directory):
+            continue
+        moves, stale = [], []
+        for entry in os.scandir(directory):
+            if not entry.is_file():
+                continue  # Shards, chunks/ and in-progress .segments directories
+            key = shard_key(name, entry.name)
+            if key is None:
+                counts['skipped'] += 1  # Partial downloads and other non-cache files
+                continue
+            target = shard_path(directory, key, entry.name, create=not dry_run)
+            if os.path.exists(target):
+                stale.append(entry.path)
+            else:
+                moves.append((entry.path, target))
+
+        if not dry_run:
+            for source, target in moves:
+                os.replace(source, target)
+            for path in stale:
+                os.remove(path)
+            if index is not None:
+                index.move(moves)
+                index.remove(stale)
+        counts['moved'] += len(moves)
+        counts['replaced'] += len(stale)
+        print(f"{'Would move' if dry_run else 'Moved'} {len(moves)} files in {directory}"
+              f" ({len(stale)} stale copies {'to remove' if dry_run else 'removed'})")
+    return counts
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv[1:]
+    counts = migrate({
+        'downloads': DOWNLOADS_DIR,
+        'transcriptions': TRANSCRIPTIONS_DIR,
+        'cache': CACHE_DIR,
+        'chunks': CHUNK_CACHE_DIR,
+    }, dry_run=dry_run)
+    print(f"\n✅ {counts['moved']} moved, {counts['replaced']} stale removed, {counts['skipped']} other files left in place")
+    if not dry_run:
+        print("Set CACHE_LEGACY_LOOKUP=false in .env to skip the flat-directory fallback")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Local stand-in for the OpenRouter chat completions endpoint, shared by the
+summarization tests. Answers as one JSON response, or as SSE deltas when the
+request asks to stream; status, delay and answer are chosen per request.
+"""
+
+import json
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import HttpClient
+from openrouter_summarization_service import OpenRouterSummarizationService
+
+PART_HEADER = re.compile(r'^Part \d+:$', re.M)
+
+# Each service gets its own empty chunk cache
+CACHE_ROOT = tempfile.TemporaryDirectory()
+
+
+def chunk_text(payload):
+    """Text a summarization prompt asks to summarize, or None for a reduce prompt"""
+    prompt = payload['messages'][0]['content']
+    if 'Part summaries:\n' in prompt:
+        return None
+    return prompt.split('Text to summarize:\n', 1)[-1]
+
+
+def summary_answer(payload):
+    """'Summary of <first word>' for chunks, 'Merged <n> parts' for reduce prompts"""
+    text = chunk_text(payload)
+    if text is None:
+        return [f"Merged {len(PART_HEADER.findall(payload['messages'][0]['content']))} parts"]
+    return ["Summary of " + re.findall(r'\w+', text)[0]]
+
+
+class OpenRouterStub(BaseHTTPRequestHandler):
+    """Chat completions: server.status(payload) picks the HTTP status, server.answer(payload) the tokens"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.payloads.append(payload)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            status = server.status(payload)
+            if status != 200:
+                time.sleep(server.delay(payload))
+                return self._reply(status, b'upstream error', 'text/plain')
+            if payload.get('stream'):
+                return self._stream(payload)
+            time.sleep(server.delay(payload))
+            content = ''.join(server.answer(payload))
+            self._reply(200, json.dumps({'choices': [{'message': {'content': content}}]}).encode())
+        except (BrokenPipeError, ConnectionResetError):
+            with server.lock:
+                server.cancelled.append(payload['model'])
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _stream(self, payload):
+        server = self.server
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        # Keep-alive comments while the model "thinks", as OpenRouter sends them
+        answer_at = time.monotonic() + server.delay(payload)
+        self._chunk(b": OPENROUTER PROCESSING\n\n")
+        while time.monotonic() < answer_at:
+            time.sleep(min(0.1, max(0, answer_at - time.monotonic())))
+            if server.keepalive:
+                self._chunk(b": OPENROUTER PROCESSING\n\n")
+
+        for i, token in enumerate(server.answer(payload)):
+            if i == server.stream_error_at:
+                self._event({'error': {'message': 'provider overloaded'}})
+                break
+            self._event({'choices': [{'delta': {'content': token}}]})
+            time.sleep(server.token_seconds)
+        else:
+            self._event({'choices': [{'delta': {}, 'finish_reason': 'stop'}]})
+            self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _reply(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _event(self, data):
+        self._chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """The stub's server, recording what it was sent"""
+
+    def __init__(self, answer, status, delay, token_seconds, keepalive, stream_error_at):
+        super().__init__(('127.0.0.1', 0), OpenRouterStub)
+        self.answer = answer
+        self.status = status
+        self.delay = delay if callable(delay) else lambda payload: delay
+        self.token_seconds = token_seconds
+        self.keepalive = keepalive
+        self.stream_error_at = stream_error_at
+        self.lock = threading.Lock()
+        self.payloads = []
+        self.cancelled = []  # Models whose stream the client hung up on
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def requests(self):
+        return len(self.payloads)
+
+    @property
+    def prompts(self):
+        return [payload['messages'][0]['content'] for payload in self.payloads]
+
+    @property
+    def models(self):
+        return [payload['model'] for payload in self.payloads]
+
+
+def start_stub(answer=summary_answer, status=lambda payload: 200, delay=0, token_seconds=0,
+               keepalive=False, stream_error_at=None):
+    """Start the stub on a free port (stop it with server.shutdown()); delay may be a function of the payload"""
+    server = StubServer(answer, status, delay, token_seconds, keepalive, stream_error_at)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_service(server, max_concurrency=4):
+    """OpenRouter service pointed at the stub, with its own empty chunk cache"""
+    service = OpenRouterSummarizationService()
+    service.api_key = "test-key"
+    service.is_initialized = True
+    service.api_url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+    service.max_concurrency = max_concurrency
+    service.http_client = HttpClient(backoff_base=0.01)
+    service.chunk_cache_dir = tempfile.mkdtemp(dir=CACHE_ROOT.name)
+    return service
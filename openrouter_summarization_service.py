@@ -1,51 +1,178 @@
 import requests
+import hashlib
 import json
 import logging
 import os
-import tiktoken
-from config import OPENROUTER_API_KEY
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from http_client import RequestCancelled, shared_client
+from text_chunker import chunk_text, count_tokens
+from extractive_summarizer import condense_text
+from circuit_breaker import BackendResult, CircuitBreaker
+from hedging import HedgeRace, LatencyHistogram
+from memory_cache import MemoryCache
+from artifact_index import artifact_index, SUMMARY, CHUNK_SUMMARIES, CHUNK_STATUS, CHUNK
+from artifact_store import read_json, read_text, write_json, write_text
+from cache_layout import find_existing, shard_path
+from media_identity import cache_hit_stats, media_key
+from config import (
+    OPENROUTER_API_KEY, OPENROUTER_MAX_CONCURRENCY, OPENROUTER_STREAMING, HTTP_DEADLINE_SECONDS,
+    SUMMARY_MIN_COVERAGE, REDUCE_TOKEN_BUDGET, REDUCE_MAX_FAN_IN,
+    EXTRACTIVE_PRESUMMARY, EXTRACTIVE_THRESHOLD_TOKENS, EXTRACTIVE_TOKEN_BUDGET,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_SECONDS, BREAKER_SLOW_CALL_SECONDS,
+    OPENROUTER_MODELS, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_INITIAL_DELAY, HEDGE_MIN_DELAY
+)
 
 logger = logging.getLogger(__name__)
 
+# Results of _summarize_single_chunk that are errors rather than summaries
+CHUNK_ERROR_PREFIXES = (
+    "No summary generated", "API error", "Summarization timeout", "Request failed", "Summarization failed"
+)
+
+# Result of an attempt that lost a hedged race (another model answered first)
+HEDGE_LOST = "Request failed: another model answered first"
+
+# Result of a hedge not sent because every provider slot was busy
+HEDGE_NO_SLOT = "Request failed: no free provider slot for a hedged request"
+
+# Results of summarize_text that are errors (a summary with gaps is still a summary)
+SUMMARY_ERROR_PREFIXES = CHUNK_ERROR_PREFIXES + (
+    "Failed to generate summary", "Long text summarization failed", "OpenRouter API key not configured",
+    "Text too short to summarize"
+)
+
+# Bump when _create_summarization_prompt changes so cached chunk summaries are recomputed
+PROMPT_VERSION = 1
+
+# Same for _create_reduce_prompt (merged summaries are cached separately from chunks)
+REDUCE_PROMPT_VERSION = 1
+
+# Requests in flight per provider host, shared by every job and service instance
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+
+def get_provider_slots(api_url, limit):
+    """Semaphore capping concurrent requests to the provider behind api_url"""
+    host = urlparse(api_url).netloc
+    with _provider_slots_lock:
+        if host not in _provider_slots:
+            _provider_slots[host] = threading.BoundedSemaphore(limit)
+        return _provider_slots[host]
+
+
+def chunk_cache_key(chunk, model, prompt_version, params):
+    """Content address of a chunk summary: same text, model, prompt and params give the same key"""
+    material = json.dumps({
+        'chunk': chunk,
+        'model': model,
+        'prompt_version': prompt_version,
+        'params': params
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def group_summaries(summaries, token_budget, max_fan_in):
+    """
+    Split consecutive summaries into groups that fit the token budget and
+    max_fan_in. Always merges at least two per group so every level shrinks;
+    a trailing summary left on its own takes the previous group's last one
+    when the pair fits (8 + 1 -> 7 + 2), otherwise it is passed up as it is.
+    """
+    groups = []
+    current, size = [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if current and (size + tokens > token_budget or len(current) >= max_fan_in):
+            groups.append(current)
+            current, size = [], 0
+        current.append(summary)
+        size += tokens
+    if current:
+        groups.append(current)
+    
+    if len(groups) == len(summaries) and len(summaries) > 1:
+        # Every summary alone exceeds half the budget: fall back to pairs
+        groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    
+    if len(groups) > 1 and len(groups[-1]) == 1 and len(groups[-2]) > 2:
+        pair = [groups[-2][-1], groups[-1][0]]
+        if sum(count_tokens(summary) for summary in pair) <= token_budget:
+            groups[-2:] = [groups[-2][:-1], pair]
+    return groups
+
+
+def iter_sse_events(lines):
+    """Yield the data payload of each server-sent event from decoded stream lines"""
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+            continue
+        if line.startswith(':'):  # Comment / keep-alive (": OPENROUTER PROCESSING")
+            continue
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data:
+        yield '\n'.join(data)
+
 
 def split_text_into_chunks(text, max_tokens=15000, overlap=1000, model="gpt-4o"):
     """
-    Split text into chunks based on token count rather than character count.
-    This ensures we don't exceed model token limits and provides better chunking.
+    Split text into chunks of at most max_tokens, cut on sentence boundaries.
+    See text_chunker.chunk_text for the token counts.
     """
-    try:
-        enc = tiktoken.encoding_for_model(model)
-        tokens = enc.encode(text)
-        
-        chunks = []
-        start = 0
-        while start < len(tokens):
-            end = min(start + max_tokens, len(tokens))
-            chunk = enc.decode(tokens[start:end])
-            chunks.append(chunk)
-            start += max_tokens - overlap  # move forward with overlap
-        
-        return chunks
-    except Exception as e:
-        logger.warning(f"Tiktoken chunking failed: {e}, falling back to character-based chunking")
-        # Fallback to character-based chunking
-        max_chars = max_tokens * 4  # Rough approximation: 4 chars per token
-        overlap_chars = overlap * 4
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = min(start + max_chars, len(text))
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += max_chars - overlap_chars
-        return chunks
+    return chunk_text(text, max_tokens=max_tokens, overlap=overlap, model=model)['chunks']
 
 
 class OpenRouterSummarizationService:
     def __init__(self):
         self.api_key = OPENROUTER_API_KEY
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "deepseek/deepseek-r1-0528:free"
+        # The first model is the primary; the rest are tried in order when it is slow (hedging)
+        self.model = OPENROUTER_MODELS[0]
+        self.hedge_models = OPENROUTER_MODELS[1:]
+        self.hedge_percentile = HEDGE_PERCENTILE
+        self.hedge_min_samples = HEDGE_MIN_SAMPLES
+        self.hedge_initial_delay = HEDGE_INITIAL_DELAY
+        self.hedge_min_delay = HEDGE_MIN_DELAY
+        self.latency = {}  # model -> LatencyHistogram of answer latency
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+        self._stats_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        self.generation_params = {
+            "max_tokens": 8192,  # Adjust based on model limits
+            "temperature": 0.1,
+            "top_p": 0.9
+        }
+        self.cache_dir = "./cache"
+        self.chunk_cache_dir = os.path.join(self.cache_dir, "chunks")
+        # Keyed by (kind, video id) and ('chunk', content hash); updated on every cache write
+        self.memory_cache = MemoryCache()
+        self.artifact_index = artifact_index
+        self.hit_stats = cache_hit_stats
+        self.max_concurrency = OPENROUTER_MAX_CONCURRENCY
+        self.http_client = shared_client
+        self.streaming = OPENROUTER_STREAMING
+        self.min_coverage = SUMMARY_MIN_COVERAGE
+        self.reduce_token_budget = REDUCE_TOKEN_BUDGET
+        self.reduce_max_fan_in = REDUCE_MAX_FAN_IN
+        self.extractive = EXTRACTIVE_PRESUMMARY
+        self.extractive_threshold = EXTRACTIVE_THRESHOLD_TOKENS
+        self.extractive_budget = EXTRACTIVE_TOKEN_BUDGET
+        # Fed by every API request, so an outage is noticed after a few chunks, not a few videos
+        self.breaker = CircuitBreaker(
+            "OpenRouter",
+            failure_threshold=BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=BREAKER_RECOVERY_SECONDS,
+            slow_call_seconds=BREAKER_SLOW_CALL_SECONDS
+        )
         self.is_initialized = self._check_api_key()
     
     def _check_api_key(self):
@@ -56,30 +183,66 @@ class OpenRouterSummarizationService:
         logger.info("✅ OpenRouter summarization service initialized")
         return True
     
-    def summarize_text(self, text, video_id=None):
-        """Summarize the given text using OpenRouter API with caching"""
+    def summarize(self, text, video_id=None, on_text=None):
+        """Like summarize_text, but returns a BackendResult instead of an error string"""
+        if not self.is_initialized:
+            return BackendResult.failure("OpenRouter API key not configured", fault=False)
+        if not text or len(text.strip()) < 50:
+            return BackendResult.failure("Text too short to summarize.", fault=False)
+        
+        summary = self.summarize_text(text, video_id=video_id, on_text=on_text)
+        if not summary or summary.startswith(SUMMARY_ERROR_PREFIXES):
+            return BackendResult.failure(summary or "No summary generated by OpenRouter")
+        return BackendResult.success(summary)
+    
+    def summarize_text(self, text, video_id=None, on_text=None):
+        """
+        Summarize the given text using OpenRouter API with caching.
+        on_text(partial_summary) is called as streamed text arrives.
+        """
         if not self.is_initialized:
             return "OpenRouter API key not configured"
         
         if not text or len(text.strip()) < 50:
             return "Text too short to summarize."
         
-        # Try to load from cache first
+        # Try to load from cache first, keyed by the canonical video id (and made with the current settings)
         if video_id:
+            video_id = media_key(video_id)
             cached_summary = self._load_from_cache(video_id)
+            self.hit_stats.record('summary', bool(cached_summary))
             if cached_summary:
                 return cached_summary
         
+        # Provider known to be down: fail now instead of timing out on every chunk
+        if not self.breaker.is_available():
+            return "Request failed: OpenRouter circuit open"
+        
+        if not self.streaming:
+            on_text = None
+        
         try:
-            # For very long texts, split into chunks using intelligent token-based chunking
+            # Count tokens once; texts over the budget are split on sentence boundaries
             max_tokens = 15000  # DeepSeek R1 can handle up to ~30k tokens, leave room for response
-            if len(text) > max_tokens * 3:  # Rough estimate: 3 chars per token
-                summary = self._summarize_long_text(text, max_tokens, video_id)
+            chunked = chunk_text(text, max_tokens=max_tokens, overlap=1000)
+            logger.info(f"Transcript is {chunked['total_tokens']} tokens")
+            
+            # Very long transcripts: keep only the top-ranked sentences for the LLM
+            if self.extractive and chunked['total_tokens'] > self.extractive_threshold:
+                condensed = condense_text(text, self.extractive_budget)
+                logger.info(f"Extractive stage kept {condensed['sentences_after']}/{condensed['sentences_before']} "
+                            f"sentences, {condensed['tokens_after']} tokens")
+                text = condensed['text']
+                chunked = chunk_text(text, max_tokens=max_tokens, overlap=1000)
+            
+            if len(chunked['chunks']) > 1:
+                summary, complete = self._summarize_long_text(chunked['chunks'], video_id, on_text)
             else:
-                summary = self._summarize_single_chunk(text)
+                summary = self._summarize_single_chunk(text, on_text)
+                complete = not summary.startswith(CHUNK_ERROR_PREFIXES)
             
-            # Save to cache if video_id provided
-            if video_id and summary and not summary.startswith("Summarization failed"):
+            # Save to cache if video_id provided; errors and summaries with gaps are retried next time
+            if video_id and summary and complete:
                 self._save_to_cache(video_id, summary)
             
             return summary
@@ -88,12 +251,135 @@ class OpenRouterSummarizationService:
             logger.error(f"OpenRouter summarization failed: {e}")
             return f"Summarization failed: {str(e)}"
     
-    def _summarize_single_chunk(self, text):
-        """Summarize a single chunk of text"""
+    def _summarize_single_chunk(self, text, on_text=None):
+        """Summarize a single chunk of text through the chunk cache, streaming it to on_text if given"""
+        cached = self._load_cached_chunk(chunk_cache_key(text, self.model, PROMPT_VERSION, self.generation_params))
+        if cached:
+            return cached
+        return self._complete_chunk(text, on_text)[0]
+    
+    def _complete_chunk(self, chunk, on_text=None):
+        """
+        Summarize a chunk with the API and cache the answer under the model
+        that gave it (a hedge model when it won the race). Returns (summary or
+        error string, cache key or None on error).
+        """
+        summary, model = self._complete(self._create_summarization_prompt(chunk), on_text)
+        if not model:
+            return summary, None
+        key = chunk_cache_key(chunk, model, PROMPT_VERSION, self.generation_params)
+        self._save_cached_chunk(key, summary, model)
+        return summary, key
+    
+    def _complete(self, prompt, on_text=None):
+        """
+        Send one prompt to the model (hedged across self.hedge_models). Returns
+        (cleaned answer or error string, model that answered or None on error);
+        a hedge may answer instead of self.model, so cache by the returned model.
+        """
+        # Sibling chunks of a half-open probe wait for its outcome rather than fail next to it
+        if not self.breaker.allow_request(wait=HTTP_DEADLINE_SECONDS):
+            return "Request failed: OpenRouter circuit open", None
+        
+        start = time.monotonic()
+        if self.hedge_models:
+            summary, fault, model = self._complete_hedged(prompt, on_text)
+        else:
+            (summary, fault), model = self._request_completion(self.model, prompt, on_text), self.model
+        
+        if summary.startswith(CHUNK_ERROR_PREFIXES):
+            result, model = BackendResult.failure(summary, fault), None
+        else:
+            result = BackendResult.success(summary)
+        self.breaker.record(result, time.monotonic() - start)
+        return summary, model
+    
+    def _complete_hedged(self, prompt, on_text=None):
+        """
+        Send the prompt to self.model; if it hasn't started answering within its
+        hedge delay, or fails, send it to the next of self.hedge_models as well.
+        The first attempt to produce text wins and the others are cancelled.
+        Returns (summary or error, provider fault, model that answered or None).
+        """
+        models = [self.model] + [model for model in self.hedge_models if model != self.model]
+        race = HedgeRace()
+        launched = []
+        pending = {}
+        result = ("No summary generated by OpenRouter", True, None)
+        
+        def launch(hedge=False):
+            # A hedge only goes out on a free provider slot, it never queues for one
+            attempt = len(launched)
+            launched.append(models[attempt])
+            future = self._hedge_pool.submit(
+                self._request_completion, models[attempt], prompt, on_text, race, attempt, not hedge
+            )
+            pending[future] = attempt
+        
+        launch()
+        with self._stats_lock:
+            self.hedge_stats['requests'] += 1
+        
+        while pending:
+            can_hedge = len(launched) < len(models) and race.winner is None
+            timeout = self.hedge_delay(launched[-1]) if can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                logger.info(f"No answer from {launched[-1]} after {timeout:.1f}s, hedging with {models[len(launched)]}")
+                with self._stats_lock:
+                    self.hedge_stats['hedged'] += 1
+                launch(hedge=True)
+                continue
+            
+            for future in done:
+                attempt = pending.pop(future)
+                summary, fault = future.result()
+                if not summary.startswith(CHUNK_ERROR_PREFIXES):
+                    if attempt > 0:
+                        with self._stats_lock:
+                            self.hedge_stats['hedge_wins'] += 1
+                    return summary, False, models[attempt]
+                if summary not in (HEDGE_LOST, HEDGE_NO_SLOT):
+                    result = (summary, fault, None)
+            
+            # A failed attempt with nothing else in flight hands over to the next model at once
+            if not pending and len(launched) < len(models) and race.winner is None:
+                launch()
+        return result
+    
+    def hedge_delay(self, model):
+        """Seconds to wait for model before hedging: its HEDGE_PERCENTILE latency once enough samples are in"""
+        histogram = self._latency(model)
+        if histogram.samples < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        return max(self.hedge_min_delay, histogram.percentile(self.hedge_percentile))
+    
+    def _latency(self, model):
+        with self._stats_lock:
+            if model not in self.latency:
+                self.latency[model] = LatencyHistogram()
+            return self.latency[model]
+    
+    def get_latency_stats(self):
+        """Per-model answer latency percentiles and hedging counters, for /status"""
+        with self._stats_lock:
+            models = list(self.latency.items())
+            hedge_stats = dict(self.hedge_stats)
+        return {'models': {model: histogram.get_stats() for model, histogram in models}, **hedge_stats}
+    
+    def _request_completion(self, model, prompt, on_text=None, race=None, attempt=0, wait_for_slot=True):
+        """
+        One completion request to one model. Returns (cleaned answer or error
+        string, whether the provider is at fault). Answer latency (time to the
+        first streamed token, or to the full response) goes into the model's
+        histogram. In a hedged race the request always streams, so a losing
+        attempt can hang up as soon as another one starts answering, and stops
+        retrying once the race is decided. Without wait_for_slot the request
+        is not sent at all if the provider has no free slot.
+        """
+        stream = bool(on_text) or race is not None
         try:
-            # Create the prompt for summarization
-            prompt = self._create_summarization_prompt(text)
-            
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json",
@@ -102,108 +388,256 @@ class OpenRouterSummarizationService:
             }
             
             payload = {
-                "model": self.model,
+                "model": model,
                 "messages": [
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                "max_tokens": 8192,  # Adjust based on model limits
-                "temperature": 0.1,
-                "top_p": 0.9
+                **self.generation_params
             }
-            
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
+            if stream:
+                payload["stream"] = True
+            
+            streamed = None
+            slots = get_provider_slots(self.api_url, self.max_concurrency)
+            if not slots.acquire(blocking=wait_for_slot):
+                logger.info(f"No free provider slot, not hedging with {model}")
+                return HEDGE_NO_SLOT, False
+            try:
+                if race and race.lost(attempt):
+                    return HEDGE_LOST, False
+                start = time.monotonic()
+                response = self.http_client.post(
+                    self.api_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=60,  # With streaming: max wait between tokens
+                    deadline=HTTP_DEADLINE_SECONDS,
+                    cancel=race.decided if race else None,
+                    stream=stream
+                )
+                if race and race.lost(attempt):
+                    response.close()
+                    return HEDGE_LOST, False
+                if (response.status_code == 200 and stream
+                        and response.headers.get('Content-Type', '').startswith('text/event-stream')):
+                    streamed = self._read_stream(response, on_text, model, start, race, attempt)
+                    if streamed is None:
+                        return HEDGE_LOST, False
+            finally:
+                slots.release()
             
             if response.status_code == 200:
-                result = response.json()
-                if 'choices' in result and len(result['choices']) > 0:
-                    summary = result['choices'][0]['message']['content'].strip()
+                if streamed is not None:
+                    summary = streamed.strip()
+                else:
+                    result = response.json()
+                    choices = result.get('choices') or []
+                    summary = choices[0]['message']['content'].strip() if choices else ''
+                    if summary:
+                        if race and not race.claim(attempt):
+                            return HEDGE_LOST, False
+                        self._latency(model).record(time.monotonic() - start)
+                if summary:
                     # Clean up Markdown for Telegram
                     summary = self._clean_markdown_for_telegram(summary)
-                    logger.info(f"✅ OpenRouter summarization successful ({len(summary)} chars)")
-                    return summary
+                    logger.info(f"✅ OpenRouter summarization successful ({model}, {len(summary)} chars)")
+                    return summary, False
                 else:
-                    return "No summary generated by OpenRouter"
+                    return "No summary generated by OpenRouter", True
             else:
-                logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-                return f"API error: {response.status_code}"
+                logger.error(f"OpenRouter API error ({model}): {response.status_code} - {response.text}")
+                # Rate limits and server errors mean the provider is unhealthy; other 4xx are about the request
+                return f"API error: {response.status_code}", response.status_code == 429 or response.status_code >= 500
                 
+        except RequestCancelled:
+            return HEDGE_LOST, False
         except requests.exceptions.Timeout:
-            return "Summarization timeout - text may be too long"
+            return "Summarization timeout - text may be too long", True
         except Exception as e:
-            logger.error(f"OpenRouter API request failed: {e}")
-            return f"Request failed: {str(e)}"
+            logger.error(f"OpenRouter API request failed ({model}): {e}")
+            return f"Request failed: {str(e)}", True
     
-    def _summarize_long_text(self, text, max_tokens, video_id=None):
-        """Summarize very long text by splitting into intelligent token-based chunks"""
+    def _read_stream(self, response, on_text=None, model=None, start=None, race=None, attempt=0):
+        """
+        Collect streamed completion deltas, reporting the text so far after each
+        one. Returns None if another attempt of a hedged race is answering.
+        """
+        response.encoding = 'utf-8'  # text/event-stream has no charset; default would be latin-1
+        parts = []
+        
+        def lines():
+            # Checked on every line, keep-alive comments included, so a loser hangs up while the winner streams
+            # (chunk_size=None hands over each transfer chunk as it arrives instead of waiting for 512 bytes)
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if race and race.lost(attempt):
+                    return
+                yield line
+        
         try:
-            # Split text into chunks using tiktoken for accurate token counting
-            chunks = split_text_into_chunks(text, max_tokens=max_tokens, overlap=1000)
-            logger.info(f"Splitting long text into {len(chunks)} chunks using intelligent token-based chunking")
-            
-            # Check if we have cached chunk summaries first
-            if video_id:
-                cached_chunk_summaries = self._load_chunk_summaries_from_cache(video_id)
-                if cached_chunk_summaries:
-                    logger.info(f"✅ Using {len(cached_chunk_summaries)} cached chunk summaries")
-                    summaries = cached_chunk_summaries
-                else:
-                    # Process chunks and cache them
-                    summaries = []
-                    chunk_summaries = []
-                    
-                    for i, chunk in enumerate(chunks):
-                        if len(chunk.strip()) > 50:
-                            logger.info(f"Processing chunk {i+1}/{len(chunks)}")
-                            summary = self._summarize_single_chunk(chunk)
-                            if summary and not summary.startswith("Summarization failed"):
-                                summaries.append(summary)
-                                chunk_summaries.append(summary)
-                    
-                    # Save chunk summaries to cache
-                    if chunk_summaries:
-                        self._save_chunk_summaries_to_cache(video_id, chunk_summaries)
-            else:
-                # No video_id, process without caching
-                summaries = []
-                for i, chunk in enumerate(chunks):
-                    if len(chunk.strip()) > 50:
-                        logger.info(f"Processing chunk {i+1}/{len(chunks)}")
-                        summary = self._summarize_single_chunk(chunk)
-                        if summary and not summary.startswith("Summarization failed"):
-                            summaries.append(summary)
-            
-            if summaries:
-                # If we have multiple summaries, create a final summary
-                if len(summaries) > 1:
-                    combined_summary = " ".join(summaries)
-                    # If combined is still too long, summarize the summaries
-                    if len(combined_summary) > max_tokens * 4:  # rough char estimate
-                        final_prompt = f"""Please create a comprehensive summary of these key points:
-
-{combined_summary}
-
-Provide a well-structured summary in Russian that captures the main topics and important details."""
-                        
-                        final_summary = self._summarize_single_chunk(final_prompt)
-                        return final_summary
-                    else:
-                        return combined_summary
-                else:
-                    return summaries[0]
-            else:
-                return "Failed to generate summary for long text"
+            for data in iter_sse_events(lines()):
+                if race and race.lost(attempt):
+                    return None
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                if 'error' in event:
+                    error = event['error']
+                    raise Exception(f"Stream error: {error.get('message', error) if isinstance(error, dict) else error}")
+                choices = event.get('choices') or []
+                delta = choices[0].get('delta', {}).get('content') if choices else None
+                if delta:
+                    if not parts:
+                        if race and not race.claim(attempt):
+                            return None
+                        if model:
+                            self._latency(model).record(time.monotonic() - start)
+                    parts.append(delta)
+                    if on_text:
+                        on_text(''.join(parts))
+            if race and race.lost(attempt):
+                return None
+        finally:
+            response.close()
+        return ''.join(parts)
+    
+    def _summarize_long_text(self, chunks, video_id=None, on_text=None):
+        """
+        Summarize very long text already split into token-bounded chunks.
+        Returns (summary, complete); an incomplete summary is not cached so the
+        next request retries the failed chunks.
+        """
+        try:
+            logger.info(f"Summarizing long text in {len(chunks)} chunks")
+            
+            # Unchanged chunks are served from the content-addressed cache;
+            # per-chunk status is persisted as results come in
+            on_update = (lambda results: self._save_chunk_status(video_id, results)) if video_id else None
+            results = self._summarize_chunk_results(chunks, on_update)
+            summaries = [result['summary'] for result in results if result['status'] == 'ok']
+            
+            # Keep the per-video list for /chunks
+            if video_id and summaries:
+                self._save_chunk_summaries_to_cache(video_id, summaries)
+            
+            if not summaries:
+                return "Failed to generate summary for long text", False
+            
+            # Reduce only with full coverage, or with gaps the policy accepts
+            failed = len(results) - len(summaries)
+            coverage = len(summaries) / len(results)
+            if coverage < self.min_coverage:
+                return (f"Summarization failed: only {len(summaries)}/{len(results)} chunks summarized "
+                        f"(need {self.min_coverage:.0%})"), False
+            
+            # Merge chunk summaries level by level into a single root
+            summary = self._reduce_summaries(summaries, on_text)
+            if summary.startswith(CHUNK_ERROR_PREFIXES):
+                return summary, False
+            
+            if failed:
+                logger.warning(f"Summary covers {len(summaries)}/{len(results)} chunks, not caching it")
+                summary += (f"\n\n⚠️ {failed} of {len(results)} parts of the video could not be summarized. "
+                            f"Send the link again later to fill them in.")
+            return summary, not failed
                 
         except Exception as e:
             logger.error(f"Long text summarization failed: {e}")
-            return f"Long text summarization failed: {str(e)}"
+            return f"Long text summarization failed: {str(e)}", False
+    
+    def _reduce_summaries(self, summaries, on_text=None):
+        """
+        Hierarchical reduce: group summaries within the token budget, merge the
+        groups concurrently and repeat until one summary remains. Every merged
+        node is cached by content, and only the root is streamed to on_text.
+        A group of one summary goes up to the next level without a request.
+        """
+        nodes = summaries
+        level = 0
+        while len(nodes) > 1:
+            level += 1
+            groups = group_summaries(nodes, self.reduce_token_budget, self.reduce_max_fan_in)
+            logger.info(f"Reduce level {level}: {len(nodes)} summaries -> {len(groups)}")
+            is_root = len(groups) == 1
+            
+            def merge(group):
+                if len(group) == 1:
+                    return group[0]
+                return self._merge_summaries(group, on_text if is_root else None)
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(groups))) as pool:
+                nodes = list(pool.map(merge, groups))
+            
+            for node in nodes:
+                if node.startswith(CHUNK_ERROR_PREFIXES):
+                    return node
+        return nodes[0]
+    
+    def _merge_summaries(self, group, on_text=None):
+        """Merge consecutive summaries into one, using the cache for known groups"""
+        parts = "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(group, 1))
+        prompt_version = f"reduce-{REDUCE_PROMPT_VERSION}"
+        cached = self._load_cached_chunk(chunk_cache_key(parts, self.model, prompt_version, self.generation_params))
+        if cached:
+            return cached
+        
+        summary, model = self._complete(self._create_reduce_prompt(parts), on_text)
+        if model:
+            key = chunk_cache_key(parts, model, prompt_version, self.generation_params)
+            self._save_cached_chunk(key, summary, model, prompt_version)
+        return summary
+    
+    def _summarize_chunk_results(self, chunks, on_update=None):
+        """
+        Summarize chunks concurrently (bounded by max_concurrency), keeping
+        chunk order. Chunks already summarized with the same model, prompt and
+        params come from the chunk cache; only the rest hit the API.
+        Returns one {'index', 'key', 'status', 'summary'} per non-empty chunk,
+        status being 'ok', 'failed' or (while running) 'pending';
+        on_update(results) is called whenever a status changes.
+        """
+        results = []
+        for i, chunk in enumerate(chunks):
+            if len(chunk.strip()) <= 50:
+                continue
+            key = chunk_cache_key(chunk, self.model, PROMPT_VERSION, self.generation_params)
+            cached = self._load_cached_chunk(key)
+            results.append({
+                'index': i,
+                'key': key,
+                'status': 'ok' if cached else 'pending',
+                'summary': cached
+            })
+        
+        pending = [result for result in results if result['status'] == 'pending']
+        if len(pending) < len(results):
+            logger.info(f"✅ {len(results) - len(pending)}/{len(results)} chunk summaries served from cache")
+        
+        lock = threading.Lock()
+        
+        def report():
+            if on_update:
+                with lock:
+                    on_update(results)
+        
+        def summarize(result):
+            i = result['index']
+            logger.info(f"Processing chunk {i+1}/{len(chunks)}")
+            summary, key = self._complete_chunk(chunks[i])
+            if key:
+                result.update(key=key, status='ok', summary=summary)
+            else:
+                logger.warning(f"Chunk {i+1}/{len(chunks)} failed: {summary}")
+                result.update(status='failed', summary=None, error=summary)
+            report()
+        
+        report()
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pending))) as pool:
+                list(pool.map(summarize, pending))
+        return results
     
     def _create_summarization_prompt(self, text):
         """Create an effective summarization prompt"""
@@ -220,6 +654,22 @@ Instructions:
 Text to summarize:
 {text}
 
+Summary:"""
+    
+    def _create_reduce_prompt(self, parts):
+        """Prompt for merging summaries of consecutive transcript parts"""
+        return f"""Below are summaries of consecutive parts of one transcript from a Russian-language video or podcast, in order.
+
+Instructions:
+1. Merge them into one summary in Russian (the same language as the source)
+2. Keep the main topics, key points, and important details; drop repetition
+3. Keep the order in which topics appear
+4. Organize the summary logically with clear structure
+5. Aim for about 200-400 words
+
+Part summaries:
+{parts}
+
 Summary:"""
     
     def get_service_info(self):
@@ -227,7 +677,9 @@ Summary:"""
         return {
             "service": "OpenRouter",
             "model": self.model,
+            "hedge_models": self.hedge_models,
             "initialized": self.is_initialized,
+            "circuit": self.breaker.state,
             "api_configured": bool(self.api_key and self.api_key != "your_openrouter_api_key_here")
         }
     
@@ -286,53 +738,163 @@ Summary:"""
             return text
 
     def _get_cache_paths(self, video_id):
-        """Get cache file paths for a video"""
-        cache_dir = "./cache"
-        os.makedirs(cache_dir, exist_ok=True)
-        
+        """Get cache file paths for a video in its shard (directories are created on write)"""
         return {
-            'summary': os.path.join(cache_dir, f"{video_id}.summary.txt"),
-            'chunks_dir': os.path.join(cache_dir, f"{video_id}_chunks"),
-            'chunk_summaries': os.path.join(cache_dir, f"{video_id}.chunk_summaries.json")
+            'summary': shard_path(self.cache_dir, video_id, f"{video_id}.summary.txt"),
+            'chunk_summaries': shard_path(self.cache_dir, video_id, f"{video_id}.chunk_summaries.json"),
+            'chunk_status': shard_path(self.cache_dir, video_id, f"{video_id}.chunk_status.json")
         }
 
+    def _find_cache_file(self, video_id, name):
+        """Existing cache file of a video (sharded, or legacy flat until migrated), or None"""
+        return find_existing(self.cache_dir, video_id, os.path.basename(self._get_cache_paths(video_id)[name]))
+
+    def _chunk_path(self, key):
+        """Path of a chunk summary, sharded by its content address"""
+        return shard_path(self.chunk_cache_dir, key, f"{key}.json")
+
+    def forget_artifact(self, artifact):
+        """Drop the in-memory copy of a cache file that was deleted (artifact index row)"""
+        if artifact['kind'] == CHUNK:
+            self.memory_cache.invalidate(('chunk', os.path.basename(artifact['path'])[:-len('.json')]))
+        elif artifact['kind'] in (SUMMARY, CHUNK_SUMMARIES, CHUNK_STATUS):
+            self.memory_cache.invalidate((artifact['kind'], artifact['video_id']))
+
+    def _summary_source(self):
+        """
+        Settings a video summary is made with, recorded as its artifact source:
+        a summary made with another model, prompt or params is not served
+        """
+        params = hashlib.sha256(json.dumps(self.generation_params, sort_keys=True).encode()).hexdigest()[:12]
+        return f"{self.model} prompt {PROMPT_VERSION} reduce {REDUCE_PROMPT_VERSION} params {params}"
+    
+    def _is_current_summary(self, source):
+        """Whether a cached summary's source matches the current settings (None: cached before sources were recorded)"""
+        return source is None or source == self._summary_source()
+
     def _save_to_cache(self, video_id, summary):
         """Save summary to cache"""
         try:
             cache_paths = self._get_cache_paths(video_id)
+            os.makedirs(os.path.dirname(cache_paths['summary']), exist_ok=True)
             
             # Save summary
-            with open(cache_paths['summary'], 'w', encoding='utf-8') as f:
-                f.write(summary)
+            source = self._summary_source()
+            write_text(cache_paths['summary'], summary)
+            self.memory_cache.put(('summary', video_id), (source, summary.strip()))
+            self.artifact_index.record(cache_paths['summary'], SUMMARY, video_id, source=source)
             
             logger.info(f"✅ Cached summary for {video_id}")
             
         except Exception as e:
             logger.error(f"Failed to save cache: {e}")
 
+    def _load_cached_chunk(self, key):
+        """Load a chunk summary by its content address"""
+        cached = self.memory_cache.get(('chunk', key))
+        if cached:
+            self.artifact_index.touch(self._chunk_path(key))
+            return cached
+        path = find_existing(self.chunk_cache_dir, key, f"{key}.json")
+        if path is None:
+            return None
+        try:
+            summary = read_json(path).get('summary')
+            self.memory_cache.put(('chunk', key), summary)
+            self.artifact_index.touch(path)
+            return summary
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load cached chunk {key[:12]}: {e}")
+            return None
+
+    def _save_cached_chunk(self, key, summary, model=None, prompt_version=PROMPT_VERSION):
+        """Save a chunk summary under its content address, labeled with the model that wrote it"""
+        model = model or self.model
+        try:
+            path = self._chunk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_json(path, {
+                'summary': summary,
+                'model': model,
+                'prompt_version': prompt_version,
+                'created': time.time()
+            })
+            self.memory_cache.put(('chunk', key), summary)
+            self.artifact_index.record(path, CHUNK, source=f"{model} prompt {prompt_version}")
+        except Exception as e:
+            logger.error(f"Failed to save cached chunk {key[:12]}: {e}")
+
     def _save_chunk_summaries_to_cache(self, video_id, chunk_summaries):
         """Save chunk summaries to cache"""
         try:
             cache_paths = self._get_cache_paths(video_id)
+            os.makedirs(os.path.dirname(cache_paths['chunk_summaries']), exist_ok=True)
             
-            with open(cache_paths['chunk_summaries'], 'w', encoding='utf-8') as f:
-                json.dump(chunk_summaries, f, ensure_ascii=False, indent=2)
+            write_json(cache_paths['chunk_summaries'], chunk_summaries)
+            self.memory_cache.put(('chunk_summaries', video_id), list(chunk_summaries))
+            self.artifact_index.record(cache_paths['chunk_summaries'], CHUNK_SUMMARIES, video_id, source=self.model)
             
             logger.info(f"✅ Cached {len(chunk_summaries)} chunk summaries for {video_id}")
             
         except Exception as e:
             logger.error(f"Failed to save chunk summaries cache: {e}")
 
+    def _save_chunk_status(self, video_id, results):
+        """Persist per-chunk ok/failed/pending status for a video"""
+        try:
+            cache_paths = self._get_cache_paths(video_id)
+            status = {
+                'total': len(results),
+                'ok': sum(1 for result in results if result['status'] == 'ok'),
+                'updated': time.time(),
+                'chunks': [
+                    {key: result[key] for key in ('index', 'key', 'status', 'error') if key in result}
+                    for result in results
+                ]
+            }
+            os.makedirs(os.path.dirname(cache_paths['chunk_status']), exist_ok=True)
+            write_json(cache_paths['chunk_status'], status)
+            self.memory_cache.put(('chunk_status', video_id), status)
+            self.artifact_index.record(cache_paths['chunk_status'], CHUNK_STATUS, video_id, source=self.model)
+        except Exception as e:
+            logger.error(f"Failed to save chunk status: {e}")
+
+    def get_chunk_status(self, video_id):
+        """Per-chunk status of the last summarization of a video, or None"""
+        video_id = media_key(video_id)
+        cached = self.memory_cache.get(('chunk_status', video_id))
+        if cached:
+            return cached
+        path = self._find_cache_file(video_id, 'chunk_status')
+        if path is None:
+            return None
+        try:
+            status = read_json(path)
+            self.memory_cache.put(('chunk_status', video_id), status)
+            return status
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load chunk status: {e}")
+            return None
+
     def _load_chunk_summaries_from_cache(self, video_id):
         """Load chunk summaries from cache if they exist"""
+        cache_paths = self._get_cache_paths(video_id)
+        cached = self.memory_cache.get(('chunk_summaries', video_id))
+        if cached:
+            self.artifact_index.touch(cache_paths['chunk_summaries'])
+            return cached
         try:
-            cache_paths = self._get_cache_paths(video_id)
-            
-            if os.path.exists(cache_paths['chunk_summaries']):
-                with open(cache_paths['chunk_summaries'], 'r', encoding='utf-8') as f:
-                    chunk_summaries = json.load(f)
+            path = self._find_cache_file(video_id, 'chunk_summaries')
+            if path:
+                chunk_summaries = read_json(path)
                 
                 if chunk_summaries:
+                    self.memory_cache.put(('chunk_summaries', video_id), chunk_summaries)
+                    self.artifact_index.touch(path)
                     logger.info(f"✅ Loaded {len(chunk_summaries)} chunk summaries from cache for {video_id}")
                     return chunk_summaries
             
@@ -342,20 +904,37 @@ Summary:"""
             logger.error(f"Failed to load chunk summaries from cache: {e}")
             return None
 
+    def get_cached_summary(self, video_id):
+        """Get the cached summary of a video or its URL, or None (public method)"""
+        return self._load_from_cache(media_key(video_id))
+    
     def get_cached_chunk_summaries(self, video_id):
-        """Get cached chunk summaries for a video (public method)"""
-        return self._load_chunk_summaries_from_cache(video_id)
+        """Get cached chunk summaries for a video or its URL (public method)"""
+        return self._load_chunk_summaries_from_cache(media_key(video_id))
 
     def _load_from_cache(self, video_id):
-        """Load summary from cache if it exists"""
+        """Load summary from cache if it exists and was made with the current model, prompts and params"""
+        cache_paths = self._get_cache_paths(video_id)
+        cached = self.memory_cache.get(('summary', video_id))
+        if cached:
+            source, summary = cached
+            if not self._is_current_summary(source):
+                return None
+            self.artifact_index.touch(cache_paths['summary'])
+            return summary
         try:
-            cache_paths = self._get_cache_paths(video_id)
-            
-            if os.path.exists(cache_paths['summary']):
-                with open(cache_paths['summary'], 'r', encoding='utf-8') as f:
-                    summary = f.read().strip()
+            path = self._find_cache_file(video_id, 'summary')
+            if path:
+                summary = read_text(path).strip()
+                artifact = self.artifact_index.get(path)
+                source = artifact['source'] if artifact else None
                 
                 if summary:
+                    self.memory_cache.put(('summary', video_id), (source, summary))
+                    if not self._is_current_summary(source):
+                        logger.info(f"Cached summary for {video_id} was made with other settings ({source})")
+                        return None
+                    self.artifact_index.touch(path)
                     logger.info(f"✅ Loaded summary from cache for {video_id}")
                     return summary
             
@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+import wave
+from array import array
+from config import YT_DLP_PATH, FFMPEG_PATH
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # 16-bit mono PCM
+FRAME_SECONDS = 0.1
+
+
+def frame_energy(frame_bytes):
+    """Mean square amplitude of a PCM frame (sampled every 4th sample for speed)"""
+    samples = array('h', frame_bytes)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    sampled = samples[::4]
+    if not sampled:
+        return 0
+    return sum(x * x for x in sampled) / len(sampled)
+
+
+def write_wav(path, pcm_bytes):
+    """Write 16 kHz mono s16le PCM as a WAV file"""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm_bytes)
+
+
+class PcmSegmenter:
+    """Cuts a 16 kHz mono PCM stream into segments at the quietest point
+    between min_seconds and max_seconds, as the bytes arrive"""
+
+    def __init__(self, min_seconds=300, max_seconds=600):
+        self.frame_bytes = int(BYTES_PER_SECOND * FRAME_SECONDS)
+        self.min_frames = int(min_seconds / FRAME_SECONDS)
+        self.max_frames = int(max_seconds / FRAME_SECONDS)
+        self._buffer = bytearray()
+        self._energies = []
+        self._offset_frames = 0
+
+    def feed(self, data):
+        """Add PCM bytes and return newly completed (start_seconds, pcm_bytes) segments"""
+        self._buffer.extend(data)
+
+        # Measure every complete frame that hasn't been measured yet
+        while (len(self._energies) + 1) * self.frame_bytes <= len(self._buffer):
+            start = len(self._energies) * self.frame_bytes
+            self._energies.append(frame_energy(self._buffer[start:start + self.frame_bytes]))
+
+        segments = []
+        while len(self._energies) >= self.max_frames:
+            segments.append(self._emit(self._find_cut()))
+        return segments
+
+    def flush(self):
+        """Return whatever audio remains as the final segment"""
+        if not self._buffer:
+            return []
+        start_seconds = self._offset_frames * FRAME_SECONDS
+        pcm = bytes(self._buffer)
+        self._buffer.clear()
+        self._energies = []
+        return [(start_seconds, pcm)]
+
+    def _find_cut(self):
+        """Frame index of the quietest frame in the min..max window"""
+        target = (self.min_frames + self.max_frames) // 2
+        window = range(self.min_frames, self.max_frames)
+        return min(window, key=lambda i: (self._energies[i], abs(i - target)))
+
+    def _emit(self, frames):
+        start_seconds = self._offset_frames * FRAME_SECONDS
+        cut = frames * self.frame_bytes
+        pcm = bytes(self._buffer[:cut])
+        del self._buffer[:cut]
+        del self._energies[:frames]
+        self._offset_frames += frames
+        return start_seconds, pcm
+
+
+class PcmStream:
+    """Decodes a YouTube URL (via yt-dlp) or a local media file to 16 kHz mono PCM.
+
+    A local file is fed to ffmpeg's stdin where yt-dlp output would go, so it
+    works as an offline stand-in for the download.
+    """
+
+    def __init__(self, source, chunk_size=65536):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.processes = []
+
+    def __enter__(self):
+        decoder_cmd = [
+            FFMPEG_PATH,
+            '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1',
+            'pipe:1'
+        ]
+
+        if os.path.exists(self.source):
+            with open(self.source, 'rb') as media:
+                decoder = subprocess.Popen(decoder_cmd, stdin=media, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE)
+            self.processes = [decoder]
+        else:
+            downloader_cmd = [
+                YT_DLP_PATH,
+                '-f', 'bestaudio[ext=webm]/bestaudio',
+                '--quiet', '--no-part',
+                '-o', '-',
+                self.source
+            ]
+            downloader = subprocess.Popen(downloader_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            decoder = subprocess.Popen(decoder_cmd, stdin=downloader.stdout, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            downloader.stdout.close()  # Let yt-dlp see SIGPIPE if ffmpeg exits
+            self.processes = [downloader, decoder]
+
+        self.stdout = self.processes[-1].stdout
+        return self
+
+    def read(self):
+        """Read the next chunk of PCM bytes (b'' at end of stream)"""
+        return self.stdout.read(self.chunk_size)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for process in self.processes:
+                if process.poll() is None:
+                    process.kill()
+
+        errors = []
+        for process in self.processes:
+            process.wait()
+            stderr = process.stderr.read().decode('utf-8', errors='replace') if process.stderr else ''
+            if process.returncode != 0 and exc_type is None:
+                errors.append(f"{os.path.basename(process.args[0])}: {stderr.strip()[:300]}")
+        self.stdout.close()
+
+        if errors:
+            raise Exception(f"Audio stream failed: {'; '.join(errors)}")
+        return False
@@ -1,12 +1,23 @@
-import requests
+import time
 from huggingface_hub import InferenceClient
 from transformers import pipeline
-from config import HF_TOKEN
+from http_client import shared_client
+from circuit_breaker import BackendResult, CircuitBreaker
+from config import (
+    HF_TOKEN, HTTP_DEADLINE_SECONDS, BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_SECONDS, BREAKER_SLOW_CALL_SECONDS
+)
 
 
 class SummarizationService:
     def __init__(self):
         self.hf_token = HF_TOKEN
+        self.http_client = shared_client
+        self.breaker = CircuitBreaker(
+            "HuggingFace",
+            failure_threshold=BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=BREAKER_RECOVERY_SECONDS,
+            slow_call_seconds=BREAKER_SLOW_CALL_SECONDS
+        )
         self.client = None
         self.summarizer = None
         self._init_client()
@@ -43,20 +54,34 @@ class SummarizationService:
     
     def summarize_text(self, text):
         """Summarize the given text"""
+        result = self.summarize(text)
+        return result.text if result.ok else result.error
+    
+    def summarize(self, text):
+        """Summarize the given text, returning a BackendResult"""
         if not text or len(text.strip()) < 50:
-            return "Text too short to summarize."
+            return BackendResult.failure("Text too short to summarize.", fault=False)
+        
+        if not self.breaker.allow_request():
+            return BackendResult.failure("Summarization failed: HuggingFace circuit open", fault=False)
         
+        start = time.monotonic()
         try:
             # Try InferenceClient first
             if self.client:
-                return self._summarize_with_client(text)
+                summary = self._summarize_with_client(text)
             # Fall back to local summarization
             elif self.summarizer:
-                return self._summarize_local(text)
+                summary = self._summarize_local(text)
             else:
-                return self._summarize_api(text)
+                summary = self._summarize_api(text)
         except Exception as e:
-            return f"Summarization failed: {str(e)}"
+            result = BackendResult.failure(f"Summarization failed: {str(e)}")
+        else:
+            result = BackendResult.success(summary)
+        
+        self.breaker.record(result, time.monotonic() - start)
+        return result
     
     def _summarize_with_client(self, text):
         """Summarize using HuggingFace InferenceClient"""
@@ -148,7 +173,7 @@ class SummarizationService:
                 text = text[:max_length]
             
             payload = {"inputs": text}
-            response = requests.post(api_url, headers=headers, json=payload)
+            response = self.http_client.post(api_url, headers=headers, json=payload, deadline=HTTP_DEADLINE_SECONDS)
             
             if response.status_code == 200:
                 result = response.json()
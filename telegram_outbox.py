@@ -0,0 +1,325 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from telebot.apihelper import ApiTelegramException
+from config import TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, TELEGRAM_SENDERS
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit for one message
+MESSAGE_LIMIT = 4096
+
+# Separator when short queued messages to one chat are sent as one
+MERGE_SEPARATOR = "\n\n"
+
+
+def strip_markdown(text):
+    """Plain-text version of a Markdown message, sent when Telegram can't parse the formatting"""
+    return text.replace('**', '').replace('*', '').replace('_', '').replace('`', '')
+
+
+class TokenBucket:
+    """Allows `rate` operations per second with bursts of up to `capacity` (callers lock)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available, 0 if one is available now"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutgoingMessage:
+    """A queued send or edit; `message` of an edit is a message id or the Future of a queued send"""
+
+    def __init__(self, kind, chat_id, text, parse_mode=None, plain_text=None, reply_markup=None,
+                 reply_to_message_id=None, message=None, batch=None):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.plain_text = plain_text
+        self.reply_markup = reply_markup
+        self.reply_to_message_id = reply_to_message_id
+        self.message = message
+        self.batch = batch  # Parts of one send_parts call share a batch
+        self.futures = [Future()]
+
+    def can_merge(self, other):
+        """
+        Whether `other` can be appended to this message and sent as one. Only
+        parts of the same send_parts call are merged: a single send may be
+        edited later, and a reply keeps its own reply target.
+        """
+        return (
+            self.kind == other.kind == 'send'
+            and self.batch is not None and self.batch is other.batch
+            and self.parse_mode == other.parse_mode
+            and not (self.reply_markup or other.reply_markup)
+            and not (self.reply_to_message_id or other.reply_to_message_id)
+            and len(self.text) + len(MERGE_SEPARATOR) + len(other.text) <= MESSAGE_LIMIT
+        )
+
+    def merge(self, other):
+        if self.plain_text or other.plain_text:
+            self.plain_text = f"{self.plain_text or self.text}{MERGE_SEPARATOR}{other.plain_text or other.text}"
+        self.text = f"{self.text}{MERGE_SEPARATOR}{other.text}"
+        self.futures += other.futures
+
+
+class TelegramOutbox:
+    """
+    Outbound Telegram messages and edits, sent by background threads within a
+    global and a per-chat token bucket so bursts don't end in 429 floods and
+    nothing calls the Bot API from the polling thread. Messages to one chat
+    are sent in order, one at a time; chats take turns. Queued edits of the
+    same message are coalesced into the latest text, short parts of one
+    send_parts call are merged, and a 429 pauses the chat for its retry_after.
+    Every call returns a Future of the sent Message.
+    """
+
+    def __init__(self, bot, global_rate=TELEGRAM_GLOBAL_RATE, chat_rate=TELEGRAM_CHAT_RATE,
+                 chat_burst=TELEGRAM_CHAT_BURST, senders=TELEGRAM_SENDERS):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.senders = senders
+        self._global_bucket = TokenBucket(global_rate, max(1, global_rate))
+        self._chat_buckets = {}
+        self._chats = OrderedDict()  # chat_id -> deque of queued messages, in turn order
+        self._busy = set()  # Chats with a request in flight
+        self._paused_until = {}  # chat_id -> monotonic time, after a 429
+        self._pending_edits = {}  # (chat_id, message) -> queued edit
+        self._replacements = {}  # (chat_id, Future of a failed send) -> id of the message sent in its place
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._stats = {'sent': 0, 'edited': 0, 'coalesced': 0, 'merged': 0, 'rate_limited': 0, 'errors': 0}
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f"telegram-sender-{i}", daemon=True)
+            for i in range(self.senders)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=5):
+        """Send what is queued (up to timeout seconds), then stop the sender threads"""
+        self.wait_idle(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def send(self, chat_id, text, parse_mode=None, reply_markup=None, reply_to_message_id=None):
+        """Queue a message (never merged, so it can be edited); Markdown that Telegram rejects is resent as plain text"""
+        return self.send_parts(chat_id, [text], parse_mode, reply_markup, reply_to_message_id)[0]
+
+    def reply_to(self, message, text, **kwargs):
+        return self.send(message.chat.id, text, reply_to_message_id=message.message_id, **kwargs)
+
+    def send_parts(self, chat_id, parts, parse_mode=None, reply_markup=None, reply_to_message_id=None):
+        """
+        Queue the parts of a long text back to back (the markup goes on the
+        last part); short parts are merged into fewer messages
+        """
+        batch = object() if len(parts) > 1 else None
+        items = [
+            OutgoingMessage(
+                'send', chat_id, part, parse_mode,
+                plain_text=strip_markdown(part) if parse_mode else None,
+                reply_markup=reply_markup if i == len(parts) - 1 else None,
+                reply_to_message_id=reply_to_message_id if i == 0 else None,
+                batch=batch
+            )
+            for i, part in enumerate(parts)
+        ]
+        with self._cond:
+            self._chats.setdefault(chat_id, deque()).extend(items)
+            self._cond.notify()
+        return [item.futures[0] for item in items]
+
+    def edit(self, chat_id, message, text, parse_mode=None):
+        """
+        Queue an edit of a message (id, or Future from send/reply_to). A queued
+        edit of the same message is updated to the new text instead; if the
+        message itself could not be sent, the first edit's text is sent as a new
+        message and later edits go to that one.
+        """
+        key = (chat_id, message)
+        with self._cond:
+            pending = self._pending_edits.get(key)
+            if pending:
+                pending.text = text
+                pending.parse_mode = parse_mode
+                pending.plain_text = strip_markdown(text) if parse_mode else None
+                self._stats['coalesced'] += 1
+                return pending.futures[0]
+            item = OutgoingMessage('edit', chat_id, text, parse_mode,
+                                   plain_text=strip_markdown(text) if parse_mode else None, message=message)
+            self._pending_edits[key] = item
+            self._chats.setdefault(chat_id, deque()).append(item)
+            self._cond.notify()
+        return item.futures[0]
+
+    def wait_idle(self, timeout=None):
+        """Wait until everything queued has been sent; returns False on timeout"""
+        give_up_at = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._chats or self._busy:
+                remaining = give_up_at - time.monotonic() if give_up_at else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queued'] = sum(len(queue) for queue in self._chats.values())
+            stats['paused_chats'] = sum(1 for until in self._paused_until.values() if until > time.monotonic())
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item = None
+                while item is None:
+                    if not self._running:
+                        return
+                    item, wait = self._next(time.monotonic())
+                    if item is None:
+                        self._cond.wait(wait)
+            self._deliver(item)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _next(self, now):
+        """Take the next message that may be sent now (caller holds the lock), or (None, seconds to wait)"""
+        global_wait = self._global_bucket.wait_time(now)
+        earliest = None
+        for chat_id, queue in self._chats.items():
+            if chat_id in self._busy:
+                continue
+            wait = max(global_wait, self._paused_until.get(chat_id, 0) - now, self._chat_bucket(chat_id).wait_time(now))
+            if wait > 0:
+                earliest = wait if earliest is None else min(earliest, wait)
+                continue
+
+            item = queue.popleft()
+            if item.kind == 'edit':
+                self._pending_edits.pop((chat_id, item.message), None)
+            while queue and item.can_merge(queue[0]):
+                item.merge(queue.popleft())
+                self._stats['merged'] += 1
+            if queue:
+                self._chats.move_to_end(chat_id)  # Other chats go first
+            else:
+                del self._chats[chat_id]
+            self._global_bucket.take(now)
+            self._chat_bucket(chat_id).take(now)
+            self._paused_until.pop(chat_id, None)
+            self._busy.add(chat_id)
+            return item, None
+        return None, earliest
+
+    def _deliver(self, item):
+        result, error, retry = None, None, False
+        try:
+            result = self._call(item)
+        except ApiTelegramException as e:
+            if e.error_code == 429:
+                retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+                logger.warning(f"Telegram rate limit for chat {item.chat_id}, retrying in {retry_after}s")
+                with self._cond:
+                    self._paused_until[item.chat_id] = time.monotonic() + retry_after
+                    self._stats['rate_limited'] += 1
+                retry = True
+            elif e.error_code == 400 and item.parse_mode and "parse" in e.description.lower():
+                logger.warning(f"Markdown parsing failed, sending plain text: {e.description}")
+                item.text, item.parse_mode = item.plain_text or item.text, None
+                retry = True
+            elif item.kind == 'edit' and "message is not modified" in e.description:
+                pass
+            else:
+                error = e
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            newer_edit = self._pending_edits.get((item.chat_id, item.message)) if item.kind == 'edit' else None
+            if retry and newer_edit:
+                newer_edit.futures += item.futures  # A newer text for the message is already queued
+                self._stats['coalesced'] += 1
+            elif retry:
+                self._chats.setdefault(item.chat_id, deque()).appendleft(item)
+                if item.kind == 'edit':
+                    self._pending_edits[(item.chat_id, item.message)] = item
+            elif error:
+                self._stats['errors'] += 1
+            else:
+                self._stats['edited' if item.kind == 'edit' else 'sent'] += 1
+            self._busy.discard(item.chat_id)
+            if item.chat_id not in self._chats and self._chat_bucket(item.chat_id).is_full(time.monotonic()):
+                del self._chat_buckets[item.chat_id]
+            self._cond.notify_all()
+
+        if retry:
+            return
+        if error:
+            logger.error(f"Failed to {item.kind} Telegram message in chat {item.chat_id}: {error}")
+        for future in item.futures:
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _call(self, item):
+        if item.kind == 'edit':
+            message_id = item.message
+            if isinstance(message_id, Future):
+                if message_id.exception():
+                    # The message never made it; show the update as a new message, edited from then on
+                    key = (item.chat_id, message_id)
+                    if key not in self._replacements:
+                        sent = self.bot.send_message(item.chat_id, item.text, parse_mode=item.parse_mode)
+                        self._replacements[key] = sent.message_id
+                        return sent
+                    message_id = self._replacements[key]
+                else:
+                    message_id = message_id.result().message_id
+            return self.bot.edit_message_text(item.text, item.chat_id, message_id, parse_mode=item.parse_mode)
+        return self.bot.send_message(
+            item.chat_id, item.text, parse_mode=item.parse_mode,
+            reply_markup=item.reply_markup, reply_to_message_id=item.reply_to_message_id
+        )
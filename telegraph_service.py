@@ -1,7 +1,10 @@
 from telegraph import Telegraph
+from telegraph.utils import html_to_nodes
+import json
 import logging
 import requests
-from config import TELEGRAPH_TOKEN
+from http_client import shared_client
+from config import TELEGRAPH_TOKEN, HTTP_DEADLINE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +14,8 @@ class TelegraphService:
         try:
             self.telegraph = Telegraph()
             self.token = TELEGRAPH_TOKEN
+            self.api_url = "https://api.telegra.ph"
+            self.http_client = shared_client
             self.is_initialized = False
             
             if self.token:
@@ -62,7 +67,7 @@ class TelegraphService:
                 formatted_content = formatted_content[:60000] + "... [Content truncated]"
             
             # Create the page
-            response = self.telegraph.create_page(
+            response = self._create_page_api(
                 title=title[:256],  # Telegraph title limit
                 html_content=formatted_content,
             )
@@ -84,6 +89,24 @@ class TelegraphService:
             logger.error(f"Failed to create Telegraph page: {e}")
             return None
     
+    def _create_page_api(self, title, html_content):
+        """Call createPage through the shared pooled/retrying HTTP client"""
+        response = self.http_client.post(
+            f"{self.api_url}/createPage",
+            data={
+                'access_token': self.token,
+                'title': title,
+                'content': json.dumps(html_to_nodes(html_content), ensure_ascii=False),
+                'return_content': 'false'
+            },
+            timeout=30,
+            deadline=HTTP_DEADLINE_SECONDS
+        )
+        result = response.json()
+        if not result.get('ok'):
+            raise Exception(f"Telegraph API error: {result.get('error')}")
+        return result['result']
+    
     def _format_content(self, content, video_url=None):
         """Format content for Telegraph"""
         try:
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite artifact index behind /status, /cleanup and eviction
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from artifact_index import ArtifactIndex, artifact_index, AUDIO, TRANSCRIPT, SUMMARY, CHUNK
+from openrouter_summarization_service import OpenRouterSummarizationService
+from transcription_service import TranscriptionService
+
+
+def write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_record_and_stats():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        index.record(write(os.path.join(tmp_dir, "audio_a.mp3"), 1000), AUDIO, "a", source="mp3")
+        index.record(write(os.path.join(tmp_dir, "audio_b.mp3"), 3000), AUDIO, "b", source="mp3")
+        index.record(write(os.path.join(tmp_dir, "audio_a.txt"), 50), TRANSCRIPT, "a")
+
+        stats = index.get_stats()
+        assert stats[AUDIO] == {'files': 2, 'bytes': 4000}
+        assert stats[TRANSCRIPT] == {'files': 1, 'bytes': 50}
+
+        # Recording a path again replaces its entry
+        index.record(write(os.path.join(tmp_dir, "audio_a.mp3"), 500), AUDIO, "a", source="wav16k")
+        assert index.get_stats()[AUDIO] == {'files': 2, 'bytes': 3500}
+        [artifact] = index.find(kinds=(AUDIO,), video_id="a")
+        assert artifact['source'] == "wav16k"
+    print("✅ Artifacts recorded with kind, size and source")
+
+
+def test_created_on_first_use():
+    """Importing or constructing the index writes nothing; the shared one can be moved to a temp dir"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        subprocess.run([sys.executable, "-c", "import artifact_index"], cwd=tmp_dir, check=True,
+                       env={**os.environ, 'PYTHONPATH': repo_dir})
+        assert not os.path.exists(os.path.join(tmp_dir, "cache"))
+
+        index = ArtifactIndex(os.path.join(tmp_dir, "cache", "artifacts.db"))
+        assert not os.path.exists(os.path.join(tmp_dir, "cache"))
+        assert index.is_empty() and os.path.exists(index.path)
+
+        shared_path = artifact_index.path
+        artifact_index.open(os.path.join(tmp_dir, "shared", "artifacts.db"))
+        try:
+            artifact_index.record(write(os.path.join(tmp_dir, "audio_a.mp3"), 10), AUDIO, "a")
+            assert ArtifactIndex(os.path.join(tmp_dir, "shared", "artifacts.db")).get_stats()[AUDIO]['files'] == 1
+        finally:
+            artifact_index.open(shared_path)
+    print("✅ Index database created on first use, shared index redirectable")
+
+
+def test_touch_orders_by_last_access():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"), touch_batch=1000, touch_interval=60)
+        paths = [write(os.path.join(tmp_dir, f"{name}.summary.txt"), 10) for name in "abc"]
+        for path in paths:
+            index.record(path, SUMMARY)
+            time.sleep(0.01)
+        index.touch(paths[0])
+
+        # Touches are buffered and written before queries
+        assert index._pending_touches
+        assert [os.path.basename(a['path']) for a in index.find()] == ["b.summary.txt", "c.summary.txt", "a.summary.txt"]
+        assert not index._pending_touches
+
+        index.remove(paths[1:])
+        assert [a['path'] for a in index.find()] == [os.path.abspath(paths[0])]
+    print("✅ Last access is batched and orders artifacts for eviction")
+
+
+def test_backfill_existing_files():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dirs = {name: os.path.join(tmp_dir, name) for name in ('downloads', 'transcriptions', 'cache', 'chunks')}
+        for directory in dirs.values():
+            os.makedirs(directory)
+        write(os.path.join(dirs['downloads'], "audio_abc.mp3"), 100)
+        write(os.path.join(dirs['downloads'], "audio_def.16k.wav"), 200)
+        write(os.path.join(dirs['downloads'], "audio_def.16k.wav.part"), 50)  # Unfinished download
+        write(os.path.join(dirs['transcriptions'], "audio_abc.txt"), 10)
+        write(os.path.join(dirs['cache'], "abc.summary.txt"), 5)
+        write(os.path.join(dirs['chunks'], f"{'0' * 64}.json"), 7)
+
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        assert index.is_empty()
+        assert index.backfill(dirs) == 5
+        assert index.backfill(dirs) == 5  # Already indexed files are kept as they are
+        stats = index.get_stats()
+        assert stats[AUDIO] == {'files': 2, 'bytes': 300}
+        assert {a['video_id'] for a in index.find(kinds=(AUDIO,))} == {"abc", "def"}
+        assert index.find(kinds=(SUMMARY,))[0]['video_id'] == "abc"
+        assert stats[CHUNK]['files'] == 1
+    print("✅ Existing cache files indexed by name")
+
+
+def test_services_write_to_index():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+            service = OpenRouterSummarizationService()
+            service.artifact_index = index
+            service._save_to_cache("vid", "Summary")
+            service._save_cached_chunk("a" * 64, "Chunk summary")
+
+            transcription_service = TranscriptionService()
+            transcription_service.artifact_index = index
+            transcription_service.transcriptions_dir = tmp_dir
+            transcription_service.save_transcription("audio_vid", "Transcript", source="youtube captions")
+
+            [summary] = index.find(kinds=(SUMMARY,))
+            assert summary['video_id'] == "vid" and summary['source'].startswith(f"{service.model} prompt ")
+            assert index.get(summary['path']) == summary and index.get("missing.txt") is None
+            assert summary['path'] == os.path.abspath(service._get_cache_paths("vid")['summary'])
+            [transcript] = index.find(kinds=(TRANSCRIPT,))
+            assert (transcript['video_id'], transcript['source']) == ("vid", "youtube captions")
+            assert index.get_stats()[CHUNK]['files'] == 1
+
+            transcription_service.cleanup_transcription_files("audio_vid.mp3")
+            assert TRANSCRIPT not in index.get_stats()
+        finally:
+            os.chdir(cwd)
+    print("✅ Summaries, chunks and transcripts are indexed as they are written")
+
+
+def test_concurrent_writers():
+    """Each thread has its own connection; WAL lets them write without errors"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+
+        def writer(worker):
+            for i in range(50):
+                index.record(os.path.join(tmp_dir, f"{worker}_{i}.json"), CHUNK)
+                index.touch(os.path.join(tmp_dir, f"{worker}_{i}.json"))
+
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert index.get_stats()[CHUNK]['files'] == 400
+        assert index._db().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    print("✅ Concurrent writers share the index")
+
+
+def test_status_query_is_fast():
+    """Status over many artifacts is an indexed aggregate, not a directory scan"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        index._executemany(
+            "INSERT INTO artifacts (path, video_id, kind, size, created, accessed, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(f"/cache/chunks/{i}.json", None, CHUNK, 1000, i, i, None) for i in range(50000)]
+        )
+        start = time.perf_counter()
+        stats = index.get_stats()
+        oldest = index.find(kinds=(CHUNK,), limit=10)
+        elapsed = time.perf_counter() - start
+        assert stats[CHUNK] == {'files': 50000, 'bytes': 50000000}
+        assert [artifact['accessed'] for artifact in oldest] == list(range(10))
+        assert elapsed < 0.5, elapsed
+    print(f"✅ Status and eviction queries over 50k artifacts in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing artifact index...\n")
+    test_record_and_stats()
+    test_created_on_first_use()
+    test_touch_orders_by_last_access()
+    test_backfill_existing_files()
+    test_services_write_to_index()
+    test_concurrent_writers()
+    test_status_query_is_fast()
+    print("\n🎉 Artifact index tests passed!")
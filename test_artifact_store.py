@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test atomic, checksummed and compressed artifact storage
+"""
+
+import os
+import random
+import tempfile
+from unittest import mock
+
+import artifact_store
+from artifact_store import CorruptArtifact, read_json, read_text, write_json, write_text
+from openrouter_summarization_service import OpenRouterSummarizationService
+from transcription_service import TranscriptionService
+
+WORDS = ("инфляция ставка центробанк кредиты ипотека рубль бюджет налоги нейросеть обучение "
+         "модели видеокарты ну вот как я уже говорил давайте дальше").split()
+
+
+def make_transcript(words=20000, seed=0):
+    rng = random.Random(seed)
+    lines = [' '.join(rng.choice(WORDS) for _ in range(12)).capitalize() + '.' for _ in range(words // 12)]
+    return '\n'.join(lines)
+
+
+def expect_corrupt(path):
+    try:
+        read_text(path)
+    except CorruptArtifact:
+        return
+    raise AssertionError(f"{path} was read as valid")
+
+
+def test_round_trip_and_compression():
+    text = make_transcript()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sizes = {}
+        for compression in ('none', 'gzip', 'zstd'):
+            path = os.path.join(tmp_dir, f"{compression}.txt")
+            write_text(path, text, compression=compression)
+            assert read_text(path) == text
+            sizes[compression] = os.path.getsize(path)
+        assert sizes['gzip'] * 3 < sizes['none'], sizes
+        assert sizes['zstd'] * 3 < sizes['none'], sizes  # gzip when zstandard isn't installed
+
+        write_json(os.path.join(tmp_dir, "value.json"), {'summary': "Итоги", 'items': [1, 2]})
+        assert read_json(os.path.join(tmp_dir, "value.json")) == {'summary': "Итоги", 'items': [1, 2]}
+        assert not [name for name in os.listdir(tmp_dir) if name.endswith('.tmp')]
+    print(f"✅ Round trip; {len(text.encode()) // 1024} KB transcript stored in "
+          f"{sizes['gzip'] // 1024} KB gzip, {sizes['zstd'] // 1024} KB "
+          f"{artifact_store.resolve_compression('zstd')}")
+
+
+def test_legacy_plain_files():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "audio_old.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("Старая расшифровка без заголовка")
+        assert read_text(path) == "Старая расшифровка без заголовка"
+    print("✅ Legacy plain files are still readable")
+
+
+def test_damage_is_detected():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for compression in ('none', 'gzip'):
+            path = os.path.join(tmp_dir, f"{compression}.txt")
+            write_text(path, make_transcript(2000), compression=compression)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            # Truncated (the old failure: a crash mid-write)
+            with open(path, 'wb') as f:
+                f.write(data[:len(data) // 2])
+            expect_corrupt(path)
+
+            # One flipped byte in the payload
+            damaged = bytearray(data)
+            damaged[-20] ^= 0x01
+            with open(path, 'wb') as f:
+                f.write(bytes(damaged))
+            expect_corrupt(path)
+
+        path = os.path.join(tmp_dir, "future.txt")
+        with open(path, 'wb') as f:
+            f.write(b"%ARTIFACT 99 none 2 0000\nhi")
+        expect_corrupt(path)
+    print("✅ Truncated, damaged and unknown-version files are rejected")
+
+
+def test_failed_write_keeps_previous_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "summary.txt")
+        write_text(path, "Old summary")
+        with mock.patch('artifact_store.os.fsync', side_effect=OSError("disk full")):
+            try:
+                write_text(path, "New summary")
+            except OSError:
+                pass
+            else:
+                raise AssertionError("write should have failed")
+        assert read_text(path) == "Old summary"
+        assert os.listdir(tmp_dir) == ["summary.txt"]
+    print("✅ A failed write leaves the previous file and no temp files")
+
+
+def test_services_treat_damage_as_a_miss():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            service = OpenRouterSummarizationService()
+            service._save_to_cache("vid", "Summary of the video")
+            path = service._get_cache_paths("vid")['summary']
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path, 'wb') as f:
+                f.write(data[:-5])
+
+            service = OpenRouterSummarizationService()
+            assert service._load_from_cache("vid") is None
+
+            transcription_service = TranscriptionService()
+            transcription_service.transcriptions_dir = tmp_dir
+            txt_file = transcription_service.save_transcription("audio_vid", "Transcript text")
+            with open(txt_file, 'rb') as f:
+                data = f.read()
+            with open(txt_file, 'wb') as f:
+                f.write(data[:-3])
+            fresh = TranscriptionService()
+            fresh.transcriptions_dir = tmp_dir
+            assert fresh.get_cached_transcription("audio_vid") is None
+        finally:
+            os.chdir(cwd)
+    print("✅ Damaged summaries and transcripts are recomputed, not served")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing artifact storage...\n")
+    test_round_trip_and_compression()
+    test_legacy_plain_files()
+    test_damage_is_detected()
+    test_failed_write_keeps_previous_file()
+    test_services_treat_damage_as_a_miss()
+    print("\n🎉 Artifact storage tests passed!")
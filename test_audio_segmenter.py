@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test silence-aware segment planning and SRT stitching for segmented transcription
+"""
+
+from audio_segmenter import (
+    parse_silencedetect_output, plan_segments, parse_srt, format_srt, stitch_segments
+)
+
+
+def test_parse_silencedetect_output():
+    """silencedetect log lines become (start, end) intervals"""
+    output = """
+[silencedetect @ 0x1] silence_start: -0.01
+[silencedetect @ 0x1] silence_end: 1.5 | silence_duration: 1.51
+size=N/A time=00:10:00.00 bitrate=N/A
+[silencedetect @ 0x1] silence_start: 420.25
+[silencedetect @ 0x1] silence_end: 421.75 | silence_duration: 1.5
+"""
+    assert parse_silencedetect_output(output) == [(0.0, 1.5), (420.25, 421.75)]
+    print("✅ silencedetect output parsed")
+
+
+def test_plan_segments_cuts_at_silence():
+    """Cuts land in silences inside the 5-10 minute window"""
+    silences = [(100, 101), (440, 442), (530, 531), (900, 902), (1350, 1352)]
+    segments = plan_segments(1800, silences, min_length=300, max_length=600)
+
+    assert segments[0] == (0.0, 441.0)
+    assert segments[1] == (441.0, 901.0)
+    assert segments[-1][1] == 1800
+    for start, end in segments[:-1]:
+        assert 300 <= end - start <= 600
+    # Segments are contiguous
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+    print(f"✅ Planned {len(segments)} segments at silences")
+
+
+def test_plan_segments_without_silence():
+    """Without silences, segments are cut hard at max_length"""
+    segments = plan_segments(1500, [], min_length=300, max_length=600)
+    assert segments == [(0.0, 600.0), (600.0, 1200.0), (1200.0, 1500)]
+
+    short = plan_segments(200, [], min_length=300, max_length=600)
+    assert short == [(0.0, 200)]
+    print("✅ Hard cuts used when no silence is found")
+
+
+def test_stitch_segments_adjusts_timestamps():
+    """Segment cues are shifted by their offsets and kept in order"""
+    first = parse_srt("""1
+00:00:00,000 --> 00:00:04,500
+Привет всем.
+
+2
+00:00:04,500 --> 00:00:09,000
+Сегодня говорим о важном.
+""")
+    second = parse_srt("""1
+00:00:01,250 --> 00:00:05,000
+Вторая часть.
+""")
+
+    cues = stitch_segments([(441.0, second), (0.0, first)])
+    assert [text for _, _, text in cues] == [
+        "Привет всем.", "Сегодня говорим о важном.", "Вторая часть."
+    ]
+    assert cues[2][0] == 442.25
+
+    srt = format_srt(cues)
+    assert "00:07:22,250 --> 00:07:26,000" in srt
+    assert parse_srt(srt) == cues
+    print("✅ Segments stitched with adjusted timestamps")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing audio segmenter...\n")
+    test_parse_silencedetect_output()
+    test_plan_segments_cuts_at_silence()
+    test_plan_segments_without_silence()
+    test_stitch_segments_adjusts_timestamps()
+    print("\n🎉 Audio segmenter tests passed!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test bot command handlers end to end against a local fake Bot API server
+"""
+
+import os
+import tempfile
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+
+from telebot import types
+
+from test_telegram_outbox import FakeTelegram
+
+CHAT_ID = 42
+
+
+def make_message(text):
+    return types.Message.de_json({
+        'message_id': 1, 'date': int(time.time()), 'text': text,
+        'chat': {'id': CHAT_ID, 'type': 'private'},
+        'from': {'id': CHAT_ID, 'is_bot': False, 'first_name': 'Test'},
+    })
+
+
+class BotUnderTest:
+    """The bot's outbox sending to a fake Bot API, caches in a temporary directory"""
+
+    def __init__(self):
+        import bot
+        self.bot = bot
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake = FakeTelegram()
+        self.saved = (bot.outbox.bot, bot.openrouter_service.cache_dir, bot.openrouter_service.chunk_cache_dir)
+        bot.outbox.bot = self.fake.bot
+        bot.openrouter_service.cache_dir = self.tmp.name
+        bot.openrouter_service.chunk_cache_dir = os.path.join(self.tmp.name, "chunks")
+        bot.openrouter_service.memory_cache.clear()
+        bot.outbox.start()
+
+    def replies(self):
+        bot = self.bot
+        assert bot.outbox.wait_idle(10)
+        return [text for _, method, _, text in self.fake.calls(CHAT_ID) if method == 'sendMessage']
+
+    def close(self):
+        bot = self.bot
+        bot.outbox.stop()
+        bot.outbox.bot, bot.openrouter_service.cache_dir, bot.openrouter_service.chunk_cache_dir = self.saved
+        self.fake.close()
+        self.tmp.cleanup()
+
+
+def test_chunks_command():
+    under_test = BotUnderTest()
+    bot = under_test.bot
+    try:
+        bot.openrouter_service._save_chunk_summaries_to_cache("dQw4w9WgXcQ", ["First part", "Second part"])
+        bot.chunks_command(make_message("/chunks https://youtu.be/dQw4w9WgXcQ"))
+        [reply] = under_test.replies()
+        assert "Cached Chunk Summaries for dQw4w9WgXcQ" in reply
+        assert "First part" in reply and "Second part" in reply
+    finally:
+        under_test.close()
+    print("✅ /chunks sends the cached chunk summaries")
+
+
+def test_commands_reach_their_handlers():
+    """Commands aren't swallowed by the catch-all URL handler"""
+    under_test = BotUnderTest()
+    bot = under_test.bot
+    threaded, bot.bot.threaded = bot.bot.threaded, False  # Run handlers on this thread
+    try:
+        bot.openrouter_service._save_chunk_summaries_to_cache("dQw4w9WgXcQ", ["First part"])
+        bot.bot.process_new_messages([make_message("/chunks dQw4w9WgXcQ")])
+        bot.bot.process_new_messages([make_message("hello")])
+        replies = under_test.replies()
+        assert len(replies) == 2, replies
+        assert "Cached Chunk Summaries for dQw4w9WgXcQ" in replies[0]
+        assert replies[1] == "Please send a valid YouTube video URL."
+    finally:
+        bot.bot.threaded = threaded
+        under_test.close()
+    print("✅ Commands are dispatched before the catch-all handler")
+
+
+def test_no_compaction_for_cached_summaries():
+    """Compaction (and its stats) only happens when a completion will be requested"""
+    under_test = BotUnderTest()
+    bot = under_test.bot
+    initialized, bot.openrouter_service.is_initialized = bot.openrouter_service.is_initialized, True
+    transcript = "\n".join(["[Музыка]"] + ["Сегодня поговорим о бюджете города на следующий год."] * 5)
+    try:
+        bot.openrouter_service._save_to_cache("cachedvideo", "Cached summary")
+        videos = bot.compaction_stats.get_stats()['videos']
+        assert bot.compact_for_summary({'transcription': transcript, 'video_id': "cachedvideo"}) == transcript
+        assert bot.compaction_stats.get_stats()['videos'] == videos
+
+        state = {'transcription': transcript, 'video_id': "newvideo"}
+        assert bot.compact_for_summary(state) == "Сегодня поговорим о бюджете города на следующий год."
+        assert bot.compaction_stats.get_stats()['videos'] == videos + 1 and state['tokens_saved'] > 0
+    finally:
+        bot.openrouter_service.is_initialized = initialized
+        under_test.close()
+    print("✅ Cached summaries skip transcript compaction")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing bot commands...\n")
+    test_chunks_command()
+    test_commands_reach_their_handlers()
+    test_no_compaction_for_cached_summaries()
+    print("\n🎉 Bot command tests passed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the sharded cache layout, legacy flat-file fallback and migration
+"""
+
+import os
+import tempfile
+from collections import Counter
+from unittest import mock
+
+import cache_layout
+from artifact_index import ArtifactIndex, AUDIO, TRANSCRIPT, SUMMARY, CHUNK
+from artifact_store import write_json, write_text
+from cache_layout import shard_dir, shard_path
+from migrate_cache_layout import migrate
+from openrouter_summarization_service import OpenRouterSummarizationService
+from transcription_service import TranscriptionService
+
+
+def write(path, data=b'x'):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def make_dirs(tmp_dir):
+    dirs = {name: os.path.join(tmp_dir, name) for name in ('downloads', 'transcriptions', 'cache')}
+    dirs['chunks'] = os.path.join(dirs['cache'], 'chunks')
+    for directory in dirs.values():
+        os.makedirs(directory)
+    return dirs
+
+
+def make_services(dirs, index):
+    transcription_service = TranscriptionService()
+    transcription_service.transcriptions_dir = dirs['transcriptions']
+    transcription_service.artifact_index = index
+    service = OpenRouterSummarizationService()
+    service.cache_dir = dirs['cache']
+    service.chunk_cache_dir = dirs['chunks']
+    service.artifact_index = index
+    return transcription_service, service
+
+
+def test_shards_are_small_and_stable():
+    path = shard_path("downloads", "dQw4w9WgXcQ", "audio_dQw4w9WgXcQ.mp3")
+    parts = path.split(os.sep)
+    assert len(parts) == 4 and all(len(part) == 2 for part in parts[1:3]), path
+    assert path == shard_path("downloads", "dQw4w9WgXcQ", "audio_dQw4w9WgXcQ.mp3")
+    # A video's files share the same shard in every cache directory
+    assert shard_dir("transcriptions", "dQw4w9WgXcQ").split(os.sep)[1:] == parts[1:3]
+
+    per_shard = Counter(shard_dir("", f"video{i:07d}") for i in range(200000))
+    assert len(per_shard) > 60000 and max(per_shard.values()) < 20, (len(per_shard), max(per_shard.values()))
+    print(f"✅ 200k videos spread over {len(per_shard)} shards, at most {max(per_shard.values())} per directory")
+
+
+def test_services_read_legacy_and_write_shards():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dirs = make_dirs(tmp_dir)
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        transcription_service, service = make_services(dirs, index)
+
+        # Files written by the flat layout
+        write_text(os.path.join(dirs['transcriptions'], "audio_old.txt"), "Old transcript")
+        write_text(os.path.join(dirs['cache'], "old.summary.txt"), "Old summary")
+        write_json(os.path.join(dirs['chunks'], f"{'c' * 64}.json"), {'summary': "Old chunk"})
+        assert transcription_service.get_cached_transcription("audio_old") == "Old transcript"
+        assert service._load_from_cache("old") == "Old summary"
+        assert service._load_cached_chunk('c' * 64) == "Old chunk"
+
+        # New files go to shards only
+        txt_file = transcription_service.save_transcription("audio_new", "New transcript")
+        service._save_to_cache("new", "New summary")
+        assert txt_file == shard_path(dirs['transcriptions'], "new", "audio_new.txt")
+        assert os.path.exists(shard_path(dirs['cache'], "new", "new.summary.txt"))
+        assert sorted(name for name in os.listdir(dirs['cache']) if name.endswith('.txt')) == ["old.summary.txt"]
+
+        # With the fallback off, unmigrated flat files are no longer looked up
+        with mock.patch.object(cache_layout, 'CACHE_LEGACY_LOOKUP', False):
+            fresh_transcriptions, fresh = make_services(dirs, index)
+            assert fresh_transcriptions.get_cached_transcription("audio_old") is None
+            assert fresh._load_from_cache("old") is None
+            assert fresh_transcriptions.get_cached_transcription("audio_new") == "New transcript"
+    print("✅ Legacy flat files are found, new files are written to shards")
+
+
+def test_migration_moves_files_and_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dirs = make_dirs(tmp_dir)
+        index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        audio = write(os.path.join(dirs['downloads'], "audio_vid.16k.wav"), b'x' * 100)
+        write(os.path.join(dirs['downloads'], "audio_vid2.mp3.part"))  # Unfinished download stays
+        write_text(os.path.join(dirs['transcriptions'], "audio_vid.txt"), "Transcript")
+        write_text(os.path.join(dirs['cache'], "vid.summary.txt"), "Stale summary")
+        write_text(shard_path(dirs['cache'], "vid", "vid.summary.txt", create=True), "Current summary")
+        write_json(os.path.join(dirs['chunks'], f"{'a' * 64}.json"), {'summary': "Chunk"})
+        assert index.backfill(dirs) == 5
+        index.touch(audio)
+
+        assert migrate(dirs, index=index, dry_run=True) == {'moved': 3, 'replaced': 1, 'skipped': 1}
+        assert os.path.exists(audio)
+
+        assert migrate(dirs, index=index) == {'moved': 3, 'replaced': 1, 'skipped': 1}
+        flat = {name for directory in dirs.values() for name in os.listdir(directory)
+                if os.path.isfile(os.path.join(directory, name)) and not name.startswith("artifacts.db")}
+        assert flat == {"audio_vid2.mp3.part"}
+        assert migrate(dirs, index=index) == {'moved': 0, 'replaced': 0, 'skipped': 1}
+
+        # Index entries follow the files, and everything is found without the fallback
+        moved_audio = shard_path(dirs['downloads'], "vid", "audio_vid.16k.wav")
+        assert [a['path'] for a in index.find(kinds=(AUDIO,))] == [os.path.abspath(moved_audio)]
+        assert index.find(kinds=(SUMMARY,))[0]['path'] == os.path.abspath(shard_path(dirs['cache'], "vid", "vid.summary.txt"))
+        assert index.get_stats()[TRANSCRIPT]['files'] == 1 and index.get_stats()[CHUNK]['files'] == 1
+        with mock.patch.object(cache_layout, 'CACHE_LEGACY_LOOKUP', False):
+            transcription_service, service = make_services(dirs, index)
+            assert transcription_service.get_cached_transcription("audio_vid") == "Transcript"
+            assert service._load_from_cache("vid") == "Current summary"
+            assert service._load_cached_chunk('a' * 64) == "Chunk"
+
+        # A fresh index finds the sharded files too
+        assert ArtifactIndex(os.path.join(tmp_dir, "fresh.db")).backfill(dirs) == 4
+    print("✅ Migration moves flat files into shards and updates the index")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing sharded cache layout...\n")
+    test_shards_are_small_and_stable()
+    test_services_read_legacy_and_write_shards()
+    test_migration_moves_files_and_index()
+    print("\n🎉 Cache layout tests passed!")
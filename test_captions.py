@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test the YouTube captions fast path: parsing, track selection and fetching
+"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from caption_parser import parse_captions, parse_vtt, parse_srv
+from youtube_downloader import YouTubeDownloader, select_caption_track
+
+# YouTube auto captions repeat the previous line in each cue and carry word timings
+AUTO_VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.000 align:start position:0%
+{blank}
+hello<00:00:00.500><c> world</c>
+
+00:00:02.000 --> 00:00:02.010 align:start position:0%
+hello world
+{blank}
+
+00:00:02.010 --> 00:00:04.000 align:start position:0%
+hello world
+this<00:00:02.500><c> is</c><00:00:03.000><c> a test</c>
+""".format(blank=' ')
+
+MANUAL_VTT = """WEBVTT
+
+1
+00:00:00.000 --> 00:00:03.000
+<i>Привет</i> &amp; добро пожаловать
+
+2
+00:00:03.000 --> 00:00:06.000
+Это тест
+"""
+
+SRV3 = """<?xml version="1.0" encoding="utf-8" ?><timedtext format="3">
+<body>
+<p t="0" d="2000"><s>hello</s><s t="500"> world</s></p>
+<p t="2000" d="2000">this is a test</p>
+</body></timedtext>"""
+
+SRV1 = """<?xml version="1.0" encoding="utf-8" ?><transcript>
+<text start="0" dur="2">hello world</text>
+<text start="2" dur="2">this is &amp;#39;a&amp;#39; test</text>
+</transcript>"""
+
+INFO = {
+    'duration': 60,
+    'subtitles': {
+        'ru': [{'ext': 'json3', 'url': 'http://x/ru.json3'}, {'ext': 'vtt', 'url': 'http://x/ru.vtt'}],
+    },
+    'automatic_captions': {
+        'en-orig': [{'ext': 'srv3', 'url': 'http://x/en-orig.srv3'}, {'ext': 'vtt', 'url': 'http://x/en-orig.vtt'}],
+        'en': [{'ext': 'vtt', 'url': 'http://x/en.vtt'}],
+        'ru': [{'ext': 'vtt', 'url': 'http://x/ru-translated.vtt'}],
+    },
+}
+
+
+def test_parse_formats():
+    """All caption formats come out as the same plain text"""
+    assert parse_vtt(AUTO_VTT) == "hello world\nthis is a test"
+    assert parse_vtt(MANUAL_VTT) == "Привет & добро пожаловать\nЭто тест"
+    assert parse_srv(SRV3) == "hello world\nthis is a test"
+    assert parse_captions(SRV1, 'srv1') == "hello world\nthis is 'a' test"
+    try:
+        parse_captions("", 'json3')
+        assert False, "json3 should be rejected"
+    except ValueError:
+        pass
+    print("✅ VTT and srv captions parsed without rolling duplicates")
+
+
+def test_track_selection():
+    """Manual subtitles win, auto captions prefer the original language"""
+    track = select_caption_track(INFO, ['ru', 'en'])
+    assert track == {'kind': 'manual', 'lang': 'ru', 'ext': 'vtt', 'url': 'http://x/ru.vtt'}
+
+    # Only English wanted: the auto track in the spoken language, not a translation
+    track = select_caption_track(INFO, ['en'])
+    assert track['kind'] == 'auto'
+    assert track['url'] == 'http://x/en-orig.vtt'
+
+    assert select_caption_track(INFO, ['en'], mode='manual') is None
+    assert select_caption_track(INFO, ['de']) is None
+    assert select_caption_track({}, ['en']) is None
+    print("✅ Caption track selection follows the policy")
+
+
+class CaptionHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = AUTO_VTT.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/vtt')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_downloader(tmp_dir, info):
+    """Downloader with a stand-in yt-dlp that prints the given video info"""
+    info_path = os.path.join(tmp_dir, 'info.json')
+    with open(info_path, 'w') as f:
+        json.dump(info, f)
+    script_path = os.path.join(tmp_dir, 'yt-dlp')
+    with open(script_path, 'w') as f:
+        f.write(f"#!{sys.executable}\nprint(open({info_path!r}).read())\n")
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IEXEC)
+
+    downloader = YouTubeDownloader()
+    downloader.yt_dlp_path = script_path
+    downloader.captions_mode = 'any'
+    downloader.caption_languages = ['en']
+    downloader.caption_min_words_per_minute = 1
+    return downloader
+
+
+def test_fetch_captions():
+    """Captions are fetched and parsed; sparse ones are rejected"""
+    server = HTTPServer(('127.0.0.1', 0), CaptionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/captions.vtt"
+    info = {'duration': 60, 'automatic_captions': {'en': [{'ext': 'vtt', 'url': url}]}}
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            downloader = make_downloader(tmp_dir, info)
+            video_url = "https://youtu.be/dQw4w9WgXcQ"
+            assert downloader.fetch_captions(video_url) == "hello world\nthis is a test"
+
+            # 6 words for a minute of video is too sparse to trust
+            downloader.caption_min_words_per_minute = 30
+            assert downloader.fetch_captions(video_url) is None
+
+            downloader.captions_mode = 'off'
+            downloader.caption_min_words_per_minute = 1
+            assert downloader.fetch_captions(video_url) is None
+    finally:
+        server.shutdown()
+    print("✅ Captions fetched through yt-dlp info")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing YouTube captions...\n")
+    test_parse_formats()
+    test_track_selection()
+    test_fetch_captions()
+    print("\n🎉 Caption tests passed!")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed chunk summary cache against a local mock endpoint
+"""
+
+import os
+import tempfile
+
+from artifact_index import ArtifactIndex
+from openrouter_stub import chunk_text, make_service, start_stub
+from openrouter_summarization_service import chunk_cache_key, split_text_into_chunks, PROMPT_VERSION
+from test_concurrent_summarization import start_mock, make_chunks, ok_summaries
+
+
+def start_flaky():
+    """Stub that fails chunks containing BROKEN with a 503 while server.broken is set"""
+    server = start_stub()
+    server.broken = True
+    server.status = lambda payload: 503 if server.broken and 'BROKEN' in (chunk_text(payload) or '') else 200
+    return server
+
+
+def long_text_with_broken_chunk():
+    """About 100k tokens of one long run-on sentence; only one chunk contains the BROKEN marker"""
+    words = [f"word{i}" for i in range(30000)]
+    words[15000] = "BROKEN"
+    return ' '.join(words)
+
+
+def test_cache_key():
+    """The key changes with the chunk, model, prompt version or params, and nothing else"""
+    params = {'max_tokens': 8192, 'temperature': 0.1, 'top_p': 0.9}
+    key = chunk_cache_key("text", "model-a", 1, params)
+
+    assert key == chunk_cache_key("text", "model-a", 1, dict(reversed(list(params.items()))))
+    assert len({
+        key,
+        chunk_cache_key("text!", "model-a", 1, params),
+        chunk_cache_key("text", "model-b", 1, params),
+        chunk_cache_key("text", "model-a", 2, params),
+        chunk_cache_key("text", "model-a", 1, {**params, 'temperature': 0.5}),
+    }) == 5
+    print("✅ Cache key covers chunk, model, prompt version and params")
+
+
+def test_only_changed_chunks_are_recomputed():
+    """Editing one chunk re-summarizes just that chunk"""
+    server = start_mock()
+    service = make_service(server, 4)
+    chunks = make_chunks(5)
+
+    first = ok_summaries(service._summarize_chunk_results(chunks))
+    assert server.requests == 5
+    assert sum(len(files) for _, _, files in os.walk(service.chunk_cache_dir)) == 5
+
+    chunks[2] = "edited2 " + chunks[2]
+    second = ok_summaries(service._summarize_chunk_results(chunks))
+    assert server.requests == 6
+    assert second[:2] == first[:2] and second[3:] == first[3:]
+    assert second[2] == "Summary of edited2"
+    server.shutdown()
+    print("✅ Only new or changed chunks hit the API")
+
+
+def test_model_or_params_change_recomputes():
+    """A different model or generation params never serve stale summaries"""
+    server = start_mock()
+    service = make_service(server, 4)
+    chunks = make_chunks(3)
+
+    service._summarize_chunk_results(chunks)
+    service.model = "other/model"
+    service._summarize_chunk_results(chunks)
+    assert server.requests == 6
+
+    service.generation_params = {**service.generation_params, 'temperature': 0.7}
+    service._summarize_chunk_results(chunks)
+    assert server.requests == 9
+
+    # Back to the original settings: everything is still cached
+    service.model = "deepseek/deepseek-r1-0528:free"
+    service.generation_params = {**service.generation_params, 'temperature': 0.1}
+    service._summarize_chunk_results(chunks)
+    assert server.requests == 9
+    server.shutdown()
+    print("✅ Model and params are part of the cache key")
+
+
+def test_same_content_different_video():
+    """The same transcript under another video id reuses the chunk summaries"""
+    server = start_mock()
+    service = make_service(server, 4)
+    text = ' '.join(f"word{i}" for i in range(30000))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)  # Per-video chunk lists for /chunks are written under ./cache
+        try:
+            chunks = split_text_into_chunks(text)
+            first, complete = service._summarize_long_text(chunks, video_id='videoA')
+            assert complete
+            requests_made = server.requests
+            assert service._summarize_long_text(chunks, video_id='videoB') == (first, True)
+            assert server.requests == requests_made
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+    print("✅ Same content hits the cache under a different video id")
+
+
+def test_short_transcript_same_content_different_video():
+    """A transcript that fits one chunk is content-addressed too"""
+    server = start_mock()
+    service = make_service(server, 4)
+    text = "Short talk about the city budget. " * 10
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service.cache_dir = tmp_dir
+        service.artifact_index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        first = service.summarize_text(text, video_id='shortA')
+        assert first == "Summary of Short" and server.requests == 1
+        assert service.summarize_text(text, video_id='shortB') == first
+        assert server.requests == 1
+    server.shutdown()
+    print("✅ Short transcripts hit the chunk cache under a different video id")
+
+
+def test_settings_change_skips_video_summary():
+    """A video's summary made with another model, prompt or params is not served"""
+    server = start_stub(answer=lambda payload: [f"Summary by {payload['model']}"])
+    service = make_service(server, 4)
+    text = "Short talk about the city budget. " * 10
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service.cache_dir = tmp_dir
+        service.artifact_index = ArtifactIndex(os.path.join(tmp_dir, "artifacts.db"))
+        primary = service.model
+        assert service.summarize_text(text, video_id='vid') == f"Summary by {primary}"
+        assert service.get_cached_summary('vid') == f"Summary by {primary}"
+
+        service.model = "other/model"
+        assert service.get_cached_summary('vid') is None
+        assert service.summarize_text(text, video_id='vid') == "Summary by other/model"
+        assert server.requests == 2
+
+        # The summary on disk is checked as well, not just the in-memory copy
+        service.model = primary
+        service.memory_cache.clear()
+        assert service.get_cached_summary('vid') is None
+        service.generation_params = {**service.generation_params, 'temperature': 0.7}
+        service.model = "other/model"
+        assert service.get_cached_summary('vid') is None
+        service.generation_params = {**service.generation_params, 'temperature': 0.1}
+        assert service.get_cached_summary('vid') == "Summary by other/model"
+    server.shutdown()
+    print("✅ Video summaries are served only with the settings that made them")
+
+
+def test_failed_chunks_retried_on_next_request():
+    """A gap is reported and not cached; the next request fills it with one API call"""
+    server = start_flaky()
+    service = make_service(server, 4)
+    service.min_coverage = 0.5
+    text = long_text_with_broken_chunk()
+    total = len(split_text_into_chunks(text))
+    assert [('BROKEN' in chunk) for chunk in split_text_into_chunks(text)].count(True) == 1
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            summary = service.summarize_text(text, video_id='gappy')
+            assert summary.startswith(f"Merged {total - 1} parts")
+            assert f"1 of {total} parts of the video could not be summarized" in summary
+            assert not os.path.exists(service._get_cache_paths('gappy')['summary'])
+
+            status = service.get_chunk_status('gappy')
+            assert (status['total'], status['ok']) == (total, total - 1)
+            assert [chunk['status'] for chunk in status['chunks']].count('failed') == 1
+            requests_made = server.requests
+
+            # Provider recovered: only the failed chunk is sent again, plus the new root merge
+            server.broken = False
+            summary = service.summarize_text(text, video_id='gappy')
+            assert server.requests == requests_made + 2
+            assert summary == f"Merged {total} parts"
+            assert service.get_chunk_status('gappy')['ok'] == total
+            assert os.path.exists(service._get_cache_paths('gappy')['summary'])
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+    print("✅ Only failed chunks retried, summary cached once complete")
+
+
+def test_coverage_policy_blocks_reduce():
+    """Below the coverage threshold no summary with gaps is produced"""
+    server = start_flaky()
+    service = make_service(server, 4)
+    service.min_coverage = 1.0
+    text = long_text_with_broken_chunk()
+    total = len(split_text_into_chunks(text))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            summary = service.summarize_text(text, video_id='strict')
+            assert summary.startswith(f"Summarization failed: only {total - 1}/{total} chunks summarized")
+            assert not os.path.exists(service._get_cache_paths('strict')['summary'])
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+    print("✅ Coverage policy enforced before the reduce step")
+
+
+if __name__ == '__main__':
+    print(f"🧪 Testing chunk cache (prompt version {PROMPT_VERSION})...\n")
+    test_cache_key()
+    test_only_changed_chunks_are_recomputed()
+    test_model_or_params_change_recomputes()
+    test_same_content_different_video()
+    test_short_transcript_same_content_different_video()
+    test_settings_change_skips_video_summary()
+    test_failed_chunks_retried_on_next_request()
+    test_coverage_policy_blocks_reduce()
+    print("\n🎉 Chunk cache tests passed!")
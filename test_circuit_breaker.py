@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Test the per-backend circuit breaker and typed backend results
+"""
+
+import threading
+import time
+
+from circuit_breaker import CircuitBreaker, BackendResult, CLOSED, OPEN, HALF_OPEN
+from openrouter_stub import make_service
+from test_concurrent_summarization import make_chunks, ok_summaries, start_mock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_seconds=30, clock=clock)
+
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_success(0.1)  # A success resets the count
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request() and not breaker.is_available()
+    assert breaker.get_stats()['rejected'] == 1
+    print("✅ Circuit opens after consecutive failures")
+
+
+def test_half_open_probe():
+    """After the recovery time one probe goes through; its outcome decides the state"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=30, clock=clock)
+    breaker.allow_request()
+    breaker.record_failure()
+
+    clock.now = 29
+    assert breaker.state == OPEN
+    clock.now = 30
+    assert breaker.state == HALF_OPEN and breaker.is_available()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    assert breaker.allow_request()
+    breaker.record_success(0.5)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    assert breaker.get_stats()['opened'] == 2
+    print("✅ Half-open probe closes or reopens the circuit")
+
+
+def test_calls_wait_for_the_probe():
+    """Calls allowed to wait are held while the probe is out, then follow its verdict"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=30, clock=clock)
+    for probe_succeeds in (True, False):
+        breaker.allow_request()
+        breaker.record_failure()
+        clock.now += 30
+        assert breaker.allow_request()  # The probe
+
+        allowed = []
+        waiters = [threading.Thread(target=lambda: allowed.append(breaker.allow_request(wait=5))) for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        time.sleep(0.1)
+        assert allowed == []
+        if probe_succeeds:
+            breaker.record_success(0.5)
+        else:
+            breaker.record_failure()
+        for waiter in waiters:
+            waiter.join()
+        assert allowed == [probe_succeeds] * 3
+        if probe_succeeds:
+            for _ in allowed:
+                breaker.record_success(0.5)
+    print("✅ Calls behind a half-open probe follow its outcome")
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, slow_call_seconds=5, clock=FakeClock())
+    for _ in range(2):
+        breaker.allow_request()
+        breaker.record_success(12.0)
+    stats = breaker.get_stats()
+    assert stats['state'] == OPEN
+    assert (stats['slow_calls'], stats['failures']) == (2, 0)
+    print("✅ Slow calls open the circuit")
+
+
+def test_backend_result():
+    assert BackendResult.success("text").ok
+    failure = BackendResult.failure("Text too short to summarize.", fault=False)
+    assert not failure.ok and not failure.fault and failure.error.startswith("Text too short")
+    print("✅ Typed backend results")
+
+
+def test_only_backend_faults_count():
+    """Input errors neither open the circuit nor reset its failure count"""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=10, clock=FakeClock())
+    breaker.allow_request()
+    breaker.record(BackendResult.failure("API error: 503"))
+    for _ in range(3):
+        breaker.allow_request()
+        breaker.record(BackendResult.failure("API error: 400", fault=False))
+    assert breaker.state == CLOSED and breaker.get_stats()['consecutive_failures'] == 1
+
+    breaker.allow_request()
+    breaker.record(BackendResult.failure("API error: 503"))
+    assert breaker.state == OPEN
+
+    # A half-open probe that hit a bad request frees the probe without closing the circuit
+    breaker.clock.now += 10
+    assert breaker.allow_request() and not breaker.allow_request()
+    breaker.record(BackendResult.failure("API error: 400", fault=False))
+    assert breaker.state == HALF_OPEN and breaker.allow_request()
+    print("✅ Client errors don't count against the backend")
+
+
+def test_bad_requests_keep_circuit_closed():
+    server = start_mock()
+    service = make_service(server, 1)
+    for _ in range(service.breaker.failure_threshold + 1):
+        assert not service.summarize("invalid request " + "filler " * 20).ok
+    server.shutdown()
+    assert service.breaker.state == CLOSED
+    assert service.breaker.get_stats()['failures'] == 0
+    print("✅ 400 responses leave the circuit closed")
+
+
+def test_summary_mentioning_errors_is_a_success():
+    """A real summary that talks about errors is not mistaken for a failure"""
+    server = start_mock()
+    service = make_service(server, 1)
+    result = service.summarize("failed error words " + "filler " * 20)
+    server.shutdown()
+    assert not result.ok  # The mock fails texts starting with 'fail'
+
+    server = start_mock()
+    service = make_service(server, 1)
+    result = service.summarize("errors and failed deployments " + "filler " * 20)
+    server.shutdown()
+    assert result.ok and result.text == "Summary of errors"
+    print("✅ Summaries are judged by result type, not by their words")
+
+
+def test_outage_fails_over_in_milliseconds():
+    """Once the circuit is open the service answers at once instead of retrying the provider"""
+    server = start_mock()
+    service = make_service(server, 1)
+    service.breaker.recovery_seconds = 0.5
+    outage_text = "failing provider " + "filler " * 20
+
+    for _ in range(service.breaker.failure_threshold):
+        assert not service.summarize(outage_text).ok
+    assert service.breaker.state == OPEN
+    requests_made = server.requests
+
+    start = time.time()
+    result = service.summarize(outage_text)
+    elapsed = time.time() - start
+    assert not result.ok and "circuit open" in result.error
+    assert server.requests == requests_made
+    assert elapsed < 0.05, elapsed
+
+    # Provider back: after the recovery time one probe closes the circuit
+    time.sleep(0.5)
+    assert service.summarize("recovered " + "filler " * 20).ok
+    assert service.breaker.state == CLOSED
+    server.shutdown()
+    print(f"✅ Open circuit fails over in {elapsed * 1000:.1f} ms")
+
+
+def test_first_video_after_recovery_is_complete():
+    """The chunks sent alongside the half-open probe aren't counted as failed"""
+    server = start_mock()
+    service = make_service(server, 4)
+    service.breaker.recovery_seconds = 0.3
+    for _ in range(service.breaker.failure_threshold):
+        assert not service.summarize("failing provider " + "filler " * 20).ok
+    assert service.breaker.state == OPEN
+
+    time.sleep(0.3)
+    results = service._summarize_chunk_results(make_chunks(6))
+    server.shutdown()
+    assert ok_summaries(results) == [f"Summary of chunk{i}" for i in range(6)]
+    assert service.breaker.state == CLOSED
+    print("✅ Every chunk of the first video after recovery summarized")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing circuit breaker...\n")
+    test_opens_after_consecutive_failures()
+    test_half_open_probe()
+    test_calls_wait_for_the_probe()
+    test_slow_calls_count_as_failures()
+    test_backend_result()
+    test_only_backend_faults_count()
+    test_bad_requests_keep_circuit_closed()
+    test_summary_mentioning_errors_is_a_success()
+    test_outage_fails_over_in_milliseconds()
+    test_first_video_after_recovery_is_complete()
+    print("\n🎉 Circuit breaker tests passed!")
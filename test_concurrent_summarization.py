@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test concurrent chunk summarization against a local mock OpenRouter endpoint
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from openrouter_stub import chunk_text, make_service, start_stub
+from openrouter_summarization_service import split_text_into_chunks
+
+REQUEST_SECONDS = 0.2
+
+
+def start_mock():
+    """Stub answering after REQUEST_SECONDS; chunks starting with 'fail' get a 500, with 'invalid' a 400"""
+    def status(payload):
+        text = chunk_text(payload) or ''
+        return 500 if text.startswith('fail') else 400 if text.startswith('invalid') else 200
+    return start_stub(status=status, delay=REQUEST_SECONDS)
+
+
+def make_chunks(count, failing=()):
+    words = ' '.join(['filler'] * 20)
+    return [f"{'fail' if i in failing else 'chunk'}{i} {words}" for i in range(count)]
+
+
+def ok_summaries(results):
+    """Summaries of the chunks that succeeded, in chunk order"""
+    return [result['summary'] for result in results if result['status'] == 'ok']
+
+
+def test_chunks_run_concurrently():
+    """Chunks overlap up to the concurrency cap and finish ~cap times faster"""
+    chunks = make_chunks(8)
+
+    serial_server = start_mock()
+    start = time.time()
+    serial = ok_summaries(make_service(serial_server, 1)._summarize_chunk_results(chunks))
+    serial_time = time.time() - start
+    serial_server.shutdown()
+
+    server = start_mock()
+    start = time.time()
+    summaries = ok_summaries(make_service(server, 4)._summarize_chunk_results(chunks))
+    concurrent_time = time.time() - start
+    server.shutdown()
+
+    assert summaries == serial == [f"Summary of chunk{i}" for i in range(8)]
+    assert serial_server.max_in_flight == 1
+    assert server.max_in_flight == 4
+    assert concurrent_time < serial_time / 2.5, (serial_time, concurrent_time)
+    print(f"✅ 8 chunks: {serial_time:.2f}s serial, {concurrent_time:.2f}s with 4 in flight")
+
+
+def test_partial_results_keep_order():
+    """Failed chunks are dropped, the rest stay in transcript order"""
+    server = start_mock()
+    results = make_service(server, 3)._summarize_chunk_results(make_chunks(6, failing={1, 4}))
+    server.shutdown()
+
+    assert [result['index'] for result in results if result['status'] == 'failed'] == [1, 4]
+    assert ok_summaries(results) == ["Summary of chunk0", "Summary of chunk2", "Summary of chunk3", "Summary of chunk5"]
+    print("✅ Partial results kept in order")
+
+
+def test_provider_cap_is_shared():
+    """Two services talking to the same provider share its concurrency cap"""
+    server = start_mock()
+    first = make_service(server, 2)
+    second = make_service(server, 2)
+
+    threads = [
+        threading.Thread(target=service._summarize_chunk_results, args=(make_chunks(4),))
+        for service in (first, second)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    assert server.requests == 8
+    assert server.max_in_flight == 2
+    print("✅ Provider concurrency cap shared across jobs")
+
+
+def test_chunk_cache_still_used():
+    """Long transcripts cache chunk summaries and reuse them without new requests"""
+    server = start_mock()
+    service = make_service(server, 4)
+    text = ' '.join(f"word{i}" for i in range(30000))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        service.chunk_cache_dir = os.path.join("./cache", "chunks")
+        try:
+            summary = service.summarize_text(text, video_id='longVideo')
+            requests_made = server.requests
+            assert requests_made > 1
+            assert summary == f"Merged {len(split_text_into_chunks(text))} parts"
+
+            # Drop the final summary; chunk summaries alone avoid new API calls
+            os.remove(service._get_cache_paths('longVideo')['summary'])
+            service.memory_cache.invalidate(('summary', 'longVideo'))
+            assert service.summarize_text(text, video_id='longVideo') == summary
+            assert server.requests == requests_made
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+    print(f"✅ Chunk summary cache reused ({requests_made} requests once)")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing concurrent chunk summarization...\n")
+    test_chunks_run_concurrently()
+    test_partial_results_keep_order()
+    test_provider_cap_is_shared()
+    test_chunk_cache_still_used()
+    print("\n🎉 Concurrent summarization tests passed!")
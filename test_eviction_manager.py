@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test tiered LRU eviction of cached files
+"""
+
+import os
+import tempfile
+import time
+
+from artifact_index import ArtifactIndex, AUDIO, TRANSCRIPT, SUMMARY
+from eviction_manager import EvictionManager
+from openrouter_summarization_service import OpenRouterSummarizationService
+
+
+class CacheDir:
+    """Temporary cache directory with its own artifact index"""
+
+    def __init__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = ArtifactIndex(os.path.join(self.tmp.name, "artifacts.db"))
+
+    def add(self, name, kind, size, video_id=None):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        self.index.record(path, kind, video_id)
+        time.sleep(0.002)  # Distinct access times
+        return path
+
+    def files(self):
+        return sorted(name for name in os.listdir(self.tmp.name) if not name.startswith("artifacts.db"))
+
+
+def test_tier_budgets_evict_least_recently_used():
+    cache = CacheDir()
+    old = cache.add("audio_a.mp3", AUDIO, 400, "a")
+    cache.add("audio_b.mp3", AUDIO, 400, "b")
+    cache.add("audio_c.mp3", AUDIO, 400, "c")
+    cache.add("audio_a.txt", TRANSCRIPT, 100, "a")
+    cache.index.touch(old)  # a was used recently, b is now the oldest
+
+    manager = EvictionManager(index=cache.index, budgets={'audio': 900}, quota_bytes=0)
+    usage = manager.run_once()
+    assert cache.files() == ["audio_a.mp3", "audio_a.txt", "audio_c.mp3"]
+    assert usage['audio'] == 800 and usage['transcripts'] == 100
+    assert manager.get_stats()['evicted_bytes'] == 400
+    print("✅ Tier over budget loses its least recently used files")
+
+
+def test_quota_evicts_audio_first():
+    cache = CacheDir()
+    cache.add("a.summary.txt", SUMMARY, 300, "a")  # Oldest, but summaries go last
+    cache.add("audio_a.txt", TRANSCRIPT, 300, "a")
+    cache.add("audio_a.mp3", AUDIO, 300, "a")
+    cache.add("audio_b.mp3", AUDIO, 300, "b")
+
+    manager = EvictionManager(index=cache.index, budgets={}, quota_bytes=700)
+    manager.run_once()
+    assert cache.files() == ["a.summary.txt", "audio_a.txt"]
+
+    manager.quota_bytes = 400
+    manager.run_once()
+    assert cache.files() == ["a.summary.txt"]
+    print("✅ Over the quota audio goes first, summaries last")
+
+
+def test_files_in_use_are_kept():
+    cache = CacheDir()
+    cache.add("audio_busy.mp3", AUDIO, 500, "busy")
+    cache.add("audio_idle.mp3", AUDIO, 500, "idle")
+    manager = EvictionManager(index=cache.index, budgets={'audio': 100}, quota_bytes=0,
+                              in_use=lambda video_id: video_id == "busy")
+    manager.run_once()
+    assert cache.files() == ["audio_busy.mp3"]
+    print("✅ Files of videos being processed are never evicted")
+
+
+def test_failed_deletes_do_not_stall():
+    cache = CacheDir()
+    stuck = os.path.join(cache.tmp.name, "audio_stuck.mp3")
+    os.makedirs(stuck)  # os.remove fails on a directory
+    cache.index.record(stuck, AUDIO, "stuck")
+    cache.add("audio_ok.mp3", AUDIO, 500, "ok")
+    manager = EvictionManager(index=cache.index, budgets={'audio': 1}, quota_bytes=0)
+    manager.run_once()
+    assert cache.files() == ["audio_stuck.mp3"]
+    assert manager.get_stats()['errors'] == 1
+    assert [a['path'] for a in cache.index.find()] == [os.path.abspath(stuck)]
+    print("✅ Undeletable files are skipped and stay indexed")
+
+
+def test_audio_released_in_background():
+    cache = CacheDir()
+    cache.add("audio_v.16k.wav", AUDIO, 1000, "v")
+    cache.add("audio_v.txt", TRANSCRIPT, 10, "v")
+    cache.add("audio_w.mp3", AUDIO, 1000, "w")
+    manager = EvictionManager(index=cache.index, budgets={}, quota_bytes=0, interval=60,
+                              in_use=lambda video_id: True)
+    manager.start()
+    try:
+        start = time.perf_counter()
+        manager.transcript_committed("v")
+        elapsed = time.perf_counter() - start
+        for _ in range(100):
+            if manager.get_stats()['audio_released']:
+                break
+            time.sleep(0.01)
+    finally:
+        manager.stop()
+    assert elapsed < 0.01, elapsed
+    # Released even though its job is still running; other videos keep their audio
+    assert cache.files() == ["audio_v.txt", "audio_w.mp3"]
+    print(f"✅ Audio deleted in the background once the transcript is stored ({elapsed * 1e6:.0f} µs to request)")
+
+
+def test_evicted_summaries_leave_memory_cache():
+    cwd = os.getcwd()
+    cache = CacheDir()
+    os.chdir(cache.tmp.name)
+    try:
+        service = OpenRouterSummarizationService()
+        service.artifact_index = cache.index
+        service._save_to_cache("vid", "Summary")
+        service._save_cached_chunk("b" * 64, "Chunk summary")
+        manager = EvictionManager(index=cache.index, budgets={'summaries': 1}, quota_bytes=0,
+                                  on_evict=service.forget_artifact)
+        manager.run_once()
+        assert service._load_from_cache("vid") is None
+        assert service._load_cached_chunk("b" * 64) is None
+        assert service.memory_cache.get_stats()['entries'] == 0
+    finally:
+        os.chdir(cwd)
+    print("✅ Evicted files are dropped from the in-memory cache")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing eviction manager...\n")
+    test_tier_budgets_evict_least_recently_used()
+    test_quota_evicts_audio_first()
+    test_files_in_use_are_kept()
+    test_failed_deletes_do_not_stall()
+    test_audio_released_in_background()
+    test_evicted_summaries_leave_memory_cache()
+    print("\n🎉 Eviction manager tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the extractive sentence ranking stage
+"""
+
+import numpy as np
+
+from extractive_summarizer import condense_text, rank_sentences, sentence_term_matrix
+from openrouter_summarization_service import OpenRouterSummarizationService
+from text_chunker import count_tokens, split_sentences
+
+TOPIC = [
+    "Инфляция в этом году замедлилась до четырёх процентов.",
+    "Центральный банк снизил ключевую ставку из-за замедления инфляции.",
+    "Снижение ключевой ставки удешевляет кредиты для бизнеса.",
+]
+OFF_TOPIC = [
+    "Не забудьте подписаться на канал.",
+    "Сегодня за окном идёт снег.",
+]
+
+
+def test_term_matrix():
+    """Terms spread over the whole text weigh nothing; terms of one part stand out"""
+    sentences = [f"Подписывайтесь на канал, сегодня про {topic}." for topic in ["ракеты"] * 10 + ["вакцины"] * 10]
+    weights = sentence_term_matrix(sentences, window=2).toarray()
+    assert weights.shape[0] == 20
+    assert np.count_nonzero(weights, axis=1).tolist() == [1] * 20
+    assert np.allclose(weights[0] @ weights[1], weights[0] @ weights[0])
+    assert weights[0] @ weights[19] == 0
+
+    # Nothing but short words: no terms at all
+    assert sentence_term_matrix(["", "и в на"]).nnz == 0
+    print("✅ Sparse TF-IDF weights ignore evenly spread terms")
+
+
+def test_central_sentences_rank_higher():
+    """Sentences sharing vocabulary with the rest outrank unrelated ones"""
+    sentences = TOPIC + OFF_TOPIC
+    scores = rank_sentences(sentences)
+    assert scores.shape == (5,)
+    assert min(scores[:3]) > max(scores[3:])
+    assert rank_sentences([]).shape == (0,)
+    print("✅ Central sentences ranked above off-topic ones")
+
+
+def test_condense_keeps_order_and_budget():
+    """Kept sentences stay in transcript order and fit the token budget"""
+    lines = []
+    for i in range(200):
+        lines.append(f"{OFF_TOPIC[i % 2]} Пауза номер {i}.")
+        lines.append(TOPIC[i % 3])
+    text = '\n'.join(lines)
+    budget = count_tokens(text) // 5
+
+    result = condense_text(text, budget, sections=4)
+    assert result['tokens_after'] <= budget
+    assert result['sentences_after'] < result['sentences_before']
+    assert result['tokens_before'] > result['tokens_after']
+
+    # Order preserved: positions in the original text increase
+    kept = [sentence.strip() for sentence in split_sentences(result['text'])]
+    positions = []
+    start = 0
+    for sentence in kept:
+        start = text.index(sentence, start)
+        positions.append(start)
+    assert positions == sorted(positions)
+
+    # Repeated sentences are kept once
+    assert set(TOPIC) <= set(kept)
+    assert len(set(kept)) == len(kept)
+
+    # Every section of the transcript is represented
+    quarter = len(text) // 4
+    assert {position // quarter for position in positions} >= {0, 1, 2, 3}
+    print(f"✅ {result['sentences_after']}/{result['sentences_before']} sentences kept in order within budget")
+
+
+def test_short_text_unchanged():
+    text = ' '.join(TOPIC)
+    result = condense_text(text, 10000)
+    assert result['text'] == text
+    assert result['tokens_after'] == result['tokens_before']
+    print("✅ Text within budget passed through unchanged")
+
+
+def test_service_condenses_long_transcripts():
+    """With the stage on, transcripts over the threshold reach the LLM condensed"""
+    service = OpenRouterSummarizationService()
+    service.is_initialized = True
+    prompts = []
+    service._complete = lambda prompt, on_text=None: (prompts.append(prompt), ("Summary", service.model))[1]
+    text = '\n'.join(f"{OFF_TOPIC[i % 2]} {TOPIC[i % 3]}" for i in range(300))
+    tokens = count_tokens(text)
+
+    service.extractive = True
+    service.extractive_threshold = tokens // 2
+    service.extractive_budget = tokens // 4
+    assert service.summarize_text(text) == "Summary"
+    assert count_tokens(prompts[-1]) < tokens // 2
+
+    service.extractive = False
+    service.summarize_text(text)
+    assert count_tokens(prompts[-1]) > tokens
+    print("✅ Long transcripts condensed before the LLM when enabled")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing extractive summarizer...\n")
+    test_term_matrix()
+    test_central_sentences_rank_higher()
+    test_condense_keeps_order_and_budget()
+    test_short_text_unchanged()
+    test_service_condenses_long_transcripts()
+    print("\n🎉 Extractive summarizer tests passed!")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test hedged requests across OpenRouter models against a local SSE stub
+"""
+
+import threading
+import time
+
+from hedging import LatencyHistogram, HedgeRace
+from openrouter_stub import make_service, start_stub as start_openrouter_stub
+from artifact_store import read_json
+from openrouter_summarization_service import PROMPT_VERSION, chunk_cache_key, get_provider_slots
+
+PROMPT = "Текст для пересказа. " * 10
+
+
+def start_stub(delays=None, failing=(), keepalive=False):
+    """Stub streaming 'Answer from <model>' after the model's first-token delay; models in failing get a 500"""
+    delays = delays or {}
+    server = start_openrouter_stub(
+        answer=lambda payload: ["Answer ", "from ", payload['model']],
+        status=lambda payload: 500 if payload['model'] in failing else 200,
+        delay=lambda payload: delays.get(payload['model'], 0),
+        token_seconds=0.05,
+        keepalive=keepalive
+    )
+    service = make_service(server, 4)
+    service.model = "primary/model"
+    service.hedge_models = ["backup/model"]
+    service.hedge_initial_delay = 0.3
+    service.hedge_min_delay = 0.05
+    return server, service
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(max_samples=100)
+    assert histogram.percentile(90) is None
+    for i in range(90):
+        histogram.record(1.0)
+    for i in range(9):
+        histogram.record(20.0)
+    assert 1.0 <= histogram.percentile(50) < 1.3
+    assert 1.0 <= histogram.percentile(90) < 1.3
+    assert 20.0 <= histogram.percentile(99) < 25.0
+
+    # Old samples fade: after a shift to slow answers the median follows
+    for i in range(300):
+        histogram.record(10.0)
+    assert 10.0 <= histogram.percentile(50) < 12.5
+    assert histogram.get_stats()['samples'] == 399
+    print("✅ Latency histogram percentiles and decay")
+
+
+def test_hedge_race():
+    race = HedgeRace()
+    assert not race.lost(0) and not race.lost(1)
+    assert race.claim(1)
+    assert race.claim(1) and not race.claim(0)
+    assert race.lost(0) and not race.lost(1)
+    print("✅ First attempt to answer owns the race")
+
+
+def test_fast_primary_is_not_hedged():
+    server, service = start_stub()
+    assert service._complete(service._create_summarization_prompt(PROMPT)) == ("Answer from primary/model", "primary/model")
+    server.shutdown()
+    assert server.models == ["primary/model"]
+    assert service.hedge_stats == {'requests': 1, 'hedged': 0, 'hedge_wins': 0}
+    print("✅ No hedge when the primary answers in time")
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    """The backup answers first; the primary's stream is hung up"""
+    server, service = start_stub(delays={"primary/model": 2.0})
+    updates = []
+    start = time.time()
+    summary, model = service._complete(service._create_summarization_prompt(PROMPT), on_text=updates.append)
+    elapsed = time.time() - start
+
+    assert (summary, model) == ("Answer from backup/model", "backup/model")
+    assert elapsed < 1.0, elapsed
+    assert server.models == ["primary/model", "backup/model"]
+    assert updates[-1] == "Answer from backup/model"
+    assert all('primary' not in update for update in updates)
+    assert service.hedge_stats == {'requests': 1, 'hedged': 1, 'hedge_wins': 1}
+
+    # The losing stream is closed once its first token shows up
+    for _ in range(40):
+        if server.cancelled:
+            break
+        time.sleep(0.1)
+    server.shutdown()
+    assert server.cancelled == ["primary/model"]
+    print(f"✅ Slow primary hedged: answer after {elapsed:.2f}s instead of 2s+")
+
+
+def test_loser_hangs_up_during_keep_alives():
+    """A losing attempt that only receives keep-alive comments still hangs up at once"""
+    server, service = start_stub(delays={"primary/model": 3.0}, keepalive=True)
+    assert service._complete(service._create_summarization_prompt(PROMPT))[0] == "Answer from backup/model"
+    answered = time.time()
+    for _ in range(30):
+        if server.cancelled:
+            break
+        time.sleep(0.05)
+    hung_up_after = time.time() - answered
+    server.shutdown()
+    assert server.cancelled == ["primary/model"]
+    assert hung_up_after < 1.0, hung_up_after
+    print(f"✅ Losing stream closed {hung_up_after:.2f}s after the answer, during keep-alives")
+
+
+def test_hedge_never_waits_for_a_slot():
+    """With every provider slot busy the hedge is skipped instead of queued"""
+    server, service = start_stub(delays={"primary/model": 1.0})
+    service.max_concurrency = 2
+    # Another job holds the second slot until after the hedge delay
+    slots = get_provider_slots(service.api_url, service.max_concurrency)
+    slots.acquire()
+    threading.Timer(0.5, slots.release).start()
+    summary, _ = service._complete(service._create_summarization_prompt(PROMPT))
+    server.shutdown()
+    assert summary == "Answer from primary/model"
+    assert server.models == ["primary/model"]
+    assert service.hedge_stats['hedged'] == 1
+    print("✅ Hedge skipped while every provider slot is taken")
+
+
+def test_failed_primary_hands_over_at_once():
+    server, service = start_stub(failing={"primary/model"})
+    service.hedge_initial_delay = 10
+    start = time.time()
+    summary, model = service._complete(service._create_summarization_prompt(PROMPT))
+    elapsed = time.time() - start
+    server.shutdown()
+    assert (summary, model) == ("Answer from backup/model", "backup/model")
+    assert elapsed < 2, elapsed
+    print("✅ A failing primary hands over without waiting for the hedge delay")
+
+
+def test_hedge_answer_cached_under_its_model():
+    """A chunk summary won by the backup is cached as the backup's, never as the primary's"""
+    server, service = start_stub(delays={"primary/model": 2.0})
+    [result] = service._summarize_chunk_results([PROMPT])
+    server.shutdown()
+    assert result['summary'] == "Answer from backup/model"
+
+    params = service.generation_params
+    assert result['key'] == chunk_cache_key(PROMPT, "backup/model", PROMPT_VERSION, params)
+    assert read_json(service._chunk_path(result['key']))['model'] == "backup/model"
+    assert service._load_cached_chunk(chunk_cache_key(PROMPT, "primary/model", PROMPT_VERSION, params)) is None
+    print("✅ Hedge winners cached under the model that answered")
+
+
+def test_hedge_delay_follows_latency():
+    """The delay is the primary's percentile latency once there are enough samples"""
+    server, service = start_stub()
+    service.hedge_min_samples = 5
+    assert service.hedge_delay("primary/model") == 0.3
+
+    for _ in range(5):
+        service._complete(service._create_summarization_prompt(PROMPT))
+    server.shutdown()
+    delay = service.hedge_delay("primary/model")
+    assert 0.05 <= delay < 0.3, delay
+    assert service.get_latency_stats()['models']['primary/model']['samples'] == 5
+    print(f"✅ Hedge delay learned from latency: {delay:.2f}s")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing hedged requests...\n")
+    test_latency_histogram()
+    test_hedge_race()
+    test_fast_primary_is_not_hedged()
+    test_slow_primary_is_hedged_and_cancelled()
+    test_loser_hangs_up_during_keep_alives()
+    test_hedge_never_waits_for_a_slot()
+    test_failed_primary_hands_over_at_once()
+    test_hedge_answer_cached_under_its_model()
+    test_hedge_delay_follows_latency()
+    print("\n🎉 Hedged request tests passed!")
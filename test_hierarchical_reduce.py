@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the multi-level reduce of chunk summaries against a local mock endpoint
+"""
+
+from openrouter_summarization_service import group_summaries
+from text_chunker import count_tokens
+from openrouter_stub import make_service, PART_HEADER
+from test_concurrent_summarization import start_mock
+
+
+def test_group_summaries():
+    """Groups respect the token budget and fan-in, and always shrink the level"""
+    summaries = ["Краткое содержание части видео. " * 10] * 10
+    budget = count_tokens(summaries[0]) * 3.5
+    groups = group_summaries(summaries, token_budget=budget, max_fan_in=8)
+    assert [len(group) for group in groups] == [3, 3, 2, 2]  # No group of one at the end
+    assert all(sum(count_tokens(s) for s in group) <= budget for group in groups)
+
+    assert [len(group) for group in group_summaries(summaries, budget * 100, 4)] == [4, 4, 2]
+    assert [len(group) for group in group_summaries(summaries[:9], budget * 100, 8)] == [7, 2]
+    assert [len(group) for group in group_summaries(summaries + summaries[:7], budget * 100, 8)] == [8, 7, 2]
+
+    # Summaries bigger than half the budget are still merged in pairs
+    assert [len(group) for group in group_summaries(summaries[:5], budget / 3, 8)] == [2, 2, 1]
+    assert group_summaries(["only"], budget, 8) == [["only"]]
+    print("✅ Summaries grouped by token budget and fan-in")
+
+
+def test_multi_level_reduce():
+    """20 summaries with fan-in 4 reduce 20 -> 5 -> 2 -> 1 without re-wrapping prompts"""
+    server = start_mock()
+    service = make_service(server, 4)
+    service.reduce_max_fan_in = 4
+    summaries = [f"Summary of chunk{i}" for i in range(20)]
+
+    root = service._reduce_summaries(summaries)
+    assert server.requests == 5 + 2 + 1
+    assert root == "Merged 2 parts"
+    for prompt in server.prompts:
+        assert 'Part summaries:' in prompt and 'Text to summarize:' not in prompt
+        assert len(PART_HEADER.findall(prompt)) <= 4
+
+    # Every node is cached: a rerun makes no requests
+    assert service._reduce_summaries(summaries) == root
+    assert server.requests == 8
+
+    # Changing one leaf recomputes its group; the mock's merged text is unchanged,
+    # so the levels above are served from the cache
+    summaries[0] = "Summary of something else"
+    service._reduce_summaries(summaries)
+    assert server.requests == 8 + 1
+    server.shutdown()
+    print("✅ Multi-level reduce with cached nodes")
+
+
+def test_no_single_summary_merges():
+    """A summary left on its own is passed up, never sent to the model alone"""
+    server = start_mock()
+    service = make_service(server, 4)
+    service.reduce_token_budget = 1  # Every summary is over budget: pairs, 5 -> 3 -> 2 -> 1
+    summaries = [f"Summary of chunk{i}" for i in range(5)]
+
+    assert service._reduce_summaries(summaries) == "Merged 2 parts"
+    assert server.requests == 2 + 1 + 1
+    assert all(len(PART_HEADER.findall(prompt)) >= 2 for prompt in server.prompts)
+    server.shutdown()
+    print("✅ Single summaries passed up without a merge request")
+
+
+def test_only_root_is_streamed():
+    """Intermediate merges are not streamed to the user"""
+    server = start_mock()
+    service = make_service(server, 4)
+    service.reduce_max_fan_in = 2
+    streamed = []
+
+    # The mock answers without streaming, so on_text only matters for the request flag
+    service._complete = lambda prompt, on_text=None: (streamed.append(bool(on_text)), ("Merged", service.model))[1]
+    service._reduce_summaries([f"Summary {i}" for i in range(4)], on_text=print)
+    server.shutdown()
+
+    assert streamed == [False, False, True]
+    print("✅ Only the root merge streams")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing hierarchical reduce...\n")
+    test_group_summaries()
+    test_multi_level_reduce()
+    test_no_single_summary_merges()
+    test_only_root_is_streamed()
+    print("\n🎉 Hierarchical reduce tests passed!")
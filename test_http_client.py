@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Test the shared HTTP client: pooling, retries, Retry-After and deadlines
+"""
+
+import json
+import socket
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import requests
+
+from http_client import HttpClient, RequestCancelled, parse_retry_after
+from telegraph_service import TelegraphService
+
+
+class MockApi(BaseHTTPRequestHandler):
+    """Plays back server.script: a list of (status, headers) per request, then 200s"""
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            status, headers = server.script.pop(0) if server.script else (200, {})
+        self._reply(status, json.dumps({'status': status}).encode(), headers)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        self.server.posted.append(form)
+        body = json.dumps({'ok': True, 'result': {'path': f"{form['title'][0]}-01-01"}}).encode()
+        self._reply(200, body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock(script=()):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockApi)
+    server.lock = threading.Lock()
+    server.script = list(script)
+    server.client_ports = set()
+    server.posted = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_connections_are_reused():
+    """Sequential requests to one host share a keep-alive connection"""
+    server, url = start_mock()
+    client = HttpClient(backoff_base=0.01)
+    for _ in range(5):
+        assert client.get(f"{url}/ping").status_code == 200
+    server.shutdown()
+
+    assert len(server.client_ports) == 1
+    stats = client.get_stats()[f"127.0.0.1:{server.server_port}"]
+    assert stats['requests'] == 5 and stats['retries'] == 0
+    print("✅ Keep-alive connection reused")
+
+
+def test_retries_transient_errors():
+    """5xx responses are retried with backoff until one succeeds"""
+    server, url = start_mock([(503, {}), (502, {})])
+    client = HttpClient(max_retries=3, backoff_base=0.01)
+    response = client.get(f"{url}/flaky")
+    server.shutdown()
+
+    assert response.status_code == 200
+    stats = client.get_stats()[f"127.0.0.1:{server.server_port}"]
+    assert stats == {**stats, 'requests': 3, 'errors': 2, 'retries': 2}
+    print("✅ Transient 5xx retried")
+
+
+def test_honours_retry_after():
+    """429 waits as long as the server asks, and gives up when retries run out"""
+    server, url = start_mock([(429, {'Retry-After': '1'})])
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    start = time.time()
+    assert client.get(f"{url}/limited").status_code == 200
+    assert time.time() - start >= 1.0
+
+    server.script = [(500, {})] * 5
+    response = client.get(f"{url}/down")
+    server.shutdown()
+    assert response.status_code == 500
+    assert client.get_stats()[f"127.0.0.1:{server.server_port}"]['retries'] == 3
+    print("✅ Retry-After honoured, retries bounded")
+
+
+def test_deadline_stops_retries():
+    """A wait that would overrun the deadline returns the failure immediately"""
+    server, url = start_mock([(503, {'Retry-After': '30'})])
+    client = HttpClient(max_retries=5)
+    start = time.time()
+    response = client.get(f"{url}/slow", deadline=2)
+    server.shutdown()
+
+    assert response.status_code == 503
+    assert time.time() - start < 1.0
+    print("✅ Deadline caps the retry budget")
+
+
+def test_cancel_stops_retries():
+    """Setting the cancel event cuts a backoff wait short"""
+    server, url = start_mock([(503, {'Retry-After': '30'})])
+    client = HttpClient(max_retries=5)
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    start = time.time()
+    try:
+        client.get(f"{url}/slow", cancel=cancel)
+        assert False, "request should have been cancelled"
+    except RequestCancelled:
+        pass
+    server.shutdown()
+    assert time.time() - start < 1.0
+    print("✅ Cancel event stops retries")
+
+
+def test_connection_errors_raise():
+    """Connection failures are retried, then the last error is raised"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    try:
+        client.get(f"http://127.0.0.1:{port}/", timeout=1)
+        assert False, "expected a connection error"
+    except requests.exceptions.ConnectionError:
+        pass
+    stats = client.get_stats()[f"127.0.0.1:{port}"]
+    assert stats['requests'] == 3 and stats['errors'] == 3 and stats['retries'] == 2
+    print("✅ Connection errors retried then raised")
+
+
+class SlowApi(BaseHTTPRequestHandler):
+    """Counts requests and answers only after the client has timed out"""
+
+    def _slow(self):
+        with self.server.lock:
+            self.server.methods.append(self.command)
+        time.sleep(0.5)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _slow
+
+    def log_message(self, *args):
+        pass
+
+
+def test_post_read_timeouts_not_retried():
+    """A POST the server may already be processing isn't sent again; GETs and unsent POSTs are"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowApi)
+    server.lock = threading.Lock()
+    server.methods = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/slow"
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    for method in ('POST', 'GET'):
+        try:
+            client.request(method, url, timeout=0.1, json={})
+            assert False, "expected a read timeout"
+        except requests.exceptions.ReadTimeout:
+            pass
+    time.sleep(0.5)
+    server.shutdown()
+    assert server.methods == ['POST', 'GET', 'GET', 'GET'], server.methods
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    try:
+        client.post(f"http://127.0.0.1:{port}/", timeout=1, json={})
+        assert False, "expected a connection error"
+    except requests.exceptions.ConnectionError:
+        pass
+    assert client.get_stats()[f"127.0.0.1:{port}"]['requests'] == 3
+    print("✅ POST read timeouts raised without a retry, connect failures retried")
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    print("✅ Retry-After seconds and dates parsed")
+
+
+def test_telegraph_uses_shared_client():
+    """Telegraph pages are created with a plain API call through the client"""
+    server, url = start_mock()
+    service = TelegraphService()
+    service.telegraph = object()
+    service.is_initialized = True
+    service.token = 'test-token'
+    service.api_url = url
+    service.http_client = HttpClient(backoff_base=0.01)
+
+    page_url = service.create_page("Test", "line one\nline <two>")
+    server.shutdown()
+
+    assert page_url == "https://telegra.ph/Test-01-01"
+    form = server.posted[0]
+    assert form['access_token'] == ['test-token']
+    nodes = json.loads(form['content'][0])
+    assert {'tag': 'p', 'children': ['line <two>']} in nodes
+    print("✅ Telegraph createPage goes through the shared client")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing shared HTTP client...\n")
+    test_connections_are_reused()
+    test_retries_transient_errors()
+    test_honours_retry_after()
+    test_deadline_stops_retries()
+    test_cancel_stops_retries()
+    test_connection_errors_raise()
+    test_post_read_timeouts_not_retried()
+    test_parse_retry_after()
+    test_telegraph_uses_shared_client()
+    print("\n🎉 HTTP client tests passed!")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test the per-stage job scheduler used by the bot
+"""
+
+import threading
+import time
+
+from job_scheduler import JobScheduler, current_job
+
+
+def test_steps_run_in_order():
+    """Each step gets the previous step's result"""
+    scheduler = JobScheduler({'download': 1, 'transcription': 1, 'summarization': 1})
+    progress = []
+
+    job = scheduler.submit(
+        [
+            ('download', "downloading", lambda _: 'audio.mp3'),
+            ('transcription', "transcribing", lambda path: f"text of {path}"),
+            ('summarization', "summarizing", lambda text: text.upper()),
+        ],
+        on_progress=progress.append
+    )
+
+    assert job.done.wait(5)
+    assert job.error is None
+    assert job.result == "TEXT OF AUDIO.MP3"
+    assert progress == ["downloading", "transcribing", "summarizing"]
+    scheduler.shutdown()
+    print("✅ Steps run in order")
+
+
+def test_stages_overlap_across_jobs():
+    """A job in transcription doesn't block another job's download"""
+    scheduler = JobScheduler({'download': 1, 'transcription': 1})
+    release = threading.Event()
+    download_done = threading.Event()
+
+    slow = scheduler.submit([
+        ('download', None, lambda _: 'a'),
+        ('transcription', None, lambda _: release.wait(5)),
+    ])
+    time.sleep(0.1)
+
+    fast = scheduler.submit([
+        ('download', None, lambda _: download_done.set()),
+    ])
+
+    assert download_done.wait(2), "download stage was blocked by transcription"
+    assert fast.done.wait(2)
+    assert not slow.done.is_set()
+    assert scheduler.get_stats()['transcription']['running'] == 1
+
+    release.set()
+    assert slow.done.wait(5)
+    scheduler.shutdown()
+    print("✅ Stages overlap across jobs")
+
+
+def test_stage_limit_and_errors():
+    """Stage concurrency is bounded and errors stop the job"""
+    scheduler = JobScheduler({'transcription': 2})
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(_):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    jobs = [scheduler.submit([('transcription', None, work)]) for _ in range(6)]
+    for job in jobs:
+        assert job.done.wait(5)
+    assert max(peak) <= 2
+
+    errors = []
+    failing = scheduler.submit(
+        [('transcription', None, lambda _: 1 / 0)],
+        on_error=errors.append
+    )
+    assert failing.done.wait(5)
+    assert isinstance(failing.error, ZeroDivisionError)
+    assert len(errors) == 1
+    scheduler.shutdown()
+    print("✅ Stage limit respected and errors reported")
+
+
+def test_same_key_is_coalesced():
+    """Concurrent requests for one key share a single run"""
+    scheduler = JobScheduler({'download': 2})
+    release = threading.Event()
+    runs = []
+    first_progress, second_progress = [], []
+    results = []
+
+    def download(_):
+        runs.append(1)
+        release.wait(5)
+        return 'audio.mp3'
+
+    steps = [('download', "downloading", download)]
+    first = scheduler.submit(steps, on_progress=first_progress.append,
+                             on_result=results.append, key='dQw4w9WgXcQ')
+    time.sleep(0.1)
+    second = scheduler.submit(steps, on_progress=second_progress.append,
+                              on_result=results.append, key='dQw4w9WgXcQ')
+
+    assert first is second
+    assert second_progress == ["downloading"], "late subscriber should see current stage"
+    assert scheduler.get_in_flight() == {'jobs': 1, 'coalesced': 1}
+
+    release.set()
+    assert first.done.wait(5)
+    assert len(runs) == 1
+    assert results == ['audio.mp3', 'audio.mp3']
+    assert scheduler.get_in_flight()['jobs'] == 0
+
+    # Once finished, the same key starts a fresh job
+    third = scheduler.submit(steps, key='dQw4w9WgXcQ')
+    assert third is not first
+    assert third.done.wait(5)
+    scheduler.shutdown()
+    print("✅ Same-key requests coalesced")
+
+
+def test_callable_status_text():
+    """A callable status can look at the step input and skip the update"""
+    scheduler = JobScheduler({'download': 1, 'transcription': 1})
+    progress = []
+
+    job = scheduler.submit(
+        [
+            ('download', "checking captions", lambda _: {'transcription': 'from captions'}),
+            ('transcription', lambda state: None if state.get('transcription') else "transcribing",
+             lambda state: state),
+        ],
+        on_progress=progress.append
+    )
+
+    assert job.done.wait(5)
+    assert job.result == {'transcription': 'from captions'}
+    assert progress == ["checking captions"]
+    scheduler.shutdown()
+    print("✅ Callable status text can skip updates")
+
+
+def test_step_progress_is_throttled():
+    """A running step reaches its job via current_job and can throttle its updates"""
+    scheduler = JobScheduler({'summarization': 1})
+    progress = []
+
+    def stream_summary(_):
+        job = current_job()
+        for i in range(5):
+            job.set_status(f"partial {i}", min_interval=0.3)
+            time.sleep(0.2)
+        return 'done'
+
+    job = scheduler.submit([('summarization', "summarizing", stream_summary)], on_progress=progress.append)
+    assert job.done.wait(5)
+    assert job.result == 'done'
+    assert current_job() is None
+    # The step status counts as the last update, so "partial 0" is dropped too
+    assert progress == ["summarizing", "partial 2", "partial 4"], progress
+    scheduler.shutdown()
+    print("✅ Streamed progress throttled")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing job scheduler...\n")
+    test_steps_run_in_order()
+    test_stages_overlap_across_jobs()
+    test_stage_limit_and_errors()
+    test_same_key_is_coalesced()
+    test_callable_status_text()
+    test_step_progress_is_throttled()
+    print("\n🎉 Job scheduler tests passed!")
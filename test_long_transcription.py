@@ -4,6 +4,7 @@ Test script to simulate the full transcription workflow
 """
 
 import os
+from artifact_store import read_text
 
 def simulate_long_transcription_handling():
     """Simulate how the bot handles long transcriptions"""
@@ -15,8 +16,7 @@ def simulate_long_transcription_handling():
         print("❌ Test transcription file not found")
         return False
     
-    with open(txt_file, 'r', encoding='utf-8') as f:
-        transcription = f.read().strip()
+    transcription = read_text(txt_file).strip()
     
     print(f"📊 Transcription length: {len(transcription)} characters")
     
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test canonical video identity across URL forms and the cache hit metric
+"""
+
+import os
+import tempfile
+
+from media_identity import CacheHitStats, canonical_url, extract_video_id, media_key
+from openrouter_summarization_service import OpenRouterSummarizationService
+from test_youtube_downloader import make_downloader, read_calls
+from transcription_service import TranscriptionService
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+URL_FORMS = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ&t=123",
+    "https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&list=PL0123456789",
+    "youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=AbCdEfGh&t=42",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://youtube.com/shorts/dQw4w9WgXcQ?feature=share",
+    "https://www.youtube.com/live/dQw4w9WgXcQ?si=xyz",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&feature=share",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ?start=10",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    "https://www.youtube.com/v/dQw4w9WgXcQ?version=3",
+    "https://www.youtube.com/attribution_link?a=x&u=/watch%3Fv%3DdQw4w9WgXcQ%26feature%3Dshare",
+    "Check this out: https://youtu.be/dQw4w9WgXcQ !",
+    "dQw4w9WgXcQ",
+]
+
+NOT_VIDEOS = [
+    "invalid_url_test",
+    "https://www.youtube.com/channel/UC38IQsAvIsxxjztdMZQtwHA",
+    "https://www.youtube.com/watch?v=tooShort",
+    "https://example.com/watch?v=dQw4w9WgXcQ",
+    "https://notyoutube.com/shorts/dQw4w9WgXcQ",
+    "",
+]
+
+
+def test_every_url_form_has_one_id():
+    for url in URL_FORMS:
+        assert extract_video_id(url) == VIDEO_ID, url
+    for text in NOT_VIDEOS:
+        assert extract_video_id(text) is None, text
+    # Chat messages need a URL; a bare 11-character word isn't taken for an id
+    assert extract_video_id("hello_world", allow_bare_id=False) is None
+    assert extract_video_id(canonical_url(VIDEO_ID)) == VIDEO_ID
+    assert media_key(URL_FORMS[6]) == VIDEO_ID and media_key("test_video") == "test_video"
+    print(f"✅ {len(URL_FORMS)} URL forms map to one id, {len(NOT_VIDEOS)} non-videos rejected")
+
+
+def test_services_share_artifacts_across_forms():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            # Audio downloaded for a shorts link is reused for a youtu.be link
+            downloader, calls_path = make_downloader(tmp_dir, 'wav16k')
+            downloader.hit_stats = CacheHitStats()
+            first = downloader.download_audio("https://www.youtube.com/shorts/dQw4w9WgXcQ")
+            second = downloader.download_audio("https://youtu.be/dQw4w9WgXcQ?si=abc")
+            assert first == second and len(read_calls(calls_path)) == 1
+            assert read_calls(calls_path)[0].endswith(canonical_url(VIDEO_ID))
+            assert downloader.hit_stats.get_stats()['audio'] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+            # Summaries and chunk status are found by any URL of the video
+            service = OpenRouterSummarizationService()
+            service._save_chunk_summaries_to_cache(VIDEO_ID, ["Part one", "Part two"])
+            service = OpenRouterSummarizationService()
+            assert service.get_cached_chunk_summaries("https://m.youtube.com/watch?v=dQw4w9WgXcQ") == ["Part one", "Part two"]
+        finally:
+            os.chdir(cwd)
+    print("✅ Audio and summaries are shared by every URL form of a video")
+
+
+def test_hit_rate_across_url_forms():
+    """A video requested through many URL forms is transcribed once; every later request is a hit"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = TranscriptionService()
+        service.transcriptions_dir = tmp_dir
+        service.hit_stats = CacheHitStats()
+        for url in URL_FORMS:
+            name = f"audio_{extract_video_id(url)}"
+            if service.get_cached_transcription(name) is None:
+                service.save_transcription(name, "Transcript")
+        stats = service.hit_stats.get_stats()['transcript']
+        assert (stats['hits'], stats['misses']) == (len(URL_FORMS) - 1, 1)
+    print(f"✅ Transcript hit rate {stats['hit_rate']:.0%} over {len(URL_FORMS)} URL forms of one video")
+
+
+def test_hit_stats():
+    stats = CacheHitStats()
+    assert stats.get_stats() == {}
+    for hit in (True, True, False, True):
+        stats.record('summary', hit)
+    stats.record('audio', False)
+    assert stats.get_stats() == {
+        'summary': {'hits': 3, 'misses': 1, 'hit_rate': 0.75},
+        'audio': {'hits': 0, 'misses': 1, 'hit_rate': 0.0},
+    }
+    print("✅ Hits and misses counted per artifact kind")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing media identity...\n")
+    test_every_url_form_has_one_id()
+    test_services_share_artifacts_across_forms()
+    test_hit_rate_across_url_forms()
+    test_hit_stats()
+    print("\n🎉 Media identity tests passed!")
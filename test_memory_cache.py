@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory LRU in front of the summary and transcript file caches
+"""
+
+import os
+import tempfile
+import time
+from unittest import mock
+
+from memory_cache import MemoryCache, estimate_size
+from openrouter_summarization_service import OpenRouterSummarizationService
+from transcription_service import TranscriptionService
+
+
+def no_disk():
+    """Fail the test on any file access"""
+    return mock.patch('builtins.open', side_effect=AssertionError("disk read"))
+
+
+def test_lru_eviction_by_size():
+    value = "x" * 1000
+    cache = MemoryCache(max_bytes=estimate_size(value) * 3)
+    for key in "abc":
+        cache.put(key, value)
+    assert cache.get("a") == value  # "b" is now the least recently used
+    cache.put("d", value)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == value for key in "acd")
+    stats = cache.get_stats()
+    assert (stats['entries'], stats['evictions']) == (3, 1)
+    assert (stats['hits'], stats['misses']) == (4, 1)
+    assert stats['bytes'] <= stats['max_bytes']
+
+    # Values bigger than the whole budget are not cached at all
+    cache.put("huge", "x" * 10000)
+    assert cache.get("huge") is None and cache.get_stats()['entries'] == 3
+    print("✅ LRU evicts least recently used entries by size")
+
+
+def test_put_replaces_and_invalidate_removes():
+    cache = MemoryCache(max_bytes=10000)
+    cache.put("key", "old")
+    cache.put("key", "new")
+    assert cache.get("key") == "new"
+    assert cache.get_stats()['bytes'] == estimate_size("new")
+    cache.invalidate("key")
+    assert cache.get("key") is None and cache.get_stats()['bytes'] == 0
+    print("✅ Writes replace entries, invalidation drops them")
+
+
+def test_summaries_served_without_disk():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            service = OpenRouterSummarizationService()
+            assert not os.path.exists(service.cache_dir)  # Created on first write only
+
+            service._save_to_cache("vid", "Summary text")
+            service._save_chunk_summaries_to_cache("vid", ["one", "two"])
+            service._save_cached_chunk("a" * 64, "Chunk summary")
+
+            # A fresh service reads the files once, then serves them from memory
+            service = OpenRouterSummarizationService()
+            assert service._load_from_cache("vid") == "Summary text"
+            assert service.get_cached_chunk_summaries("vid") == ["one", "two"]
+            assert service._load_cached_chunk("a" * 64) == "Chunk summary"
+            with no_disk():
+                for _ in range(3):
+                    assert service._load_from_cache("vid") == "Summary text"
+                    assert service.get_cached_chunk_summaries("vid") == ["one", "two"]
+                    assert service._load_cached_chunk("a" * 64) == "Chunk summary"
+
+            # Writes update the cached value
+            service._save_to_cache("vid", "New summary")
+            with no_disk():
+                assert service._load_from_cache("vid") == "New summary"
+            stats = service.memory_cache.get_stats()
+            assert stats['hits'] == 10, stats
+        finally:
+            os.chdir(cwd)
+    print("✅ Summaries and chunk summaries served from memory after the first read")
+
+
+def test_transcripts_served_without_disk():
+    service = TranscriptionService()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service.transcriptions_dir = tmp_dir
+        service.save_transcription("audio_abc", "Full transcript\n")
+        with no_disk():
+            assert service.get_cached_transcription("audio_abc") == "Full transcript"
+
+        # Removing the files drops the cached transcript too
+        service.cleanup_transcription_files(os.path.join(tmp_dir, "audio_abc.mp3"))
+        assert service.get_cached_transcription("audio_abc") is None
+    print("✅ Transcripts served from memory, dropped on cleanup")
+
+
+def test_lookup_speed():
+    """Memory hits are much cheaper than reading the cached file"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            service = OpenRouterSummarizationService()
+            service._save_to_cache("vid", "Summary " * 2000)
+
+            start = time.perf_counter()
+            for _ in range(500):
+                service._load_from_cache("vid")
+            memory_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(500):
+                service.memory_cache.clear()
+                service._load_from_cache("vid")
+            disk_time = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    assert memory_time < disk_time
+    print(f"✅ 500 lookups: {memory_time * 1000:.1f} ms from memory, {disk_time * 1000:.1f} ms from disk")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing memory cache...\n")
+    test_lru_eviction_by_size()
+    test_put_replaces_and_invalidate_removes()
+    test_summaries_served_without_disk()
+    test_transcripts_served_without_disk()
+    test_lookup_speed()
+    print("\n🎉 Memory cache tests passed!")
@@ -4,6 +4,7 @@ Test script for OpenRouter summarization service
 """
 
 from openrouter_summarization_service import OpenRouterSummarizationService
+from artifact_store import read_text
 
 def test_openrouter():
     """Test the OpenRouter service"""
@@ -57,8 +58,7 @@ def test_with_long_text():
             print("⚠️  Long text file not found, skipping long text test")
             return True
         
-        with open(txt_file, 'r', encoding='utf-8') as f:
-            long_text = f.read().strip()
+        long_text = read_text(txt_file).strip()
         
         service = OpenRouterSummarizationService()
         if not service.is_initialized:
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test streamed OpenRouter completions against a local SSE stub server
+"""
+
+import time
+
+from openrouter_stub import make_service, start_stub as start_openrouter_stub
+from openrouter_summarization_service import iter_sse_events
+
+TOKENS = ["Главное", ": **видео** ", "о ", "потоковой ", "передаче."]
+TOKEN_SECONDS = 0.2
+
+
+def start_stub(fail=False):
+    """Stub streaming TOKENS, or an error event instead of the third one if fail is set"""
+    server = start_openrouter_stub(answer=lambda payload: TOKENS, token_seconds=TOKEN_SECONDS,
+                                   stream_error_at=2 if fail else None)
+    service = make_service(server)
+    service.streaming = True
+    return server, service
+
+
+def test_iter_sse_events():
+    lines = [": keep-alive", "", "data: one", "", "event: x", "data: two", "data:three", "", "data: [DONE]"]
+    assert list(iter_sse_events(lines)) == ["one", "two\nthree", "[DONE]"]
+    print("✅ SSE events parsed")
+
+
+def test_streamed_summary():
+    """Partial text arrives long before the full response; the result is cleaned"""
+    server, service = start_stub()
+    updates = []
+    start = time.time()
+
+    def on_text(text):
+        updates.append((time.time() - start, text))
+
+    summary = service.summarize_text("Текст для пересказа. " * 10, on_text=on_text)
+    total = time.time() - start
+    server.shutdown()
+
+    assert server.payloads[0]['stream'] is True
+    assert [text for _, text in updates] == [''.join(TOKENS[:i + 1]) for i in range(len(TOKENS))]
+    first_token = updates[0][0]
+    assert first_token < total / 3, (first_token, total)
+    assert summary == "Главное: видео о потоковой передаче."
+    print(f"✅ First text after {first_token:.2f}s, full summary after {total:.2f}s")
+
+
+def test_stream_error_is_a_failure():
+    """An error event mid-stream fails the request instead of returning half a summary"""
+    server, service = start_stub(fail=True)
+    updates = []
+    summary = service._summarize_single_chunk("Текст для пересказа. " * 10, on_text=updates.append)
+    server.shutdown()
+
+    assert summary.startswith("Request failed")
+    assert "provider overloaded" in summary
+    assert updates == ["Главное", "Главное: **видео** "]
+    print("✅ Stream errors reported as failures")
+
+
+def test_streaming_disabled():
+    """With streaming off, on_text is ignored and a normal request is sent"""
+    server, service = start_stub()
+    service.streaming = False
+    updates = []
+    service.summarize_text("Текст для пересказа. " * 10, on_text=updates.append)
+    server.shutdown()
+
+    assert 'stream' not in server.payloads[0]
+    assert updates == []
+    print("✅ Streaming can be turned off")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing OpenRouter streaming...\n")
+    test_iter_sse_events()
+    test_streamed_summary()
+    test_stream_error_is_a_failure()
+    test_streaming_disabled()
+    print("\n🎉 OpenRouter streaming tests passed!")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test the streaming download -> decode -> transcribe pipeline offline, using a
+generated local media file as the stand-in for yt-dlp output and a stand-in
+whisper-cli script.
+"""
+
+import math
+import os
+import shutil
+import stat
+import struct
+import sys
+import tempfile
+
+from config import FFMPEG_PATH
+from streaming_transcriber import PcmSegmenter, SAMPLE_RATE, BYTES_PER_SECOND, write_wav
+from transcription_service import TranscriptionService, _transcribe_wav_with_server
+
+FAKE_WHISPER = '''#!{python}
+import sys
+args = sys.argv[1:]
+prefix = args[args.index('-of') + 1]
+wav = args[args.index('-f') + 1]
+name = wav.rsplit('/', 1)[-1].split('_')[0]
+with open(prefix + '.srt', 'w') as f:
+    f.write("1\\n00:00:00,500 --> 00:00:02,000\\nsegment " + name + "\\n")
+'''
+
+
+class FakeWhisperServer:
+    """Resident whisper server stand-in answering with one SRT cue per segment"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = []
+
+    def is_running(self):
+        return True
+
+    def transcribe(self, audio_file_path, language='auto', response_format='text'):
+        assert response_format == 'srt'
+        self.requests.append(os.path.basename(audio_file_path))
+        if self.fail:
+            raise Exception("whisper server error: 500")
+        name = os.path.basename(audio_file_path).split('_')[0]
+        return f"1\n00:00:00,500 --> 00:00:02,000\nserver {name}\n"
+
+
+def make_fake_whisper_cli(tmp_dir):
+    whisper_path = os.path.join(tmp_dir, 'whisper-cli')
+    with open(whisper_path, 'w') as f:
+        f.write(FAKE_WHISPER.format(python=sys.executable))
+    os.chmod(whisper_path, os.stat(whisper_path).st_mode | stat.S_IEXEC)
+    return whisper_path
+
+
+def make_pcm(pattern):
+    """Build PCM from [(seconds, loud), ...] - a 440 Hz tone or silence"""
+    pcm = bytearray()
+    for seconds, loud in pattern:
+        for i in range(int(seconds * SAMPLE_RATE)):
+            value = int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) if loud else 0
+            pcm += struct.pack('<h', value)
+    return bytes(pcm)
+
+
+def test_segmenter_cuts_at_quiet_point():
+    """Segments are emitted as bytes arrive, cut inside the silence"""
+    pcm = make_pcm([(7, True), (0.5, False), (8, True), (0.5, False), (6, True)])
+    segmenter = PcmSegmenter(min_seconds=5, max_seconds=10)
+
+    segments = []
+    step = 4096
+    for i in range(0, len(pcm), step):
+        segments.extend(segmenter.feed(pcm[i:i + step]))
+    streamed_before_end = len(segments)
+    segments.extend(segmenter.flush())
+
+    assert streamed_before_end == 2, "segments should be emitted before the stream ends"
+    assert 7.0 <= len(segments[0][1]) / BYTES_PER_SECOND <= 7.5
+    assert 15.5 <= segments[2][0] <= 16.0
+
+    # Nothing lost or duplicated, segments contiguous
+    assert b''.join(p for _, p in segments) == pcm
+    for (start, pcm_a), (next_start, _) in zip(segments, segments[1:]):
+        assert abs(start + len(pcm_a) / BYTES_PER_SECOND - next_start) < 1e-6
+    print(f"✅ Segmenter emitted {len(segments)} segments at silences")
+
+
+def test_stream_local_media_file():
+    """A local media file flows through ffmpeg into segment transcription"""
+    if not shutil.which(FFMPEG_PATH) and not os.path.exists(FFMPEG_PATH):
+        print("⚠️  ffmpeg not found, skipping streaming pipeline test")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        media_path = os.path.join(tmp_dir, 'talk.wav')
+        write_wav(media_path, make_pcm([(7, True), (0.5, False), (8, True), (0.5, False), (6, True)]))
+
+        service = TranscriptionService()
+        service.transcriptions_dir = tmp_dir
+        service.whisper_cli_path = make_fake_whisper_cli(tmp_dir)
+        service.segment_min_seconds = 5
+        service.segment_max_seconds = 10
+        service.segment_workers = 2
+
+        transcription = service.transcribe_stream(media_path, 'audio_localtest')
+
+        assert transcription.splitlines() == ["segment 0000", "segment 0001", "segment 0002"]
+        output_prefix = service._output_prefix('audio_localtest')
+        with open(f"{output_prefix}.srt", encoding='utf-8') as f:
+            srt = f.read()
+        assert "00:00:00,500 --> 00:00:02,000" in srt
+        assert "00:00:07," in srt  # second segment shifted by its offset
+        assert not os.path.exists(f"{output_prefix}.segments")
+
+        # Second call is served from the transcript cache
+        assert service.transcribe_stream('/nonexistent/source', 'audio_localtest') == transcription
+    print("✅ Local media file streamed into transcription")
+
+
+def test_segment_sent_to_whisper_server():
+    """Streamed segments go to the resident server, whisper-cli only when it fails"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        whisper_path = make_fake_whisper_cli(tmp_dir)
+        for server, expected in ((FakeWhisperServer(), "server 0000"), (FakeWhisperServer(fail=True), "segment 0000")):
+            segment_prefix = os.path.join(tmp_dir, "0000_0-7")
+            wav_file = f"{segment_prefix}.wav"
+            write_wav(wav_file, make_pcm([(1, True)]))
+            srt_file = _transcribe_wav_with_server(server, whisper_path, 'model.bin', wav_file, segment_prefix, 1)
+            with open(srt_file, encoding='utf-8') as f:
+                assert expected in f.read()
+            assert server.requests == ["0000_0-7.wav"]
+            assert not os.path.exists(wav_file)
+            os.remove(srt_file)
+    print("✅ Segments transcribed by the whisper server, whisper-cli as fallback")
+
+
+def test_stream_uses_whisper_server():
+    """With the server running, the streaming pipeline never starts whisper-cli"""
+    if not shutil.which(FFMPEG_PATH) and not os.path.exists(FFMPEG_PATH):
+        print("⚠️  ffmpeg not found, skipping streaming whisper server test")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        media_path = os.path.join(tmp_dir, 'talk.wav')
+        write_wav(media_path, make_pcm([(7, True), (0.5, False), (8, True), (0.5, False), (6, True)]))
+
+        server = FakeWhisperServer()
+        service = TranscriptionService(whisper_server=server)
+        service.transcriptions_dir = tmp_dir
+        service.whisper_cli_path = os.path.join(tmp_dir, 'missing-whisper-cli')
+        service.segment_min_seconds = 5
+        service.segment_max_seconds = 10
+
+        transcription = service.transcribe_stream(media_path, 'audio_servertest')
+        assert transcription.splitlines() == ["server 0000", "server 0001", "server 0002"]
+        assert len(server.requests) == 3
+    print("✅ Streaming pipeline sends segments to the whisper server")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing streaming transcription pipeline...\n")
+    test_segmenter_cuts_at_quiet_point()
+    test_stream_local_media_file()
+    test_segment_sent_to_whisper_server()
+    test_stream_uses_whisper_server()
+    print("\n🎉 Streaming pipeline tests passed!")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Test paced Telegram output against a local fake Bot API server
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import telebot
+from telebot import apihelper
+
+from telegram_outbox import TelegramOutbox, TokenBucket
+
+
+class FakeBotApi(BaseHTTPRequestHandler):
+    """sendMessage / editMessageText with optional 429s, Markdown errors and rejected texts"""
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        server = self.server
+        url = urlparse(self.path)
+        method = url.path.rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+        params = {key: values[0] for key, values in {**parse_qs(url.query), **parse_qs(body)}.items()}
+        chat_id = int(params['chat_id'])
+
+        with server.lock:
+            if server.rate_limits.get(chat_id):
+                server.rate_limits[chat_id] -= 1
+                server.calls.append((time.monotonic(), '429', chat_id, params.get('text')))
+                return self.reply(429, {'ok': False, 'error_code': 429,
+                                        'description': "Too Many Requests: retry after 1",
+                                        'parameters': {'retry_after': server.retry_after}})
+            if "UNSENDABLE" in params.get('text', ''):
+                return self.reply(400, {'ok': False, 'error_code': 400,
+                                        'description': "Bad Request: chat not found"})
+            if params.get('parse_mode') and "BROKEN" in params.get('text', ''):
+                return self.reply(400, {'ok': False, 'error_code': 400,
+                                        'description': "Bad Request: can't parse entities"})
+            server.calls.append((time.monotonic(), method, chat_id, params.get('text')))
+            if method == 'sendMessage':
+                server.next_id += 1
+                message_id = server.next_id
+            else:
+                message_id = int(params['message_id'])
+                server.edits.append((message_id, params['text']))
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': message_id, 'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'}, 'text': params.get('text'),
+        }})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeTelegram:
+    """Fake Bot API server with a TeleBot pointed at it"""
+
+    def __init__(self, retry_after=1):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBotApi)
+        self.server.lock = threading.Lock()
+        self.server.calls = []
+        self.server.edits = []
+        self.server.next_id = 100
+        self.server.rate_limits = {}
+        self.server.retry_after = retry_after
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.saved_url = apihelper.API_URL
+        apihelper.API_URL = f"http://127.0.0.1:{self.server.server_address[1]}/bot{{0}}/{{1}}"
+        self.bot = telebot.TeleBot("123456:TEST", threaded=False)
+
+    def calls(self, chat_id=None, method=None):
+        with self.server.lock:
+            return [call for call in self.server.calls
+                    if (chat_id is None or call[2] == chat_id) and (method is None or call[1] == method)]
+
+    def close(self):
+        apihelper.API_URL = self.saved_url
+        self.server.shutdown()
+
+
+def run_outbox(fake, **kwargs):
+    outbox = TelegramOutbox(fake.bot, **kwargs)
+    outbox.start()
+    return outbox
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=3)
+    now = bucket.updated
+    for _ in range(3):
+        assert bucket.wait_time(now) == 0
+        bucket.take(now)
+    assert abs(bucket.wait_time(now) - 0.1) < 1e-9
+    assert bucket.wait_time(now + 0.1) == 0
+    assert bucket.is_full(now + 1)
+    print("✅ Token bucket allows a burst, then its rate")
+
+
+def test_per_chat_order_and_pacing():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=100, chat_rate=10, chat_burst=1, senders=4)
+    try:
+        start = time.monotonic()
+        for i in range(5):
+            for chat_id in (1, 2, 3):
+                outbox.send(chat_id, f"chat {chat_id} message {i}", reply_markup=telebot.types.InlineKeyboardMarkup())
+        assert time.monotonic() - start < 0.05  # Queuing never waits for the API
+        assert outbox.wait_idle(10)
+        for chat_id in (1, 2, 3):
+            calls = fake.calls(chat_id)
+            assert [text for _, _, _, text in calls] == [f"chat {chat_id} message {i}" for i in range(5)]
+            gaps = [b[0] - a[0] for a, b in zip(calls, calls[1:])]
+            assert min(gaps) > 0.08, gaps  # ~1 message per 0.1 s per chat
+        elapsed = time.monotonic() - start
+        assert elapsed < 1.0, elapsed  # Chats are served in parallel
+    finally:
+        outbox.stop()
+        fake.close()
+    print(f"✅ 3 chats × 5 messages in order, paced per chat ({elapsed:.2f}s)")
+
+
+def test_global_rate():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=20, chat_rate=100, chat_burst=5, senders=4)
+    try:
+        start = time.monotonic()
+        for chat_id in range(40):
+            outbox.send(chat_id, "hello")
+        assert outbox.wait_idle(10)
+        elapsed = time.monotonic() - start
+        assert len(fake.calls(method='sendMessage')) == 40
+        # 20 burst tokens, then 20/s for the other 20 messages
+        assert 0.9 < elapsed < 2.0, elapsed
+    finally:
+        outbox.stop()
+        fake.close()
+    print(f"✅ 40 chats within the global rate of 20/s ({elapsed:.2f}s)")
+
+
+def test_status_edits_are_coalesced():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=100, chat_rate=5, chat_burst=1, senders=2)
+    try:
+        status = outbox.send(7, "🔄 Processing your video...")
+        for step in range(30):
+            outbox.edit(7, status, f"step {step}")
+        assert outbox.wait_idle(10)
+        message_id = status.result().message_id
+        assert fake.server.edits[-1] == (message_id, "step 29")
+        assert len(fake.server.edits) <= 2, fake.server.edits
+        assert outbox.get_stats()['coalesced'] >= 28
+    finally:
+        outbox.stop()
+        fake.close()
+    print(f"✅ 30 status updates sent as {len(fake.server.edits)} edits of the status message")
+
+
+def test_retry_after_is_honoured():
+    fake = FakeTelegram(retry_after=1)
+    fake.server.rate_limits[1] = 1  # First request to chat 1 gets a 429
+    outbox = run_outbox(fake, global_rate=100, chat_rate=100, chat_burst=10, senders=2)
+    try:
+        futures = outbox.send_parts(1, [f"part {i}" for i in range(3)])
+        other = outbox.send(2, "other chat")
+        assert outbox.wait_idle(10)
+        [limited] = fake.calls(1, '429')
+        sent = fake.calls(1, 'sendMessage')
+        assert sent[0][0] - limited[0] >= 0.95  # Waited retry_after
+        assert fake.calls(2)[0][0] < sent[0][0]  # Other chats were not held up
+        assert [future.result().text for future in futures] == ["part 0\n\npart 1\n\npart 2"] * 3
+        assert other.result().text == "other chat"
+        assert outbox.get_stats()['rate_limited'] == 1
+    finally:
+        outbox.stop()
+        fake.close()
+    print("✅ 429 retry_after pauses only that chat, order kept")
+
+
+def test_parts_merge_and_markdown_fallback():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=100, chat_rate=1, chat_burst=1, senders=1)
+    try:
+        long_parts = outbox.send_parts(5, ["a" * 3000, "b" * 3000])
+        short_parts = outbox.send_parts(5, ["**Part 1**", "**Part 2** BROKEN"], parse_mode='Markdown')
+        assert outbox.wait_idle(10)
+        texts = [text for _, _, _, text in fake.calls(5)]
+        # Parts too long to combine stay separate; short ones go as one message,
+        # resent as plain text when Telegram can't parse the Markdown
+        assert texts == ["a" * 3000, "b" * 3000, "Part 1\n\nPart 2 BROKEN"], texts
+        assert long_parts[0].result().message_id != long_parts[1].result().message_id
+        assert short_parts[0].result() is short_parts[1].result()
+        assert outbox.get_stats()['merged'] == 1
+    finally:
+        outbox.stop()
+        fake.close()
+    print("✅ Short parts merged, rejected Markdown resent as plain text")
+
+
+def test_replies_and_single_sends_are_not_merged():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=100, chat_rate=1, chat_burst=1, senders=1)
+    try:
+        outbox.send(6, "first")  # Holds the chat's only token, so the rest queue up
+        status = outbox.send(6, "🔄 Processing your video...", reply_to_message_id=10)
+        notice = outbox.send(6, "⏳ Queued")
+        parts = outbox.send_parts(6, ["Part 1", "Part 2"], reply_to_message_id=11)
+        outbox.edit(6, status, "✅ Done")
+        assert outbox.wait_idle(10)
+        sent = [text for _, method, _, text in fake.calls(6) if method == 'sendMessage']
+        assert sent == ["first", "🔄 Processing your video...", "⏳ Queued", "Part 1", "Part 2"], sent
+        assert fake.server.edits == [(status.result().message_id, "✅ Done")]
+        assert notice.result().message_id != status.result().message_id
+        assert parts[0].result().message_id != parts[1].result().message_id
+        assert outbox.get_stats()['merged'] == 0
+    finally:
+        outbox.stop()
+        fake.close()
+    print("✅ Replies and editable messages are never merged with other sends")
+
+
+def test_edits_of_a_failed_send_reuse_one_message():
+    fake = FakeTelegram()
+    outbox = run_outbox(fake, global_rate=100, chat_rate=100, chat_burst=10, senders=2)
+    try:
+        status = outbox.send(8, "🔄 UNSENDABLE")
+        outbox.wait_idle(10)
+        for step in range(3):
+            outbox.edit(8, status, f"step {step}")
+            assert outbox.wait_idle(10)
+        sent = [text for _, method, _, text in fake.calls(8) if method == 'sendMessage']
+        assert sent == ["step 0"], sent
+        replacement = outbox.edit(8, status, "✅ Done").result(10)
+        assert fake.server.edits == [(replacement.message_id, text) for text in ("step 1", "step 2", "✅ Done")]
+    finally:
+        outbox.stop()
+        fake.close()
+    print("✅ Edits of a failed send go to the one message sent in its place")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing Telegram outbox...\n")
+    test_token_bucket()
+    test_per_chat_order_and_pacing()
+    test_global_rate()
+    test_status_edits_are_coalesced()
+    test_retry_after_is_honoured()
+    test_parts_merge_and_markdown_fallback()
+    test_replies_and_single_sends_are_not_merged()
+    test_edits_of_a_failed_send_reuse_one_message()
+    print("\n🎉 Telegram outbox tests passed!")
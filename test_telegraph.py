@@ -4,6 +4,7 @@ Test script for Telegraph service
 """
 
 from telegraph_service import TelegraphService
+from artifact_store import read_text
 
 def test_telegraph():
     """Test the Telegraph service"""
@@ -13,8 +14,7 @@ def test_telegraph():
         service = TelegraphService()
         
         # Test with the existing transcription
-        with open('./transcriptions/audio_dVhYaEXir88.txt', 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_text('./transcriptions/audio_dVhYaEXir88.txt')
         
         title = "Test Transcription - Yulia Latynina"
         video_url = "https://youtube.com/watch?v=dVhYaEXir88"
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test token-budgeted chunking on sentence boundaries
+"""
+
+import re
+from unittest import mock
+
+import text_chunker
+from text_chunker import chunk_text, count_tokens, get_encoder, split_sentences
+
+SENTENCES = [
+    "Сегодня мы поговорим о том, как устроены большие языковые модели.",
+    "Во-первых, они обучаются на огромных корпусах текста!",
+    "Почему это работает?",
+    "Ответ не так прост…",
+]
+
+
+def make_transcript(count):
+    """Whisper-style transcript: several sentences per line, each line numbered so none repeat"""
+    return '\n'.join(f"Фрагмент {i}. " + ' '.join(SENTENCES[(i + j) % 4] for j in range(3))
+                     for i in range(count))
+
+
+def test_split_sentences_round_trip():
+    """Sentences keep their separators so they join back to the original text"""
+    text = "Привет. Как дела?\nХорошо!  А у тебя…  ок\nпоследняя строка"
+    sentences = split_sentences(text)
+    assert ''.join(sentences) == text
+    assert sentences == ["Привет. ", "Как дела?\n", "Хорошо!  ", "А у тебя…  ", "ок\n", "последняя строка"]
+    # Decimal points and abbreviations without a following space don't split
+    assert split_sentences("Версия 2.5 вышла") == ["Версия 2.5 вышла"]
+    print("✅ Sentences split and rejoin losslessly")
+
+
+def test_chunks_respect_budget_and_boundaries():
+    """Every chunk fits the budget and ends at a sentence boundary"""
+    text = make_transcript(600)
+    result = chunk_text(text, max_tokens=2000, overlap=200)
+    chunks = result['chunks']
+
+    assert len(chunks) > 1
+    assert len(result['token_counts']) == len(chunks)
+    assert all(count <= 2000 for count in result['token_counts'])
+    for chunk in chunks:
+        assert re.search(r'[.!?…]\s*$', chunk), chunk[-40:]
+        assert chunk.lstrip()[0].isupper(), chunk[:40]
+    print(f"✅ {len(chunks)} chunks within budget, cut on sentence boundaries")
+
+
+def test_overlap_and_coverage():
+    """Consecutive chunks share up to `overlap` tokens of whole sentences; nothing is lost"""
+    text = make_transcript(600)
+    result = chunk_text(text, max_tokens=2000, overlap=200)
+    chunks = result['chunks']
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        shared = next(n for n in range(len(chunk), -1, -1) if previous.endswith(chunk[:n]))
+        assert shared > 0
+        assert count_tokens(chunk[:shared]) <= 200 + 1
+
+    # Without overlap the chunks are an exact partition of the text
+    assert ''.join(chunk_text(text, max_tokens=2000, overlap=0)['chunks']) == text
+    assert result['total_tokens'] >= sum(result['token_counts']) - 200 * (len(chunks) - 1)
+    print("✅ Overlap is whole sentences, text fully covered")
+
+
+def test_run_on_text_cut_between_words():
+    """Text without sentence breaks is still cut between words, never inside one"""
+    words = [f"слово{i}" for i in range(20000)]
+    chunks = chunk_text(' '.join(words), max_tokens=3000, overlap=0)['chunks']
+
+    assert len(chunks) > 1
+    assert [word for chunk in chunks for word in chunk.split()] == words
+    print("✅ Run-on text cut between words")
+
+
+def test_short_text_single_chunk():
+    result = chunk_text("Короткий текст.")
+    assert result['chunks'] == ["Короткий текст."]
+    assert result['token_counts'] == [result['total_tokens']]
+    assert chunk_text("")['chunks'] == []
+    print("✅ Short text stays in one chunk")
+
+
+def test_encoder_loaded_once():
+    """The tokenizer is loaded once per model, including a failed (offline) load"""
+    with mock.patch.dict(text_chunker._encoders, clear=True), \
+            mock.patch.object(text_chunker.tiktoken, 'encoding_for_model',
+                              side_effect=Exception("offline")) as load:
+        for _ in range(3):
+            assert get_encoder("some-model") is None
+            chunk_text(make_transcript(10), model="some-model")
+        assert load.call_count == 1
+    print("✅ Encoder loaded once per model")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing text chunker...\n")
+    test_split_sentences_round_trip()
+    test_chunks_respect_budget_and_boundaries()
+    test_overlap_and_coverage()
+    test_run_on_text_cut_between_words()
+    test_short_text_single_chunk()
+    test_encoder_loaded_once()
+    print("\n🎉 Text chunker tests passed!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test transcript compaction: whisper repetition loops, non-speech tags and filler
+"""
+
+from transcript_compactor import collapse_repeats, compact_transcript, CompactionStats
+
+
+def test_collapse_repeats():
+    """Runs of 3+ repeated n-grams become one copy; a single repeat is kept"""
+    assert collapse_repeats(list("aaaab")) == list("ab")
+    assert collapse_repeats(list("xababababy")) == list("xaby")
+    assert collapse_repeats(list("aab")) == list("aab")
+    assert collapse_repeats(list("abcabcabc"), max_ngram=2) == list("abcabcabc")
+    assert collapse_repeats([]) == []
+    print("✅ Repeated n-gram runs collapsed")
+
+
+def test_whisper_line_loops():
+    """A hallucinated line repeated on silence is kept once, and so is a multi-line loop"""
+    text = '\n'.join(
+        ["Сегодня поговорим о бюджете."]
+        + ["Спасибо за внимание."] * 40
+        + ["Первый пункт.", "Второй пункт."] * 10
+        + ["Итак, вернёмся к теме."]
+    )
+    result = compact_transcript(text)
+    assert result['text'].split('\n') == [
+        "Сегодня поговорим о бюджете.", "Спасибо за внимание.",
+        "Первый пункт.", "Второй пункт.", "Итак, вернёмся к теме.",
+    ]
+    assert (result['segments_before'], result['segments_after']) == (62, 5)
+    print("✅ Whisper line loops collapsed")
+
+
+def test_loops_inside_a_segment():
+    """Word loops inside one line collapse; case and punctuation don't hide them"""
+    result = compact_transcript("И вот мы видим, что, что рост, рост, рост, Рост, рост продолжается.")
+    assert result['text'] == "И вот мы видим, что, что рост, продолжается."
+    print("✅ Word loops inside a segment collapsed")
+
+
+def test_filler_and_non_speech():
+    """Tags, stock hallucinations, hesitations and segments that are only filler go"""
+    text = '\n'.join([
+        "[Музыка]",
+        "Эээ... ммм",
+        "Ну вот, типа.",
+        "Рынок вырос на десять процентов.",
+        "В общем, как бы, это самое...",
+        "   Мы   эээ   обсудим   это   позже.  ",
+        "А путь, короче, стал короче, чем был.",
+        "",
+        "(смех)",
+        "♪♪",
+        "Субтитры сделал DimaTorzok",
+        "Продолжение следует...",
+    ])
+    result = compact_transcript(text)
+    assert result['text'] == (
+        "Рынок вырос на десять процентов.\nМы обсудим это позже.\nА путь, короче, стал короче, чем был."
+    )
+    assert result['tokens_saved'] > 0
+    assert result['tokens_before'] - result['tokens_after'] == result['tokens_saved']
+    print(f"✅ Filler and non-speech removed ({result['tokens_saved']} tokens saved)")
+
+
+def test_short_answers_kept():
+    """Segments made only of short words like "Да." are answers, not filler"""
+    text = "Вы согласны?\nДа.\nЭто так.\nНу, вот.\nOkay, so."
+    assert compact_transcript(text)['text'] == "Вы согласны?\nДа.\nЭто так.\nOkay, so."
+    print("✅ Short answers kept as segments")
+
+
+def test_words_that_are_only_sometimes_filler():
+    """"как", "это", "в" or "так" inside a segment are content and stay"""
+    text = '\n'.join([
+        "Мы шли в лес, как, например, вчера.",
+        "Это, по-моему, главное.",
+        "Как, вы не знали?",
+        "Так, это, значит, важно.",
+        "Как бы то ни было, в общем зале тихо.",
+    ])
+    assert compact_transcript(text)['text'] == text
+    print("✅ Ambiguous filler words kept in segments with content")
+
+
+def test_clean_transcript_untouched():
+    text = "Первое предложение.\nВторое предложение, совсем другое.\nИ третье."
+    assert compact_transcript(text)['text'] == text
+    print("✅ Clean transcript unchanged")
+
+
+def test_compaction_stats():
+    stats = CompactionStats()
+    stats.record('video1', {'tokens_before': 1000, 'tokens_after': 700, 'tokens_saved': 300,
+                            'segments_before': 10, 'segments_after': 7})
+    stats.record('video2', {'tokens_before': 1000, 'tokens_after': 900, 'tokens_saved': 100,
+                            'segments_before': 10, 'segments_after': 9})
+    assert stats.get_stats() == {'videos': 2, 'tokens_saved': 400, 'saved_share': 0.2}
+    print("✅ Tokens saved tracked across videos")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing transcript compaction...\n")
+    test_collapse_repeats()
+    test_whisper_line_loops()
+    test_loops_inside_a_segment()
+    test_filler_and_non_speech()
+    test_short_answers_kept()
+    test_words_that_are_only_sometimes_filler()
+    test_clean_transcript_untouched()
+    test_compaction_stats()
+    print("\n🎉 Transcript compaction tests passed!")
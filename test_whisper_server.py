@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the managed whisper server: startup, health checks, crash restart and
+transcription over the local socket. Uses a small stand-in server script so
+no whisper.cpp build is needed.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from artifact_index import ArtifactIndex
+from transcription_service import TranscriptionService
+from whisper_server import WhisperServer
+
+FAKE_SERVER = '''#!{python}
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+args = sys.argv[1:]
+host = args[args.index('--host') + 1]
+port = int(args[args.index('--port') + 1])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(b'{{"status": "ok"}}')
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self._reply(b' transcribed by resident model ')
+
+
+ThreadingHTTPServer((host, port), Handler).serve_forever()
+'''
+
+
+def make_server(tmp_dir):
+    """Create a WhisperServer pointed at the stand-in script"""
+    script_path = os.path.join(tmp_dir, 'whisper-server')
+    with open(script_path, 'w') as f:
+        f.write(FAKE_SERVER.format(python=sys.executable))
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IEXEC)
+
+    server = WhisperServer()
+    server.server_path = script_path
+    server.port = 18178
+    server.startup_timeout = 10
+    server.health_interval = 0.2
+    return server
+
+
+def test_start_and_transcribe():
+    """Server starts, reports healthy and transcribes"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = make_server(tmp_dir)
+        try:
+            assert server.start()
+            assert server.is_healthy()
+
+            audio_path = os.path.join(tmp_dir, 'clip.wav')
+            with open(audio_path, 'wb') as f:
+                f.write(b'RIFF' + b'\0' * 64)
+
+            assert server.transcribe(audio_path) == "transcribed by resident model"
+        finally:
+            server.stop()
+        assert not server.is_running()
+    print("✅ Server starts and transcribes")
+
+
+def test_restart_after_crash():
+    """Watchdog restarts a crashed server"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = make_server(tmp_dir)
+        try:
+            assert server.start()
+            server.process.kill()
+            server.process.wait()
+
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and not server.is_healthy():
+                time.sleep(0.2)
+
+            assert server.is_healthy()
+            assert server.restarts >= 1
+        finally:
+            server.stop()
+    print("✅ Crashed server restarted")
+
+
+def test_missing_binary():
+    """A missing binary leaves the CLI fallback in place"""
+    server = WhisperServer()
+    server.server_path = '/nonexistent/whisper-server'
+    assert not server.start()
+    assert not server.is_running()
+    print("✅ Missing server binary falls back to CLI")
+
+
+class PaddedServer:
+    """Running server whose transcript has whisper's surrounding whitespace"""
+
+    def is_running(self):
+        return True
+
+    def transcribe(self, audio_file_path, language='auto', response_format='text'):
+        return "\n Hello from the server\n"
+
+
+def test_server_transcript_matches_cache():
+    """The first transcription returns the same text later cached calls do"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = TranscriptionService(whisper_server=PaddedServer())
+        service.mode = 'whole'
+        service.transcriptions_dir = tmp_dir
+        service.artifact_index = ArtifactIndex(os.path.join(tmp_dir, 'artifacts.db'))
+        audio_file = os.path.join(tmp_dir, 'audio_strip.mp3')
+        open(audio_file, 'wb').close()
+
+        first = service.transcribe_audio(audio_file)
+        assert first == "Hello from the server"
+        assert service.transcribe_audio(audio_file) == first
+        service.memory_cache.clear()
+        assert service.transcribe_audio(audio_file) == first
+    print("✅ Server transcripts are stripped before caching and returning")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing whisper server manager...\n")
+    test_start_and_transcribe()
+    test_restart_after_crash()
+    test_missing_binary()
+    test_server_transcript_matches_cache()
+    print("\n🎉 Whisper server tests passed!")
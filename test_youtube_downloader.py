@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test audio download formats and their cache keys using a stand-in yt-dlp
+"""
+
+import os
+import stat
+import sys
+import tempfile
+
+from youtube_downloader import YouTubeDownloader
+from transcription_service import transcript_base_name
+
+FAKE_YT_DLP = '''#!{python}
+import sys
+args = sys.argv[1:]
+with open({calls!r}, 'a') as f:
+    f.write(' '.join(args) + '\\n')
+template = args[args.index('-o') + 1]
+ext = args[args.index('--audio-format') + 1] if '--audio-format' in args else 'webm'
+with open(template.replace('%(ext)s', ext), 'wb') as f:
+    f.write(b'audio')
+'''
+
+
+def make_downloader(tmp_dir, audio_format):
+    """Create a downloader pointed at the stand-in yt-dlp"""
+    calls_path = os.path.join(tmp_dir, 'calls.txt')
+    script_path = os.path.join(tmp_dir, 'yt-dlp')
+    with open(script_path, 'w') as f:
+        f.write(FAKE_YT_DLP.format(python=sys.executable, calls=calls_path))
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IEXEC)
+
+    downloader = YouTubeDownloader()
+    downloader.yt_dlp_path = script_path
+    downloader.downloads_dir = tmp_dir
+    downloader.audio_format = audio_format
+    return downloader, calls_path
+
+
+def read_calls(calls_path):
+    if not os.path.exists(calls_path):
+        return []
+    with open(calls_path) as f:
+        return f.read().splitlines()
+
+
+def test_wav16k_skips_mp3_reencode():
+    """wav16k asks yt-dlp for a single decode to 16 kHz mono WAV"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        downloader, calls_path = make_downloader(tmp_dir, 'wav16k')
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+        path = downloader.download_audio(url)
+        assert os.path.basename(path) == "audio_dQw4w9WgXcQ.16k.wav"
+
+        calls = read_calls(calls_path)
+        assert len(calls) == 1
+        assert '--audio-format wav' in calls[0]
+        assert 'ExtractAudio:-ar 16000 -ac 1' in calls[0]
+        assert 'mp3' not in calls[0]
+
+        # Cached on the second request
+        assert downloader.download_audio(url) == path
+        assert len(read_calls(calls_path)) == 1
+    print("✅ wav16k downloads decode once and are cached")
+
+
+def test_native_keeps_original_stream():
+    """native downloads bestaudio without extracting/transcoding"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        downloader, calls_path = make_downloader(tmp_dir, 'native')
+
+        path = downloader.download_audio("https://youtu.be/dQw4w9WgXcQ")
+        assert os.path.basename(path) == "audio_dQw4w9WgXcQ.native.webm"
+        calls = read_calls(calls_path)
+        assert '-f bestaudio' in calls[0]
+        assert '-x' not in calls[0].split()
+    print("✅ native downloads keep the original stream")
+
+
+def test_cache_key_covers_format():
+    """Formats don't collide, legacy mp3 downloads are still reused"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        downloader, calls_path = make_downloader(tmp_dir, 'native')
+        native_path = downloader.download_audio("https://youtu.be/dQw4w9WgXcQ")
+
+        # A native file doesn't satisfy a wav16k request
+        downloader.audio_format = 'wav16k'
+        wav_path = downloader.download_audio("https://youtu.be/dQw4w9WgXcQ")
+        assert wav_path != native_path
+        assert len(read_calls(calls_path)) == 2
+
+        # An existing legacy mp3 is reused instead of downloading again
+        legacy_path = os.path.join(tmp_dir, "audio_legacyVideo.mp3")
+        with open(legacy_path, 'wb') as f:
+            f.write(b'mp3')
+        assert downloader.download_audio("https://youtu.be/legacyVideo") == legacy_path
+        assert len(read_calls(calls_path)) == 2
+
+        # All formats of one video share one transcript
+        assert {transcript_base_name(p) for p in (native_path, wav_path)} == {"audio_dQw4w9WgXcQ"}
+    print("✅ Cache key covers the audio format")
+
+
+if __name__ == '__main__':
+    print("🧪 Testing YouTube downloader formats...\n")
+    test_wav16k_skips_mp3_reencode()
+    test_native_keeps_original_stream()
+    test_cache_key_covers_format()
+    print("\n🎉 YouTube downloader tests passed!")
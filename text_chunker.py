@@ -0,0 +1,111 @@
+import logging
+import math
+import re
+import threading
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! ? … followed by whitespace, or at a line break (one
+# whisper/caption segment per line); trailing whitespace stays with it so the
+# pieces join back to the original text.
+SENTENCE_RE = re.compile(r'[^\n]*?(?:[.!?…]+(?=\s)|\n|$)\s*')
+WORD_RE = re.compile(r'\S+\s*|\s+')
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model="gpt-4o"):
+    """Tokenizer for a model, loaded once per process; None if it can't be loaded (e.g. offline)"""
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                logger.warning(f"Tokenizer for {model} unavailable ({e}), estimating token counts")
+                _encoders[model] = None
+        return _encoders[model]
+
+
+def estimate_tokens(text):
+    """Rough token count when no tokenizer is available (about 3 chars per token for Russian text)"""
+    return len(text) // 3 + 1
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Token count of text for the model"""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode_ordinary(text))
+
+
+def count_tokens_batch(texts, model="gpt-4o"):
+    """Token counts for many texts at once"""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return [estimate_tokens(text) for text in texts]
+    return [len(tokens) for tokens in encoder.encode_ordinary_batch(texts)]
+
+
+def split_sentences(text):
+    """Split text into sentences/segments that join back to the original text"""
+    return [match.group(0) for match in SENTENCE_RE.finditer(text) if match.group(0)]
+
+
+def _split_long_unit(unit, tokens, piece_tokens):
+    """Split an over-long sentence into word groups of about piece_tokens each"""
+    words = WORD_RE.findall(unit)
+    pieces = min(len(words), math.ceil(tokens / piece_tokens))
+    size = math.ceil(len(words) / pieces)
+    groups = [''.join(words[i:i + size]) for i in range(0, len(words), size)]
+    share = tokens / len(unit)
+    return [(group, max(1, round(len(group) * share))) for group in groups]
+
+
+def chunk_text(text, max_tokens=15000, overlap=1000, model="gpt-4o"):
+    """
+    Split text into chunks of at most max_tokens, cutting only between
+    sentences (or between words for sentences longer than max_tokens / 4).
+    Each chunk starts with up to `overlap` tokens of whole sentences from the
+    end of the previous one. Tokens are counted once, per sentence.
+
+    Returns {'chunks': [...], 'token_counts': [...], 'total_tokens': n}.
+    """
+    sentences = split_sentences(text)
+    counts = count_tokens_batch(sentences, model)
+
+    units = []
+    piece_tokens = max(1, max_tokens // 4)
+    for sentence, tokens in zip(sentences, counts):
+        if tokens > piece_tokens and len(sentence) > 1:
+            units.extend(_split_long_unit(sentence, tokens, piece_tokens))
+        else:
+            units.append((sentence, tokens))
+
+    chunks, token_counts = [], []
+    current, current_tokens = [], 0
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(''.join(u for u, _ in current))
+            token_counts.append(current_tokens)
+
+            # Carry whole trailing sentences into the next chunk as overlap
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                if carried_tokens + previous[1] > overlap or carried_tokens + previous[1] + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous[1]
+            current, current_tokens = carried, carried_tokens
+
+        current.append((unit, tokens))
+        current_tokens += tokens
+
+    if current:
+        chunks.append(''.join(u for u, _ in current))
+        token_counts.append(current_tokens)
+
+    return {'chunks': chunks, 'token_counts': token_counts, 'total_tokens': sum(counts)}
@@ -0,0 +1,149 @@
+import logging
+import re
+import threading
+
+from text_chunker import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Hesitation sounds carry no content wherever they appear ("ээ", "м-м", "эм", "uh")
+HESITATION_RE = re.compile(r'^(?:э+|э+м+|м+|м-м+|а-а+|э-э+|хм+|uh+|um+|uhm+|hmm+|erm?)$', re.I)
+
+# Discourse fillers, single words and phrases. Only segments made of nothing
+# else are dropped ("Ну вот.", "В общем, как бы..."); words like "как", "это"
+# or "так" are too often content to be removed on their own
+FILLER_PHRASES = {
+    ('ну',), ('вот',), ('типа',), ('короче',), ('значит',), ('в', 'общем'), ('как', 'бы'),
+    ('это', 'самое'), ('так', 'сказать'), ('well',), ('you', 'know'),
+}
+LONGEST_FILLER = max(len(phrase) for phrase in FILLER_PHRASES)
+
+# Non-speech tags and whisper's stock hallucinations on silence or music
+NON_SPEECH_RE = re.compile(
+    r'^(?:[\[(][^\])]*[\])]|♪+|[.…\s]+|'
+    r'субтитры (?:сделал|создавал|делал) [\w ]+|редактор субтитров [\w. ]+|'
+    r'продолжение следует\W*)$',
+    re.I
+)
+
+WORD_RE = re.compile(r'[\w-]+')
+
+
+def _normalize(line):
+    """Comparison key for a segment: lowercase words only"""
+    return ' '.join(WORD_RE.findall(line.lower()))
+
+
+def collapse_repeats(items, key=lambda item: item, max_ngram=8, min_repeats=3):
+    """
+    Collapse runs of an n-gram repeated min_repeats or more times in a row
+    (n up to max_ngram) into a single copy. Shorter repeats are kept, since
+    people do say the same thing twice.
+    """
+    keys = [key(item) for item in items]
+    result_items, result_keys = [], []
+    i = 0
+    while i < len(items):
+        collapsed = False
+        for n in range(1, max_ngram + 1):
+            if i + n * min_repeats > len(items):
+                break
+            pattern = keys[i:i + n]
+            repeats = 1
+            while keys[i + repeats * n:i + (repeats + 1) * n] == pattern:
+                repeats += 1
+            if repeats >= min_repeats:
+                result_items.extend(items[i:i + n])
+                result_keys.extend(pattern)
+                i += repeats * n
+                collapsed = True
+                break
+        if not collapsed:
+            result_items.append(items[i])
+            result_keys.append(keys[i])
+            i += 1
+    return result_items
+
+
+def _is_filler_segment(line):
+    """Whether every word of a segment belongs to a filler phrase ("Ну, вот." but not "Да." or "Так, это важно.")"""
+    words = WORD_RE.findall(line.lower())
+    i = 0
+    while i < len(words):
+        for n in range(LONGEST_FILLER, 0, -1):
+            if tuple(words[i:i + n]) in FILLER_PHRASES:
+                i += n
+                break
+        else:
+            return False
+    return bool(words)
+
+
+def _compact_line(line):
+    """Drop hesitation sounds and word loops inside a segment, normalize its whitespace"""
+    words = [word for word in line.split() if not HESITATION_RE.match(word.strip('.,!?…'))]
+    return ' '.join(collapse_repeats(words, key=lambda word: word.lower().strip('.,!?…')))
+
+
+def compact_transcript(text, model="gpt-4o"):
+    """
+    Strip what the LLM doesn't need from a transcript (one segment per line):
+    whisper repetition loops, non-speech tags, hesitation sounds, segments
+    that are only filler and extra whitespace.
+
+    Returns {'text', 'tokens_before', 'tokens_after', 'tokens_saved',
+    'segments_before', 'segments_after'}.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    segments = []
+    for line in lines:
+        line = _compact_line(line)
+        if not line or NON_SPEECH_RE.match(line) or _is_filler_segment(line):
+            continue
+        segments.append(line)
+
+    # Loops of whole segments (the same line, or the same few lines, over and over)
+    segments = collapse_repeats(segments, key=_normalize, max_ngram=4)
+    compacted = '\n'.join(segments)
+
+    tokens_before = count_tokens(text, model)
+    tokens_after = count_tokens(compacted, model) if compacted else 0
+    return {
+        'text': compacted,
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_saved': tokens_before - tokens_after,
+        'segments_before': len(lines),
+        'segments_after': len(segments),
+    }
+
+
+class CompactionStats:
+    """Running totals of tokens saved by compaction, for /status"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.videos = 0
+        self.tokens_before = 0
+        self.tokens_saved = 0
+
+    def record(self, video_id, result):
+        with self._lock:
+            self.videos += 1
+            self.tokens_before += result['tokens_before']
+            self.tokens_saved += result['tokens_saved']
+        share = result['tokens_saved'] / result['tokens_before'] if result['tokens_before'] else 0
+        logger.info(f"Compacted transcript for {video_id}: {result['tokens_before']} -> "
+                    f"{result['tokens_after']} tokens ({share:.0%} saved), "
+                    f"{result['segments_before']} -> {result['segments_after']} segments")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'videos': self.videos,
+                'tokens_saved': self.tokens_saved,
+                'saved_share': self.tokens_saved / self.tokens_before if self.tokens_before else 0.0,
+            }
+
+
+compaction_stats = CompactionStats()
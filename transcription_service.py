@@ -1,50 +1,182 @@
 import os
+import shutil
 import subprocess
-from config import WHISPER_CLI_PATH, WHISPER_MODEL_PATH, TRANSCRIPTIONS_DIR
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from audio_segmenter import (
+    get_audio_duration, detect_silences, plan_segments, extract_segment, decode_to_wav,
+    parse_srt, format_srt, stitch_segments
+)
+from streaming_transcriber import PcmSegmenter, PcmStream, write_wav, BYTES_PER_SECOND
+from memory_cache import MemoryCache
+from artifact_index import artifact_index, TRANSCRIPT, SUBTITLES
+from artifact_store import CorruptArtifact, atomic_write, read_text, write_text
+from cache_layout import find_existing, lookup_paths, shard_path
+from media_identity import cache_hit_stats
+from config import (
+    WHISPER_CLI_PATH, WHISPER_MODEL_PATH, TRANSCRIPTIONS_DIR, TRANSCRIPTION_MODE,
+    SEGMENT_MIN_SECONDS, SEGMENT_MAX_SECONDS, SEGMENT_WORKERS, SEGMENT_THREADS
+)
+
+# Formats whisper-cli can read directly; anything else is decoded to WAV first
+WHISPER_CLI_FORMATS = ('.wav', '.mp3', '.flac', '.ogg')
+
+
+def transcript_base_name(audio_file_path):
+    """Transcript name for an audio file, shared by all audio formats of a video
+    (audio_<id>.mp3, audio_<id>.16k.wav and audio_<id>.native.webm -> audio_<id>)"""
+    return os.path.basename(audio_file_path).split('.')[0]
+
+
+def transcript_video_id(path):
+    """Video id of a transcript name or path (audio_<id>.txt -> <id>)"""
+    return transcript_base_name(path).replace('audio_', '', 1)
+
+
+def transcribe_wav_segment(whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads):
+    """Run whisper-cli on a 16 kHz WAV segment, returning its cached SRT path"""
+    srt_file = f"{segment_prefix}.srt"
+    partial_prefix = f"{segment_prefix}.partial"
+    cmd = [
+        whisper_cli_path,
+        '-m', whisper_model_path,
+        '-l', 'auto',
+        '-t', str(threads),
+        '--output-srt',
+        '-of', partial_prefix,
+        '-f', wav_file
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+    # Rename only complete results into the segment cache
+    os.replace(f"{partial_prefix}.srt", srt_file)
+    return srt_file
+
+
+def _transcribe_wav_file(whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads):
+    """Transcribe a streamed WAV segment in a worker process, returning its SRT path"""
+    srt_file = f"{segment_prefix}.srt"
+    try:
+        if os.path.exists(srt_file) and os.path.getsize(srt_file) > 0:
+            return srt_file
+        return transcribe_wav_segment(whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads)
+    finally:
+        if os.path.exists(wav_file):
+            os.remove(wav_file)
+
+
+def _transcribe_wav_with_server(whisper_server, whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads):
+    """Transcribe a streamed WAV segment with the resident whisper server, falling back to whisper-cli"""
+    srt_file = f"{segment_prefix}.srt"
+    try:
+        if os.path.exists(srt_file) and os.path.getsize(srt_file) > 0:
+            return srt_file
+        try:
+            srt = whisper_server.transcribe(wav_file, response_format='srt')
+            atomic_write(srt_file, srt.encode('utf-8'))
+            return srt_file
+        except Exception as e:
+            print(f"⚠️ whisper server failed on {os.path.basename(wav_file)}, falling back to whisper-cli: {e}")
+        return transcribe_wav_segment(whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads)
+    finally:
+        if os.path.exists(wav_file):
+            os.remove(wav_file)
+
+
+def _transcribe_segment(whisper_cli_path, whisper_model_path, audio_file_path, start, end, segment_prefix, threads):
+    """Transcribe one audio segment in a worker process, returning its SRT path"""
+    srt_file = f"{segment_prefix}.srt"
+    
+    # Segments finished before a crash are reused
+    if os.path.exists(srt_file) and os.path.getsize(srt_file) > 0:
+        return srt_file
+    
+    wav_file = f"{segment_prefix}.wav"
+    try:
+        extract_segment(audio_file_path, start, end, wav_file)
+        return transcribe_wav_segment(whisper_cli_path, whisper_model_path, wav_file, segment_prefix, threads)
+    finally:
+        if os.path.exists(wav_file):
+            os.remove(wav_file)
 
 
 class TranscriptionService:
-    def __init__(self):
+    def __init__(self, whisper_server=None):
         self.whisper_cli_path = WHISPER_CLI_PATH
         self.whisper_model_path = WHISPER_MODEL_PATH
         self.transcriptions_dir = TRANSCRIPTIONS_DIR
+        self.whisper_server = whisper_server
+        self.mode = TRANSCRIPTION_MODE
+        self.segment_min_seconds = SEGMENT_MIN_SECONDS
+        self.segment_max_seconds = SEGMENT_MAX_SECONDS
+        self.segment_threads = SEGMENT_THREADS
+        self.segment_workers = SEGMENT_WORKERS or max(1, (os.cpu_count() or 1) // SEGMENT_THREADS)
+        # Transcripts by .txt path, so repeated summaries and transcript buttons skip the disk
+        self.memory_cache = MemoryCache()
+        self.artifact_index = artifact_index
+        self.hit_stats = cache_hit_stats
     
     def transcribe_audio(self, audio_file_path):
         """Transcribe audio file using whisper.cpp"""
         try:
-            # Extract filename without extension
-            base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
-            output_prefix = os.path.join(self.transcriptions_dir, base_name)
+            # Extract filename without extension or format tag
+            base_name = transcript_base_name(audio_file_path)
+            output_prefix = self._output_prefix(base_name)
             txt_file = f"{output_prefix}.txt"
             
             # Check if transcription already exists and is not empty
-            if os.path.exists(txt_file) and os.path.getsize(txt_file) > 0:
-                print(f"✅ Transcription file already exists: {txt_file}")
-                with open(txt_file, 'r', encoding='utf-8') as f:
-                    transcription = f.read().strip()
-                if transcription:  # Make sure it's not just whitespace
-                    return transcription
-                else:
-                    print("⚠️ Existing transcription file is empty, re-transcribing...")
+            cached = self._load_cached_transcription(base_name)
+            if cached:
+                return cached
             
+            os.makedirs(os.path.dirname(output_prefix), exist_ok=True)
             print(f"🔄 Transcribing audio file: {audio_file_path}")
             
-            # Whisper command
+            # Long audio is split at silences and transcribed in parallel
+            if self.mode == 'segmented':
+                duration = self._get_duration(audio_file_path)
+                if duration and duration > self.segment_max_seconds * 2:
+                    return self._transcribe_segmented(audio_file_path, output_prefix, duration)
+            
+            # Prefer the resident whisper server, fall back to whisper-cli
+            if self.whisper_server and self.whisper_server.is_running():
+                try:
+                    transcription = self.whisper_server.transcribe(audio_file_path).strip()
+                    write_text(txt_file, transcription)
+                    self.memory_cache.put(txt_file, transcription)
+                    self._index_transcript(txt_file, self._whisper_source("whisper-server"))
+                    return transcription
+                except Exception as e:
+                    print(f"⚠️ whisper server failed, falling back to whisper-cli: {e}")
+            
+            # whisper-cli can't read native opus/m4a streams, decode them once
+            cli_input = audio_file_path
+            if os.path.splitext(audio_file_path)[1].lower() not in WHISPER_CLI_FORMATS:
+                cli_input = decode_to_wav(audio_file_path, f"{output_prefix}.input.wav")
+            
+            # Whisper command; its output is stored as the transcript only once complete
+            partial_prefix = f"{output_prefix}.partial"
             cmd = [
                 self.whisper_cli_path,
                 '-m', self.whisper_model_path,
                 '-l', 'auto',  # Auto-detect language
                 '--output-txt',
-                '-of', output_prefix,  # Output file prefix
-                '-f', audio_file_path
+                '-of', partial_prefix,  # Output file prefix
+                '-f', cli_input
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            finally:
+                if cli_input != audio_file_path and os.path.exists(cli_input):
+                    os.remove(cli_input)
             
             # Read the generated text file
-            if os.path.exists(txt_file):
-                with open(txt_file, 'r', encoding='utf-8') as f:
+            if os.path.exists(f"{partial_prefix}.txt"):
+                with open(f"{partial_prefix}.txt", 'r', encoding='utf-8') as f:
                     transcription = f.read().strip()
+                write_text(txt_file, transcription)
+                os.remove(f"{partial_prefix}.txt")
+                self.memory_cache.put(txt_file, transcription)
+                self._index_transcript(txt_file, self._whisper_source("whisper-cli"))
                 return transcription
             else:
                 raise Exception("Transcription file not created")
@@ -54,12 +186,208 @@ class TranscriptionService:
         except Exception as e:
             raise Exception(f"Transcription error: {str(e)}")
     
+    def transcribe_stream(self, source, base_name):
+        """
+        Transcribe while the audio is still downloading: yt-dlp output (or a
+        local media file) is decoded to 16 kHz PCM, cut at quiet points as it
+        arrives and each segment is handed to whisper immediately.
+        """
+        try:
+            output_prefix = self._output_prefix(base_name)
+            cached = self._load_cached_transcription(base_name)
+            if cached:
+                return cached
+            
+            print(f"🔄 Streaming and transcribing: {source}")
+            segments_dir = f"{output_prefix}.segments"
+            os.makedirs(segments_dir, exist_ok=True)
+            
+            segmenter = PcmSegmenter(self.segment_min_seconds, self.segment_max_seconds)
+            offsets = []
+            futures = []
+            
+            # The resident server already holds the model and works through one
+            # request at a time, so segments are queued to it in order; without
+            # it each segment runs whisper-cli in a worker process
+            use_server = self.whisper_server is not None and self.whisper_server.is_running()
+            if use_server:
+                pool = ThreadPoolExecutor(max_workers=1)
+                transcribe, backend_args = _transcribe_wav_with_server, (self.whisper_server,)
+                backend = "streaming whisper-server"
+            else:
+                pool = ProcessPoolExecutor(max_workers=self.segment_workers)
+                transcribe, backend_args = _transcribe_wav_file, ()
+                backend = "streaming"
+            
+            with pool:
+                def submit(start, pcm):
+                    segment_prefix = os.path.join(
+                        segments_dir, f"{len(futures):04d}_{start:.0f}-{start + len(pcm) / BYTES_PER_SECOND:.0f}"
+                    )
+                    wav_file = f"{segment_prefix}.wav"
+                    if not os.path.exists(f"{segment_prefix}.srt"):
+                        write_wav(wav_file, pcm)
+                    offsets.append(start)
+                    futures.append(pool.submit(
+                        transcribe,
+                        *backend_args,
+                        self.whisper_cli_path,
+                        self.whisper_model_path,
+                        wav_file,
+                        segment_prefix,
+                        self.segment_threads
+                    ))
+                
+                with PcmStream(source) as stream:
+                    while True:
+                        data = stream.read()
+                        if not data:
+                            break
+                        for start, pcm in segmenter.feed(data):
+                            print(f"🔄 Segment {len(futures) + 1} received, transcribing")
+                            submit(start, pcm)
+                
+                for start, pcm in segmenter.flush():
+                    submit(start, pcm)
+                
+                srt_files = [future.result() for future in futures]
+            
+            return self._write_stitched(output_prefix, list(zip(offsets, srt_files)), segments_dir, backend)
+        
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Transcription failed: {e.stderr}")
+        except Exception as e:
+            raise Exception(f"Streaming transcription error: {str(e)}")
+    
+    def get_cached_transcription(self, base_name):
+        """Return the stored transcription for a transcript name, or None"""
+        transcription = self._load_cached_transcription(base_name)
+        self.hit_stats.record('transcript', bool(transcription))
+        return transcription
+    
+    def save_transcription(self, base_name, text, source="captions"):
+        """Store a transcription obtained elsewhere (e.g. YouTube captions) under a transcript name"""
+        txt_file = f"{self._output_prefix(base_name)}.txt"
+        os.makedirs(os.path.dirname(txt_file), exist_ok=True)
+        write_text(txt_file, text)
+        self.memory_cache.put(txt_file, text.strip())
+        self._index_transcript(txt_file, source)
+        return txt_file
+    
+    def forget_artifact(self, artifact):
+        """Drop the in-memory copy of a transcript that was deleted (artifact index row)"""
+        if artifact['kind'] == TRANSCRIPT:
+            self.memory_cache.invalidate(f"{self._output_prefix(transcript_base_name(artifact['path']))}.txt")
+    
+    def _output_prefix(self, base_name):
+        """Path prefix of a transcript's files (.txt, .srt, .segments) in its video's shard"""
+        return shard_path(self.transcriptions_dir, transcript_video_id(base_name), base_name)
+    
+    def _whisper_source(self, backend):
+        """How a transcript was produced, for the artifact index"""
+        return f"{backend} {os.path.basename(self.whisper_model_path or '')}".strip()
+    
+    def _index_transcript(self, txt_file, source):
+        """Record a written transcript in the artifact index"""
+        self.artifact_index.record(txt_file, TRANSCRIPT, transcript_video_id(txt_file), source=source)
+    
+    def _load_cached_transcription(self, base_name):
+        """Return an existing non-empty transcription, or None (legacy flat files are still found)"""
+        txt_file = f"{self._output_prefix(base_name)}.txt"
+        cached = self.memory_cache.get(txt_file)
+        if cached:
+            self.artifact_index.touch(txt_file)
+            return cached
+        path = find_existing(self.transcriptions_dir, transcript_video_id(base_name), f"{base_name}.txt")
+        if path and os.path.getsize(path) > 0:
+            print(f"✅ Transcription file already exists: {path}")
+            try:
+                transcription = read_text(path).strip()
+            except CorruptArtifact as e:
+                print(f"⚠️ Stored transcription is damaged, re-transcribing: {e}")
+                return None
+            if transcription:  # Make sure it's not just whitespace
+                self.memory_cache.put(txt_file, transcription)
+                self.artifact_index.touch(path)
+                return transcription
+            print("⚠️ Existing transcription file is empty, re-transcribing...")
+        return None
+    
+    def _get_duration(self, audio_file_path):
+        """Get audio duration, or None if ffprobe can't read it"""
+        try:
+            return get_audio_duration(audio_file_path)
+        except Exception as e:
+            print(f"⚠️ Could not read audio duration, transcribing in one pass: {e}")
+            return None
+    
+    def _transcribe_segmented(self, audio_file_path, output_prefix, duration):
+        """Transcribe silence-aligned segments in parallel and stitch them in order"""
+        silences = detect_silences(audio_file_path)
+        segments = plan_segments(duration, silences, self.segment_min_seconds, self.segment_max_seconds)
+        
+        segments_dir = f"{output_prefix}.segments"
+        os.makedirs(segments_dir, exist_ok=True)
+        
+        workers = min(self.segment_workers, len(segments))
+        print(f"🔄 Transcribing {len(segments)} segments with {workers} workers")
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _transcribe_segment,
+                    self.whisper_cli_path,
+                    self.whisper_model_path,
+                    audio_file_path,
+                    start,
+                    end,
+                    os.path.join(segments_dir, f"{index:04d}_{start:.0f}-{end:.0f}"),
+                    self.segment_threads
+                )
+                for index, (start, end) in enumerate(segments)
+            ]
+            srt_files = [future.result() for future in futures]
+        
+        offsets = [start for start, _ in segments]
+        return self._write_stitched(output_prefix, list(zip(offsets, srt_files)), segments_dir, "segmented")
+    
+    def _write_stitched(self, output_prefix, segment_srt_files, segments_dir, backend):
+        """Stitch (offset, srt_file) segment results into the final .srt and .txt"""
+        # Shift each segment's timestamps by its offset in the full audio
+        segment_cues = []
+        for start, srt_file in segment_srt_files:
+            with open(srt_file, 'r', encoding='utf-8') as f:
+                segment_cues.append((start, parse_srt(f.read())))
+        cues = stitch_segments(segment_cues)
+        
+        # Subtitles stay plain SRT for other tools, but are still written atomically
+        atomic_write(f"{output_prefix}.srt", format_srt(cues).encode('utf-8'))
+        self.artifact_index.record(
+            f"{output_prefix}.srt", SUBTITLES, transcript_video_id(output_prefix), source=self._whisper_source(backend)
+        )
+        
+        transcription = '\n'.join(text for _, _, text in cues).strip()
+        write_text(f"{output_prefix}.txt", transcription)
+        self.memory_cache.put(f"{output_prefix}.txt", transcription)
+        self._index_transcript(f"{output_prefix}.txt", self._whisper_source(backend))
+        
+        # The stitched transcript is now the cache, segment results are no longer needed
+        shutil.rmtree(segments_dir, ignore_errors=True)
+        return transcription
+    
     def cleanup_transcription_files(self, audio_file_path):
         """Clean up transcription files"""
         try:
-            base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
-            txt_file = os.path.join(self.transcriptions_dir, f"{base_name}.txt")
-            if os.path.exists(txt_file):
-                os.remove(txt_file)
+            base_name = transcript_base_name(audio_file_path)
+            video_id = transcript_video_id(base_name)
+            paths = [
+                path for ext in ('txt', 'srt')
+                for path in lookup_paths(self.transcriptions_dir, video_id, f"{base_name}.{ext}")
+            ]
+            self.memory_cache.invalidate(f"{self._output_prefix(base_name)}.txt")
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.artifact_index.remove(paths)
         except Exception:
             pass  # Ignore cleanup errors
@@ -0,0 +1,141 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+import requests
+from config import (
+    WHISPER_SERVER_PATH, WHISPER_MODEL_PATH, WHISPER_SERVER_HOST, WHISPER_SERVER_PORT,
+    WHISPER_SERVER_STARTUP_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WhisperServer:
+    """Manages a resident whisper.cpp server so the model is loaded only once"""
+
+    def __init__(self):
+        self.server_path = WHISPER_SERVER_PATH
+        self.model_path = WHISPER_MODEL_PATH
+        self.host = WHISPER_SERVER_HOST
+        self.port = WHISPER_SERVER_PORT
+        self.startup_timeout = WHISPER_SERVER_STARTUP_TIMEOUT
+        self.health_interval = 10
+        self.process = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watchdog = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Start the server and its watchdog, returning True once healthy"""
+        if not os.path.exists(self.server_path):
+            logger.warning(f"❌ whisper server not found at {self.server_path}, using whisper-cli")
+            return False
+
+        self._stop_event.clear()
+        started = self._spawn()
+
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name="whisper-watchdog", daemon=True)
+            self._watchdog.start()
+
+        return started
+
+    def stop(self):
+        """Stop the watchdog and terminate the server process"""
+        self._stop_event.set()
+        with self._lock:
+            self._terminate()
+
+    def is_running(self):
+        """Check that the server process is alive"""
+        return self.process is not None and self.process.poll() is None
+
+    def is_healthy(self):
+        """Check that the server answers its health endpoint"""
+        if not self.is_running():
+            return False
+        try:
+            response = requests.get(f"{self.base_url}/health", timeout=2)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def transcribe(self, audio_file_path, language='auto', response_format='text'):
+        """Transcribe an audio file with the resident model ('text' or 'srt')"""
+        with open(audio_file_path, 'rb') as f:
+            response = requests.post(
+                f"{self.base_url}/inference",
+                files={'file': (os.path.basename(audio_file_path), f)},
+                data={'response_format': response_format, 'language': language, 'temperature': '0.0'},
+                timeout=None  # Long videos take as long as they take
+            )
+
+        if response.status_code != 200:
+            raise Exception(f"whisper server error: {response.status_code} - {response.text[:200]}")
+        return response.text.strip()
+
+    def _spawn(self):
+        """Launch the server process and wait until it is healthy"""
+        with self._lock:
+            self._terminate()
+
+            cmd = [
+                self.server_path,
+                '-m', self.model_path,
+                '--host', self.host,
+                '--port', str(self.port),
+                '--convert'  # Let the server decode mp3/m4a via ffmpeg
+            ]
+            logger.info(f"🔄 Starting whisper server on {self.base_url}")
+            self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline and not self._stop_event.is_set():
+            if not self.is_running():
+                logger.error("❌ whisper server exited during startup")
+                return False
+            if self.is_healthy():
+                logger.info("✅ whisper server is ready")
+                return True
+            time.sleep(0.5)
+
+        logger.error("❌ whisper server did not become healthy in time")
+        return False
+
+    def _terminate(self):
+        """Terminate the current server process (caller holds the lock)"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def _watch(self):
+        """Restart the server if it crashes or stops answering"""
+        while not self._stop_event.wait(self.health_interval):
+            if self.is_healthy():
+                continue
+            # Give a busy server a second chance before restarting it
+            if self.is_running() and self._stop_event.wait(self.health_interval):
+                break
+            if self.is_healthy():
+                continue
+
+            self.restarts += 1
+            logger.warning(f"⚠️ whisper server unhealthy, restarting (restart #{self.restarts})")
+            try:
+                self._spawn()
+            except Exception as e:
+                logger.error(f"Failed to restart whisper server: {e}")
@@ -1,27 +1,138 @@
 import os
+import glob
+import json
 import subprocess
 import re
-from config import YT_DLP_PATH, DOWNLOADS_DIR
+import requests
+from caption_parser import parse_captions
+from artifact_index import artifact_index, AUDIO
+from cache_layout import lookup_paths, shard_path
+from media_identity import cache_hit_stats, canonical_url, extract_video_id
+from config import (
+    YT_DLP_PATH, DOWNLOADS_DIR, AUDIO_FORMAT,
+    CAPTIONS_MODE, CAPTION_LANGUAGES, CAPTION_MIN_WORDS_PER_MINUTE
+)
+
+# Cache filename and yt-dlp arguments per audio format.
+# 'wav16k' decodes once straight to whisper's input format, 'native' keeps the
+# original audio stream untouched, 'mp3' is the legacy lossy re-encode.
+AUDIO_FORMATS = {
+    'mp3': {
+        'pattern': 'audio_{video_id}.mp3',
+        'template': 'audio_{video_id}.%(ext)s',
+        'args': ['-x', '--audio-format', 'mp3'],
+    },
+    'wav16k': {
+        'pattern': 'audio_{video_id}.16k.wav',
+        'template': 'audio_{video_id}.16k.%(ext)s',
+        'args': ['-x', '--audio-format', 'wav', '--postprocessor-args', 'ExtractAudio:-ar 16000 -ac 1'],
+    },
+    'native': {
+        'pattern': 'audio_{video_id}.native.*',
+        'template': 'audio_{video_id}.native.%(ext)s',
+        'args': ['-f', 'bestaudio'],
+    },
+}
+
+# Caption formats we can parse, in order of preference
+CAPTION_FORMATS = ['vtt', 'srv3', 'srv2', 'srv1']
+
+
+def select_caption_track(info, languages, mode='any'):
+    """
+    Pick the best caption track from yt-dlp video info.
+    Manual subtitles win over auto-generated ones, then language order decides.
+    Returns {'kind', 'lang', 'ext', 'url'} or None.
+    """
+    sources = [('manual', info.get('subtitles') or {})]
+    if mode == 'any':
+        sources.append(('auto', info.get('automatic_captions') or {}))
+
+    for kind, tracks in sources:
+        # Auto captions list machine translations too; '-orig' marks the spoken language
+        if kind == 'auto' and any(lang.endswith('-orig') for lang in tracks):
+            tracks = {lang: formats for lang, formats in tracks.items() if lang.endswith('-orig')}
+
+        for language in languages:
+            for lang, formats in tracks.items():
+                if lang != language and not lang.startswith(f"{language}-"):
+                    continue
+                by_ext = {f.get('ext'): f for f in formats if f.get('url')}
+                for ext in CAPTION_FORMATS:
+                    if ext in by_ext:
+                        return {'kind': kind, 'lang': lang, 'ext': ext, 'url': by_ext[ext]['url']}
+    return None
 
 
 class YouTubeDownloader:
     def __init__(self):
         self.yt_dlp_path = YT_DLP_PATH
         self.downloads_dir = DOWNLOADS_DIR
+        self.audio_format = AUDIO_FORMAT
+        self.captions_mode = CAPTIONS_MODE
+        self.caption_languages = CAPTION_LANGUAGES
+        self.caption_min_words_per_minute = CAPTION_MIN_WORDS_PER_MINUTE
+        self.artifact_index = artifact_index
+        self.hit_stats = cache_hit_stats
     
     def extract_video_id(self, url):
-        """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
-            r'youtube\.com\/watch.*?[?&]v=([^&\n?#]+)'
-        ]
+        """Extract the canonical video ID from a YouTube URL"""
+        return extract_video_id(url)
+    
+    def find_cached_audio(self, video_id, audio_format=None):
+        """Find a non-empty downloaded audio file, reusing legacy mp3 downloads for any format"""
+        audio_format = audio_format or self.audio_format
+        formats = [audio_format] if audio_format == 'mp3' else [audio_format, 'mp3']
         
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        for name in formats:
+            pattern = AUDIO_FORMATS[name]['pattern'].format(video_id=video_id)
+            for candidate in lookup_paths(self.downloads_dir, video_id, pattern):
+                for path in sorted(glob.glob(candidate)):
+                    if not path.endswith(('.part', '.ytdl')) and os.path.getsize(path) > 0:
+                        return path
         return None
     
+    def fetch_captions(self, youtube_url):
+        """Get existing YouTube captions as plain text, or None if none pass the policy"""
+        if self.captions_mode == 'off':
+            return None
+        
+        try:
+            cmd = [self.yt_dlp_path, '--dump-single-json', '--skip-download', youtube_url]
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            info = json.loads(result.stdout)
+            
+            track = select_caption_track(info, self.caption_languages, self.captions_mode)
+            if not track:
+                print("ℹ️ No suitable captions found")
+                return None
+            
+            print(f"🔄 Fetching {track['kind']} captions ({track['lang']}, {track['ext']})")
+            response = requests.get(track['url'], timeout=30)
+            response.raise_for_status()
+            text = parse_captions(response.text, track['ext'])
+            
+            if not self._captions_look_good(text, info.get('duration')):
+                print(f"⚠️ {track['kind']} captions ({track['lang']}) too sparse, ignoring")
+                return None
+            
+            print(f"✅ Using {track['kind']} captions ({track['lang']}), {len(text)} chars")
+            return text
+            
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Failed to probe captions: {e.stderr}")
+        except Exception as e:
+            raise Exception(f"Caption error: {str(e)}")
+    
+    def _captions_look_good(self, text, duration):
+        """Reject empty captions and ones too sparse for the video length (e.g. only [Music])"""
+        words = len(re.sub(r'\[[^\]]*\]', ' ', text).split())
+        if words == 0:
+            return False
+        if duration:
+            return words / (duration / 60) >= self.caption_min_words_per_minute
+        return True
+    
     def download_audio(self, youtube_url):
         """Download audio from YouTube video"""
         try:
@@ -29,33 +140,42 @@ class YouTubeDownloader:
             if not video_id:
                 raise ValueError("Invalid YouTube URL")
             
-            # Use predictable filename
-            output_filename = f"audio_{video_id}.mp3"
-            output_path = os.path.join(self.downloads_dir, output_filename)
+            if self.audio_format not in AUDIO_FORMATS:
+                raise ValueError(f"Unknown audio format: {self.audio_format}")
+            audio_format = AUDIO_FORMATS[self.audio_format]
             
             # Check if file already exists and is not empty
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                print(f"✅ Audio file already exists: {output_path}")
-                return output_path
+            cached_path = self.find_cached_audio(video_id)
+            self.hit_stats.record('audio', bool(cached_path))
+            if cached_path:
+                print(f"✅ Audio file already exists: {cached_path}")
+                self.artifact_index.touch(cached_path)
+                return cached_path
             
-            # Remove existing file if it exists but is empty
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            # Remove existing files if they exist but are empty
+            pattern = audio_format['pattern'].format(video_id=video_id)
+            for candidate in lookup_paths(self.downloads_dir, video_id, pattern):
+                for path in glob.glob(candidate):
+                    os.remove(path)
             
-            print(f"🔄 Downloading audio for video ID: {video_id}")
+            print(f"🔄 Downloading audio for video ID: {video_id} ({self.audio_format})")
             
-            # Download command
+            # Download command, predictable filename per format in the video's shard
+            output_template = shard_path(
+                self.downloads_dir, video_id, audio_format['template'].format(video_id=video_id), create=True
+            )
             cmd = [
                 self.yt_dlp_path,
-                '-x',
-                '--audio-format', 'mp3',
-                '-o', os.path.join(self.downloads_dir, f'audio_{video_id}.%(ext)s'),
-                youtube_url
+                *audio_format['args'],
+                '-o', output_template,
+                canonical_url(video_id)
             ]
             
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             
-            if os.path.exists(output_path):
+            output_path = self.find_cached_audio(video_id)
+            if output_path:
+                self.artifact_index.record(output_path, AUDIO, video_id, source=self.audio_format)
                 return output_path
             else:
                 raise Exception(f"Audio file not created: {result.stderr}")